@@ -5,7 +5,9 @@ This script is a Python rewrite of the original ``GoodCheck.cmd`` batch file.
 It keeps the user-facing workflow intact while improving robustness and
 readability.  The runner asks the user for the path to ``winws.exe`` and to a
 strategy list, starts *winws* with every strategy, executes the built-in HTTP
-checks with ``curl.exe`` and prints human readable results.
+checks and prints human readable results.  The checks run in-process on top of
+asyncio sockets; ``curl.exe`` is kept as a fallback engine for curl keys that
+have no in-process equivalent.
 
 The implementation deliberately mirrors the behaviour of the original script:
 
@@ -15,6 +17,10 @@ The implementation deliberately mirrors the behaviour of the original script:
 * a random query parameter is attached to every request to prevent caching;
 * pass results are aggregated per strategy and summarised at the end.
 
+Every prompt can also be answered on the command line (see ``--help``), so
+sweeps can run unattended; the exit code tells whether a strategy with enough
+working providers was found.
+
 Running on Windows is required for real checks because both ``winws.exe`` and
 ``curl.exe`` are Windows binaries.  The code, however, keeps the logic
 platform-agnostic so that it can be linted and tested on other systems.
@@ -22,19 +28,35 @@ platform-agnostic so that it can be linted and tested on other systems.
 
 from __future__ import annotations
 
+import argparse
+import asyncio
+import csv
+import hashlib
+import heapq
 import io
+import ipaddress
+import json
+import math
 import os
 import platform
 import random
 import shlex
+import socket
+import ssl
 import subprocess
 import sys
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass
+from array import array
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Callable, List, Sequence, Tuple, TextIO
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple, TextIO, Union
+from urllib.parse import urlsplit
 
 # ---------------------------------------------------------------------------
 # Configuration constants that mirror GoodCheck.cmd defaults
@@ -43,6 +65,16 @@ from typing import Callable, List, Sequence, Tuple, TextIO
 TCP_TIMEOUT_MS = 5000
 OK_THRESHOLD_BYTES = 65536
 CURL_MIN_TIMEOUT = 2
+# Exit code of curl when its output pipe is closed by an early stop.
+CURL_WRITE_ERROR = 23
+# Every check opens its own connection with a full TLS handshake, like the
+# in-process engine: HTTP/1.1, no TLS session reuse, no keep-alive.
+CURL_CONNECTION_ARGS: Tuple[str, ...] = (
+    "--http1.1",
+    "--no-sessionid",
+    "--header",
+    "Connection: close",
+)
 FAKE_SNI = "www.google.com"
 FAKE_HEX_RAW = (
     "1603030135010001310303424143facf5c983ac8ff20b819cfd634cbf5143c0005b2b8b142a6cd3"
@@ -50,10 +82,103 @@ FAKE_HEX_RAW = (
 )
 FAKE_HEX_BYTES = ""
 NETWORK_TEST_URL = "https://ya.ru"
+# ipset lists shipped next to the script; strategies point winws at them via
+# --ipset, so probe addresses are checked against the same lists.
+IPSET_FILES: Tuple[str, ...] = ("ipset-v4.txt", "ipset-v6.txt")
+# Probe engine used for the HTTP checks: "asyncio" runs the requests inside
+# the Python process, "curl" spawns curl.exe for every check, "curl-batch"
+# runs all checks of a pass in one curl.exe --parallel process and "auto"
+# prefers asyncio unless the curl extra keys cannot be translated.
+PROBE_ENGINE = "auto"
+PROBE_ENGINES: Tuple[str, ...] = ("auto", "asyncio", "curl", "curl-batch")
+PROBE_WORKERS = 8
+# Upper bound for the adaptive concurrency mode, which grows or shrinks the
+# number of in-flight checks between 1 and this value.
+PROBE_MAX_WORKERS = 32
+PROBE_USER_AGENT = "curl/8.11.1"
+# Checks request at least this range and extend it to their byte threshold,
+# so a larger threshold can still be reached.
+PROBE_RANGE = "0-65535"
+# Stop every check once its byte threshold has arrived instead of waiting
+# for the end of the body: servers that ignore Range would otherwise stream
+# until the timeout.  The curl-batch engine cannot stop single transfers and
+# relies on Range alone.
+PROBE_EARLY_STOP = True
+# Upper bound of URLs per curl.exe process in the curl-batch engine, which
+# keeps the command line well below the Windows limit.
+CURL_BATCH_MAX_URLS = 32
+# Addresses of the checked hosts are resolved before the first strategy and
+# pinned for every check (curl --resolve or its in-process equivalent), so
+# timings do not include name resolution.  Entries are resolved again after
+# the TTL or once a check fails to resolve or connect; 0 disables pinning.
+DNS_CACHE_TTL_SEC = 600
+# Drop a strategy as soon as it can no longer reach the number of working
+# providers of the current leader.
+PRUNE_STRATEGIES = False
+# Results of finished strategies are appended to this file next to the
+# script.  Strategies with a cached result younger than the TTL are skipped
+# (0 disables skipping); entries older than the maximum age are evicted.
+RESULT_CACHE_FILE = "ResultCache.jsonl"
+RESULT_CACHE_TTL_SEC = 0
+RESULT_CACHE_MAX_AGE_SEC = 7 * 24 * 3600
+RESULT_CACHE_MAX_ENTRIES = 100000
+# winws prints this line once WinDivert is opened and packets are being
+# captured.  Checks start as soon as it appears, but no later than after the
+# readiness timeout.  Builds that print nothing at all are given the fixed
+# start delay instead.  The output of winws is echoed to the console.
+WINWS_READY_MARKER = "capture is started"
+WINWS_READY_TIMEOUT_SEC = 2.0
+WINWS_SILENT_DELAY_SEC = 1.0
+# Progress of the running sweep is checkpointed next to the log after every
+# finished strategy, so an interrupted sweep can be continued with --resume.
+CHECKPOINT_FILE = "Checkpoint.json"
+# Number of strategies evaluated at the same time.  Every winws instance only
+# intercepts connections from its own block of local ports, and the checks of
+# that strategy are bound to the same block.
+PARALLEL_INSTANCES = 1
+PARALLEL_PORT_BASE = 30000
+PARALLEL_PORT_SPAN = 1000
+
+# Sequential pass mode: --passes becomes the upper bound and a strategy stops
+# once every provider's success rate across passes is confidently above or
+# below the decision rate (Wilson interval, one-sided 95%).
+ADAPTIVE_PASSES = False
+ADAPTIVE_CONFIDENCE_Z = 1.645
+ADAPTIVE_DECISION_RATE = 0.5
+# The baseline target is re-checked between strategies: after a strategy
+# without working providers and at least every HEALTH_CHECK_INTERVAL_SEC.
+# While it is unreachable the sweep waits, probing every HEALTH_RETRY_SEC,
+# and strategies that overlapped the outage are re-tested up to
+# HEALTH_MAX_RETESTS times.
+HEALTH_CHECK_INTERVAL_SEC = 60.0
+HEALTH_RETRY_SEC = 5.0
+HEALTH_MAX_RETESTS = 2
+# Two-stage mode (--screen): every strategy first gets one quick check per
+# provider with a short timeout, and only strategies with at least
+# SCREEN_MIN_PROVIDERS working providers continue to the full passes.
+SCREEN_TIMEOUT_MS = 2000
+SCREEN_MIN_PROVIDERS = 1
+# Number of leading strategies listed in the "best strategies" section; the
+# full rating is printed below it anyway.
+BEST_STRATEGIES_LIMIT = 10
+
+# Keys accepted by a test catalogue file (--tests): top-level defaults, the
+# provider weight table and the fields of every test.
+CATALOGUE_DEFAULT_KEYS: Tuple[str, ...] = ("timeout_ms", "threshold_bytes", "times")
+CATALOGUE_TEST_KEYS: Tuple[str, ...] = (
+    "id", "provider", "url", "times", "timeout_ms", "threshold_bytes", "enabled",
+)
+
+# Process exit codes for unattended runs.
+EXIT_SUCCESS = 0
+EXIT_ERROR = 1
+EXIT_NO_WORKING_STRATEGY = 2
+EXIT_INTERRUPTED = 130
 
 
 # The list of HTTP checks is copied verbatim from ConfigureTests in
-# GoodCheck.cmd.  Each entry is (test id, provider, url, repetitions).
+# GoodCheck.cmd.  Each entry is (test id, provider, url, repetitions).  It is
+# the built-in catalogue; --tests replaces it with a TOML/JSON file.
 TEST_CASES: Tuple[Tuple[str, str, str, int], ...] = (
     ("CF-01", "Cloudflare", "https://speed.cloudflare.com/__down?bytes=65536", 1),
     ("CF-02", "Cloudflare", "https://www.cloudflare.com/cdn-cgi/trace", 1),
@@ -126,11 +251,79 @@ class StrategyOutcome:
     strategy: Strategy
     summary: str
     providers: Tuple[str, ...]
+    pruned: bool = False
+    tls_times: Tuple[float, ...] = ()
+    total_times: Tuple[float, ...] = ()
+    # Rejected by the screening stage; the fields hold its single pass.
+    screened_out: bool = False
+    # Sum of the catalogue weights of ``providers``; the provider count when
+    # no weights are given.
+    score: float | None = None
+    # p50 and p90 of both series, computed once for the report and ranking.
+    tls_latency: Tuple[float, ...] = field(init=False, repr=False, compare=False)
+    total_latency: Tuple[float, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.score is None:
+            self.score = float(len(self.providers))
+        self.tls_latency = percentiles(self.tls_times, (50, 90))
+        self.total_latency = percentiles(self.total_times, (50, 90))
 
     @property
     def provider_count(self) -> int:
         return len(self.providers)
 
+    def latency_text(self) -> str:
+        """Describe TLS handshake and total time percentiles of OK checks."""
+
+        if not self.total_times:
+            return "задержки: нет данных"
+        tls_p50, tls_p90 = self.tls_latency
+        total_p50, total_p90 = self.total_latency
+        return (
+            f"TLS p50 {tls_p50:.3f} с / p90 {tls_p90:.3f} с, "
+            f"всего p50 {total_p50:.3f} с / p90 {total_p90:.3f} с"
+        )
+
+
+@dataclass
+class SuiteResult:
+    """Outcome of a single pass over all HTTP checks."""
+
+    ok: int
+    summary: str
+    providers: Tuple[str, ...]
+    aborted: bool = False
+    tls_times: Tuple[float, ...] = ()
+    total_times: Tuple[float, ...] = ()
+
+
+@dataclass
+class SweepSettings:
+    """Options shared by every strategy of a sweep."""
+
+    winws_path: Path
+    passes: int
+    timeout_sec: int
+    threshold_bytes: int = OK_THRESHOLD_BYTES
+    prune: bool = PRUNE_STRATEGIES
+    ready_timeout_sec: float = WINWS_READY_TIMEOUT_SEC
+    ipset_index: IpsetIndex | None = None
+    adaptive_passes: bool = ADAPTIVE_PASSES
+    # Compiled from TEST_CASES with the sweep timeout and threshold unless a
+    # catalogue file is given.
+    catalogue: TestCatalogue | None = None
+    # Screening stage run before the passes; strategies scoring below
+    # screen_min_score on it skip the full catalogue.
+    screen: TestCatalogue | None = None
+    screen_min_score: float = SCREEN_MIN_PROVIDERS
+
+    def __post_init__(self) -> None:
+        if self.catalogue is None:
+            self.catalogue = TestCatalogue.from_test_cases(
+                TEST_CASES, self.timeout_sec, self.threshold_bytes
+            )
+
 
 class StdoutLogger(io.TextIOBase):
     """Tee stdout stream that mirrors output to a log file."""
@@ -181,6 +374,17 @@ def setup_file_logging(target_dir: Path) -> Tuple[Path, Callable[[], None]]:
     return log_path, restore
 
 
+@dataclass
+class ProbeTimings:
+    """Cumulative transfer timings in seconds, named after curl's time_*."""
+
+    namelookup: float = 0.0
+    connect: float = 0.0
+    appconnect: float = 0.0
+    starttransfer: float = 0.0
+    total: float = 0.0
+
+
 @dataclass
 class CurlResult:
     """Parsed outcome of a single curl execution."""
@@ -191,6 +395,34 @@ class CurlResult:
     http_code: str
     remote_ip: str
     error_message: str
+    timings: ProbeTimings = field(default_factory=ProbeTimings)
+    # ``None`` when no ipset index is loaded or the address is unknown.
+    in_ipset: bool | None = None
+    ipset_as: str = ""
+    # curl exit code of the transfer (0 - success, 28 - timeout).
+    exit_code: int = 0
+    # Whether the server answered the ranged request with 206 Partial
+    # Content; ``None`` without a successful HTTP response.
+    range_honoured: bool | None = None
+    # The transfer was cut off once the threshold had arrived.
+    stopped_early: bool = False
+
+    def transfer_text(self) -> str:
+        """Note how the body ended when Range was ignored or cut off."""
+
+        notes = []
+        if self.range_honoured is False:
+            notes.append("без Range")
+        if self.stopped_early:
+            notes.append("остановлено по порогу")
+        return f" ({', '.join(notes)})" if notes else ""
+
+    def ipset_text(self) -> str:
+        if self.in_ipset is None:
+            return ""
+        if self.in_ipset:
+            return f", ipset {self.ipset_as or 'да'}"
+        return ", вне ipset"
 
 
 # ---------------------------------------------------------------------------
@@ -229,6 +461,52 @@ def prompt_passes() -> int:
         print("Введите число от 1 до 9.")
 
 
+def prompt_yes_no(prompt: str) -> bool:
+    """Ask a Y/N question; an empty answer means yes."""
+
+    while True:
+        raw = input(prompt).strip().lower()
+        if raw in ("", "y", "yes", "д", "да"):
+            return True
+        if raw in ("n", "no", "н", "нет"):
+            return False
+        print("Введите Y или N.")
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Return the nearest-rank percentile of ``values`` (0.0 when empty)."""
+
+    return percentiles(values, (pct,))[0]
+
+
+def percentiles(values: Sequence[float], pcts: Sequence[float]) -> Tuple[float, ...]:
+    """Return several nearest-rank percentiles of ``values`` with one sort."""
+
+    if not values:
+        return (0.0,) * len(pcts)
+    ordered = sorted(values)
+    count = len(ordered)
+    return tuple(
+        ordered[min(max(1, int(-(-count * pct // 100))), count) - 1] for pct in pcts
+    )
+
+
+def wilson_interval(
+    successes: int, trials: int, z: float = ADAPTIVE_CONFIDENCE_Z
+) -> Tuple[float, float]:
+    """Return the Wilson score interval of a success rate."""
+
+    if trials <= 0:
+        return 0.0, 1.0
+    rate = successes / trials
+    z2 = z * z
+    denominator = 1 + z2 / trials
+    centre = (rate + z2 / (2 * trials)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z2 / (4 * trials * trials))
+    margin /= denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
 def split_arguments(command_line: str) -> List[str]:
     """Split command line arguments respecting Windows quoting rules."""
 
@@ -238,14 +516,200 @@ def split_arguments(command_line: str) -> List[str]:
     return shlex.split(command_line, posix=False)
 
 
-def load_strategies(path: Path) -> Tuple[List[Strategy], List[str]]:
+# Variants appended after the base strategies: every base strategy is
+# repeated once per set with these arguments enforced.
+STRATEGY_VARIANT_ARGUMENTS: Tuple[Tuple[str, ...], ...] = (
+    ("--dpi-desync-cutoff=n3",),
+    ("--dup=2", "--dup-cutoff=n3"),
+)
+
+
+def normalize_command(text: str) -> str:
+    """Collapse whitespace in a command line."""
+
+    return " ".join(text.split())
+
+
+def ensure_argument(args: List[str], desired: str) -> bool:
+    """Ensure ``desired`` (or its variant) is present in ``args``."""
+
+    desired_lower = desired.lower()
+    key = desired_lower.split("=", 1)[0]
+    for index_pos, existing in enumerate(args):
+        existing_lower = existing.lower()
+        if existing_lower == desired_lower:
+            return False
+        if key and existing_lower.startswith(f"{key}="):
+            if existing_lower != desired_lower:
+                args[index_pos] = desired
+                return True
+            return False
+
+    args.append(desired)
+    return True
+
+
+class _ArgumentChunk:
+    """A piece of a strategy command line split into arguments once."""
+
+    __slots__ = ("text", "tokens", "_matches")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tuple(split_arguments(text))
+        self._matches: dict[str, bool | None] = {}
+
+    def match(self, desired: str) -> bool | None:
+        """Describe how :func:`ensure_argument` would treat ``desired`` here.
+
+        Returns ``None`` when no argument of the chunk carries the key,
+        otherwise whether the first such argument already equals ``desired``.
+        """
+
+        if desired not in self._matches:
+            desired_lower = desired.lower()
+            key = desired_lower.split("=", 1)[0]
+            result: bool | None = None
+            for token in self.tokens:
+                token_lower = token.lower()
+                if token_lower == desired_lower or (
+                    key and token_lower.startswith(f"{key}=")
+                ):
+                    result = token_lower == desired_lower
+                    break
+            self._matches[desired] = result
+        return self._matches[desired]
+
+
+def _variant_changes(chunks: Sequence[_ArgumentChunk], extra_args: Sequence[str]) -> bool:
+    """Return True when enforcing ``extra_args`` alters the command line."""
+
+    for desired in extra_args:
+        for chunk in chunks:
+            matched = chunk.match(desired)
+            if matched is not None:
+                if not matched:
+                    return True
+                break
+        else:
+            return True
+    return False
+
+
+class StrategySource:
+    """Lazily expanded contents of a strategy file.
+
+    Iterating yields :class:`Strategy` objects one by one in the order of the
+    original loader, so only the parsed directives are kept in memory.
+    ``len()`` counts the strategies without building their command lines.
+    Every entry is split into arguments once, in the constructor, and the
+    same chunks are reused by all combinations and traversals.
+    """
+
+    def __init__(
+        self,
+        strategy_extra: str,
+        raw_entries: Sequence[str],
+        port80_entries: Sequence[str],
+        port443_entries: Sequence[str],
+    ):
+        self.strategy_extra = strategy_extra.strip()
+        self.raw_entries = list(raw_entries)
+        self.port80_entries = [entry.strip() for entry in port80_entries]
+        self.port443_entries = [entry.strip() for entry in port443_entries]
+        self._count: int | None = None
+
+        if self.port80_entries and not (self.raw_entries or self.port443_entries):
+            raise ValueError(
+                "Для объединённых стратегий требуется хотя бы одна запись для порта 443."
+            )
+
+        self._prefix = (_ArgumentChunk(self.strategy_extra),) if self.strategy_extra else ()
+        self._wf_tcp = _ArgumentChunk("--wf-tcp=80,443")
+        self._filter80 = _ArgumentChunk("--filter-tcp=80")
+        self._filter443 = _ArgumentChunk("--filter-tcp=443")
+        self._new_profile = _ArgumentChunk("--new")
+        self._port80_chunks = [_ArgumentChunk(entry) for entry in self.port80_entries]
+        # Raw entries followed by the port 443 entries, which the tail of
+        # :meth:`_iter_bases` reuses.
+        self._entry_chunks = [
+            _ArgumentChunk(entry.strip())
+            for entry in self.raw_entries + self.port443_entries
+        ]
+
+    def _iter_bases(self) -> Iterator[Tuple[_ArgumentChunk, ...]]:
+        prefix = self._prefix
+        wf_tcp = self._wf_tcp
+
+        if self._port80_chunks:
+            for port80 in self._port80_chunks:
+                for port443 in self._entry_chunks:
+                    yield (
+                        *prefix,
+                        wf_tcp,
+                        self._filter80,
+                        port80,
+                        self._new_profile,
+                        self._filter443,
+                        port443,
+                    )
+        else:
+            for entry in self._entry_chunks:
+                chunks = (*prefix, entry) if entry.text else prefix
+                if any(chunk.tokens for chunk in chunks):
+                    yield chunks
+
+        for entry in self._entry_chunks[len(self.raw_entries):]:
+            if not entry.text:
+                continue
+            entry_lower = entry.text.lower()
+            if "--wf-tcp" in entry_lower:
+                continue
+            if "--filter-tcp=443" in entry_lower:
+                yield (*prefix, wf_tcp, entry)
+            else:
+                yield (*prefix, wf_tcp, self._filter443, entry)
+
+    def __bool__(self) -> bool:
+        return next(self._iter_bases(), None) is not None
+
+    def __iter__(self) -> Iterator[Strategy]:
+        index = 1
+        for chunks in self._iter_bases():
+            text = normalize_command(" ".join(chunk.text for chunk in chunks))
+            yield Strategy(index=index, text=text)
+            index += 1
+
+        for extra_args in STRATEGY_VARIANT_ARGUMENTS:
+            for chunks in self._iter_bases():
+                if not _variant_changes(chunks, extra_args):
+                    continue
+                new_arguments = [token for chunk in chunks for token in chunk.tokens]
+                for desired in extra_args:
+                    ensure_argument(new_arguments, desired)
+                yield Strategy(index=index, text=normalize_command(" ".join(new_arguments)))
+                index += 1
+
+    def __len__(self) -> int:
+        if self._count is None:
+            count = 0
+            for chunks in self._iter_bases():
+                count += 1
+                for extra_args in STRATEGY_VARIANT_ARGUMENTS:
+                    if _variant_changes(chunks, extra_args):
+                        count += 1
+            self._count = count
+        return self._count
+
+
+def load_strategies(path: Path) -> Tuple[StrategySource, List[str]]:
     """Read strategy definitions from ``path``.
 
-    Returns a list of :class:`Strategy` objects and additional curl arguments
-    specified via ``_strategyCurlExtraKeys``.  The loader now also understands
-    optional ``_strategyPort80`` and ``_strategyPort443`` directives that make
-    it possible to combine HTTP and HTTPS parameters into a single winws
-    invocation.
+    Returns a lazily expanded :class:`StrategySource` and additional curl
+    arguments specified via ``_strategyCurlExtraKeys``.  The loader also
+    understands optional ``_strategyPort80`` and ``_strategyPort443``
+    directives that make it possible to combine HTTP and HTTPS parameters
+    into a single winws invocation.
     """
 
     strategy_extra = ""
@@ -269,9 +733,6 @@ def load_strategies(path: Path) -> Tuple[List[Strategy], List[str]]:
                 text = text.replace(key, replacement)
         return text.strip()
 
-    def normalize(text: str) -> str:
-        return " ".join(text.split())
-
     with path.open("r", encoding="utf-8", errors="ignore") as handle:
         for line in handle:
             stripped = line.strip()
@@ -294,114 +755,65 @@ def load_strategies(path: Path) -> Tuple[List[Strategy], List[str]]:
 
             raw_entries.append(apply_replacements(stripped))
 
-    def ensure_argument(args: List[str], desired: str) -> bool:
-        """Ensure ``desired`` (or its variant) is present in ``args``."""
+    source = StrategySource(strategy_extra, raw_entries, port80_entries, port443_entries)
+    if not source:
+        raise ValueError("Файл стратегий не содержит данных.")
 
-        desired_lower = desired.lower()
-        key = desired_lower.split("=", 1)[0]
-        for index_pos, existing in enumerate(args):
-            existing_lower = existing.lower()
-            if existing_lower == desired_lower:
-                return False
-            if key and existing_lower.startswith(f"{key}="):
-                if existing_lower != desired_lower:
-                    args[index_pos] = desired
-                    return True
-                return False
+    curl_args = split_arguments(strategy_curl_extra)
+    return source, curl_args
 
-        args.append(desired)
-        return True
 
-    strategies: List[Strategy] = []
-    if port443_entries and raw_entries:
-        combined_entries = raw_entries + port443_entries
-    elif port443_entries:
-        combined_entries = port443_entries.copy()
-    else:
-        combined_entries = raw_entries.copy()
+def canonical_strategy_text(text: str) -> str:
+    """Return an order-normalised form of a winws command line.
 
-    base_prefix = strategy_extra.strip()
-    index = 1
+    winws profiles are separated by ``--new`` and their order matters, as
+    does the relative order of repeated keys (the last value wins).  Inside
+    a profile the distinct keys are independent, so options are stably
+    sorted by key; values passed as separate tokens stay attached to their
+    option.
+    """
 
-    if port80_entries:
-        if not combined_entries:
-            raise ValueError(
-                "Для объединённых стратегий требуется хотя бы одна запись для порта 443."
-            )
+    segments: List[List[List[str]]] = [[]]
+    for token in split_arguments(text):
+        if token == "--new":
+            segments.append([])
+        elif token.startswith("-") or not segments[-1]:
+            segments[-1].append([token])
+        else:
+            segments[-1][-1].append(token)
 
-        for port80 in port80_entries:
-            port80 = port80.strip()
-            for port443 in combined_entries:
-                port443 = port443.strip()
-                parts: List[str] = []
-                if base_prefix:
-                    parts.append(base_prefix)
-                parts.append("--wf-tcp=80,443")
-                port80_segment = f"--filter-tcp=80 {port80}".strip()
-                port443_segment = f"--filter-tcp=443 {port443}".strip()
-                parts.append(port80_segment)
-                parts.append("--new")
-                parts.append(port443_segment)
-                text = normalize(" ".join(parts))
-                if "--filter-tcp=80" not in text or "--filter-tcp=443" not in text:
-                    raise ValueError(
-                        "Объединённая стратегия должна содержать параметры для портов 80 и 443."
-                    )
-                strategies.append(Strategy(index=index, text=text))
-                index += 1
-    else:
-        for entry in raw_entries + port443_entries:
-            command = normalize(
-                " ".join(part for part in (strategy_extra, entry) if part).strip()
-            )
-            if command:
-                strategies.append(Strategy(index=index, text=command))
-                index += 1
+    canonical: List[str] = []
+    for position, groups in enumerate(segments):
+        if position:
+            canonical.append("--new")
+        groups = sorted(groups, key=lambda group: group[0].split("=", 1)[0])
+        for group in groups:
+            canonical.extend(group)
+    return " ".join(canonical)
 
-    for port443 in port443_entries:
-        entry_text = port443.strip()
-        if not entry_text:
-            continue
-        entry_lower = entry_text.lower()
-        if "--wf-tcp" in entry_lower:
-            continue
-        parts: List[str] = []
-        if base_prefix:
-            parts.append(base_prefix)
-        parts.append("--wf-tcp=80,443")
-        if "--filter-tcp=443" in entry_lower:
-            parts.append(entry_text)
-        else:
-            parts.append(f"--filter-tcp=443 {entry_text}".strip())
-        command = normalize(" ".join(parts))
-        strategies.append(Strategy(index=index, text=command))
-        index += 1
-
-    original_strategies = list(strategies)
-    extra_argument_sets: Tuple[Tuple[str, ...], ...] = (
-        ("--dpi-desync-cutoff=n3",),
-        ("--dup=2", "--dup-cutoff=n3"),
-    )
-
-    for extra_args in extra_argument_sets:
-        for base in original_strategies:
-            base_arguments = split_arguments(base.text)
-            new_arguments = base_arguments.copy()
-            changed = False
-            for desired in extra_args:
-                if ensure_argument(new_arguments, desired):
-                    changed = True
-            if not changed:
-                continue
-            command = normalize(" ".join(new_arguments))
-            strategies.append(Strategy(index=index, text=command))
-            index += 1
 
-    if not strategies:
-        raise ValueError("Файл стратегий не содержит данных.")
+class StrategyDeduplicator:
+    """Drop strategies whose canonical command line was already seen.
 
-    curl_args = split_arguments(strategy_curl_extra)
-    return strategies, curl_args
+    Works on a stream: the first occurrence is passed through unchanged and
+    only a short digest of every canonical form is remembered.
+    """
+
+    def __init__(self) -> None:
+        self._seen: set[bytes] = set()
+        self.duplicates = 0
+
+    def filter(self, strategies: Iterable[Strategy], scope: str = "") -> Iterator[Strategy]:
+        """Yield unseen strategies; ``scope`` separates e.g. curl key sets."""
+
+        for strategy in strategies:
+            canonical = f"{scope}\0{canonical_strategy_text(strategy.text)}"
+            digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+            if digest in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(digest)
+            yield strategy
 
 
 def find_curl_executable(root: Path) -> Path:
@@ -457,17 +869,46 @@ def append_cache_buster(url: str) -> str:
     return f"{url}{separator}{suffix}"
 
 
+def probe_range(threshold_bytes: int) -> str:
+    """Return the byte range requested by a check with ``threshold_bytes``.
+
+    The range is ``PROBE_RANGE`` unless the threshold lies beyond its end.
+    """
+
+    last = int(PROBE_RANGE.partition("-")[2])
+    return f"0-{max(last, threshold_bytes - 1)}"
+
+
 def run_curl(
     curl_path: Path,
     extra_args: Sequence[str],
     url: str,
     timeout_sec: int,
+    threshold_bytes: int = OK_THRESHOLD_BYTES,
+    source_ports: Tuple[int, int] | None = None,
+    early_stop: bool = False,
 ) -> CurlResult:
-    """Execute curl and convert its output into :class:`CurlResult`."""
+    """Execute curl and convert its output into :class:`CurlResult`.
+
+    Every check uses a fresh HTTP/1.1 connection (``CURL_CONNECTION_ARGS``).
+    ``source_ports`` restricts the local port of the connection, which is
+    how checks are routed to one of several parallel winws instances.
+    With ``early_stop`` the body is read from curl's stdout and the pipe is
+    closed as soon as ``threshold_bytes`` have arrived, which makes curl
+    abort the transfer; the ``--write-out`` line goes to stderr instead.
+    """
 
-    write_out = "HTTP_CODE=%{http_code};SIZE=%{size_download};IP=%{remote_ip};ERR=%{errormsg}"
+    write_out = (
+        "HTTP_CODE=%{http_code};SIZE=%{size_download};IP=%{remote_ip};"
+        "T_DNS=%{time_namelookup};T_CONNECT=%{time_connect};"
+        "T_TLS=%{time_appconnect};T_TTFB=%{time_starttransfer};"
+        "T_TOTAL=%{time_total};ERR=%{errormsg}"
+    )
+    if early_stop:
+        write_out = "%{stderr}" + write_out
     command = [
         str(curl_path),
+        *CURL_CONNECTION_ARGS,
         *extra_args,
         "--silent",
         "--show-error",
@@ -477,13 +918,18 @@ def run_curl(
         "--connect-timeout",
         str(timeout_sec),
         "--range",
-        "0-65535",
+        probe_range(threshold_bytes),
         "--output",
-        os.devnull,
+        "-" if early_stop else os.devnull,
         "--write-out",
         write_out,
         url,
     ]
+    if source_ports is not None:
+        command[-1:-1] = ["--local-port", f"{source_ports[0]}-{source_ports[1]}"]
+    if early_stop:
+        command[-1:-1] = ["--no-buffer"]
+        return _run_curl_until_threshold(command, threshold_bytes)
 
     try:
         completed = subprocess.run(
@@ -495,8 +941,72 @@ def run_curl(
     except OSError as exc:
         raise RuntimeError(f"Не удалось запустить curl: {exc}") from exc
 
+    return parse_curl_output(
+        completed.returncode, completed.stdout, completed.stderr, threshold_bytes
+    )
+
+
+def _run_curl_until_threshold(command: Sequence[str], threshold_bytes: int) -> CurlResult:
+    """Run a curl ``command`` writing the body to stdout, stopping early.
+
+    Once ``threshold_bytes`` have been read the pipe is closed.  When curl
+    then fails with exit 23 (write error) the body was cut off and the
+    transfer is reported as completed early; a body that ended right at the
+    threshold lets curl exit on its own and is reported as it finished.
+    """
+
+    try:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except OSError as exc:
+        raise RuntimeError(f"Не удалось запустить curl: {exc}") from exc
+
+    received = 0
+    stopped = False
+    try:
+        while True:
+            chunk = process.stdout.read1(65536)
+            if not chunk:
+                break
+            received += len(chunk)
+            if received >= threshold_bytes:
+                stopped = True
+                break
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        returncode = process.wait()
+
+    stderr_text = stderr.decode("utf-8", errors="replace")
+    if not stopped or returncode != CURL_WRITE_ERROR:
+        return parse_curl_output(returncode, "", stderr_text, threshold_bytes)
+    # curl still prints the write-out line after the write error; only its
+    # size and timings are taken, the error is the one we caused.
+    parsed = parse_curl_output(0, "", stderr_text, threshold_bytes)
+    return classify_transfer(
+        0,
+        max(parsed.bytes_downloaded, received),
+        parsed.http_code,
+        parsed.remote_ip,
+        "",
+        parsed.timings,
+        threshold_bytes,
+        stopped_early=True,
+    )
+
+
+def parse_curl_output(
+    returncode: int,
+    stdout: str,
+    stderr: str,
+    threshold_bytes: int = OK_THRESHOLD_BYTES,
+) -> CurlResult:
+    """Convert the ``--write-out`` line and errors of curl into a result."""
+
     combined_output = "\n".join(
-        part.strip() for part in (completed.stdout, completed.stderr) if part
+        part.strip() for part in (stdout, stderr) if part
     )
     curl_meta = None
     curl_error = None
@@ -513,6 +1023,14 @@ def run_curl(
     download_size = "0"
     remote_ip = "unknown"
     error_message = ""
+    timings = ProbeTimings()
+    timing_fields = {
+        "T_DNS": "namelookup",
+        "T_CONNECT": "connect",
+        "T_TLS": "appconnect",
+        "T_TTFB": "starttransfer",
+        "T_TOTAL": "total",
+    }
 
     if curl_meta:
         for chunk in curl_meta.split(";"):
@@ -524,6 +1042,11 @@ def run_curl(
                 download_size = value.strip() or "0"
             elif key == "IP":
                 remote_ip = value.strip() or "unknown"
+            elif key in timing_fields:
+                try:
+                    setattr(timings, timing_fields[key], float(value.strip()))
+                except ValueError:
+                    pass
             elif key == "ERR":
                 error_message = value.strip()
 
@@ -535,17 +1058,46 @@ def run_curl(
     except ValueError:
         bytes_downloaded = 0
 
+    return classify_transfer(
+        returncode,
+        bytes_downloaded,
+        http_code,
+        remote_ip,
+        error_message,
+        timings,
+        threshold_bytes,
+    )
+
+
+def classify_transfer(
+    returncode: int,
+    bytes_downloaded: int,
+    http_code: str,
+    remote_ip: str,
+    error_message: str,
+    timings: ProbeTimings | None = None,
+    threshold_bytes: int = OK_THRESHOLD_BYTES,
+    stopped_early: bool = False,
+) -> CurlResult:
+    """Map a finished transfer to OK/WARN/DETECTED/FAIL.
+
+    ``returncode`` uses curl exit codes so that every probe engine shares the
+    classification of the original script (0 - success, 28 - timeout).  A
+    transfer cut off at the threshold is passed with ``returncode`` 0 and
+    ``stopped_early`` set.
+    """
+
     status = "FAIL"
     status_text = "Failed to complete"
 
-    if completed.returncode == 0:
-        if bytes_downloaded >= OK_THRESHOLD_BYTES:
+    if returncode == 0:
+        if bytes_downloaded >= threshold_bytes:
             status = "OK"
             status_text = "Not detected"
         else:
             status = "WARN"
             status_text = "Possibly detected"
-    elif completed.returncode == 28:
+    elif returncode == 28:
         status = "DETECTED"
         if http_code == "000":
             status_text = "Detected (timeout without HTTP)"
@@ -553,11 +1105,15 @@ def run_curl(
             status_text = "Detected"
     else:
         if not error_message:
-            error_message = f"exit {completed.returncode}"
+            error_message = f"exit {returncode}"
 
     if not error_message:
         error_message = "none"
 
+    range_honoured = None
+    if http_code.startswith("2"):
+        range_honoured = http_code == "206"
+
     return CurlResult(
         status=status,
         status_text=status_text,
@@ -565,133 +1121,2523 @@ def run_curl(
         http_code=http_code,
         remote_ip=remote_ip,
         error_message=error_message,
+        timings=timings or ProbeTimings(),
+        exit_code=returncode,
+        range_honoured=range_honoured,
+        stopped_early=stopped_early,
     )
 
 
+# ---------------------------------------------------------------------------
+# Name resolution
+# ---------------------------------------------------------------------------
 
-def run_test_suite(
-    curl_path: Path,
-    curl_extra_args: Sequence[str],
-    timeout_sec: int,
-) -> Tuple[int, str, Tuple[str, ...]]:
-    """Execute all HTTP checks once and return (ok_count, summary_text)."""
 
-    tasks: List[Tuple[int, int, int, str, str, str]] = []
-    total_tasks = 0
-    for order, (test_id, provider, url, times) in enumerate(TEST_CASES):
-        repeats = max(times, 1)
-        total_tasks += repeats
-        for attempt in range(1, repeats + 1):
-            tasks.append((order, attempt, repeats, test_id, provider, url))
+def url_endpoint(url: str) -> Tuple[str, int] | None:
+    """Return the host and port of an http(s) URL, ``None`` for other URLs."""
 
-    if total_tasks == 0:
-        return 0, "OK:0, Warn:0, Detected:0, Fail:0", tuple()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in {"http", "https"} or not parts.hostname:
+        return None
+    try:
+        port = parts.port or (443 if scheme == "https" else 80)
+    except ValueError:
+        return None
+    return parts.hostname.lower(), port
 
-    ok = warn = detected = fail = 0
-    results: List[Tuple[int, int, int, str, str, CurlResult]] = []
-    ok_providers: set[str] = set()
 
-    max_workers = max(1, min(8, total_tasks))
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [
-            executor.submit(
-                run_curl,
-                curl_path,
-                curl_extra_args,
-                append_cache_buster(url),
-                timeout_sec,
+def curl_address_family(extra_args: Sequence[str]) -> int:
+    """Return the address family forced by ``-4``/``-6`` among curl keys."""
+
+    family = socket.AF_UNSPEC
+    for arg in extra_args:
+        if arg in {"-4", "--ipv4"}:
+            family = socket.AF_INET
+        elif arg in {"-6", "--ipv6"}:
+            family = socket.AF_INET6
+    return family
+
+
+def curl_resolved_endpoints(extra_args: Sequence[str]) -> set[Tuple[str, int]]:
+    """Return the host/port pairs pinned by ``--resolve`` among curl keys."""
+
+    endpoints: set[Tuple[str, int]] = set()
+    args = list(extra_args)
+    for position, arg in enumerate(args):
+        if arg == "--resolve" and position + 1 < len(args):
+            value = args[position + 1]
+        elif arg.startswith("--resolve="):
+            value = arg.partition("=")[2]
+        else:
+            continue
+        host, _, rest = value.strip('"').lstrip("+-").partition(":")
+        port_text = rest.partition(":")[0]
+        if port_text.isdigit():
+            endpoints.add((host.lower(), int(port_text)))
+    return endpoints
+
+
+class HostResolver:
+    """Addresses of the checked hosts shared by all probe engines.
+
+    Every host is resolved with ``getaddrinfo`` once and the result is
+    reused until ``ttl_sec`` elapses, so checks no longer pay for name
+    resolution and all checks of a host go to the same addresses no matter
+    which strategy is running.  Engines report finished checks through
+    :meth:`observe`: a check that could not resolve or connect to its host
+    drops the cached entry and the next check resolves the host again.
+    """
+
+    # curl exit codes that make a cached entry suspicious: the host could
+    # not be resolved or none of its addresses accepted the connection.
+    REFRESH_EXIT_CODES = frozenset({6, 7})
+
+    def __init__(self, ttl_sec: float = DNS_CACHE_TTL_SEC):
+        self.ttl_sec = ttl_sec
+        self._entries: dict[Tuple[str, int, int], Tuple[float, Tuple[tuple, ...]]] = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.refreshes = 0
+
+    def cached(
+        self, host: str, port: int, family: int = socket.AF_UNSPEC
+    ) -> Tuple[tuple, ...] | None:
+        """Return the cached ``getaddrinfo`` records or ``None`` when stale."""
+
+        with self._lock:
+            entry = self._entries.get((host.lower(), port, family))
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def store(
+        self, host: str, port: int, family: int, records: Iterable[tuple]
+    ) -> Tuple[tuple, ...]:
+        """Cache ``getaddrinfo`` records of a host and return them."""
+
+        records = tuple(records)
+        with self._lock:
+            self._entries[(host.lower(), port, family)] = (
+                time.monotonic() + self.ttl_sec,
+                records,
             )
-            for _, _, _, _, _, url in tasks
-        ]
+            self.lookups += 1
+        return records
 
-        for (order, attempt, repeats, test_id, provider, _), future in zip(tasks, futures):
-            result = future.result()
-            results.append((order, attempt, repeats, test_id, provider, result))
+    def lookup(
+        self, host: str, port: int, family: int = socket.AF_UNSPEC
+    ) -> Tuple[tuple, ...]:
+        """Return the addresses of a host, resolving it when not cached.
 
-    results.sort(key=lambda item: (item[0], item[1]))
+        An empty tuple means the host could not be resolved; nothing is
+        cached then, so the next call tries again.
+        """
 
-    for _, attempt, repeats, test_id, provider, result in results:
-        if result.status.upper() == "OK":
-            ok += 1
-            ok_providers.add(provider)
-        elif result.status.upper() == "WARN":
-            warn += 1
-        elif result.status.upper() == "DETECTED":
-            detected += 1
+        records = self.cached(host, port, family)
+        if records is not None:
+            return records
+        try:
+            records = socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError):
+            return tuple()
+        return self.store(host, port, family, records)
+
+    def invalidate(self, host: str, port: int) -> None:
+        """Drop the cached addresses of a host for every address family."""
+
+        host = host.lower()
+        with self._lock:
+            stale = [key for key in self._entries if key[:2] == (host, port)]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self.refreshes += 1
+
+    def observe(self, url: str, result: CurlResult) -> None:
+        """Drop the host of ``url`` when its check failed to resolve or connect."""
+
+        if result.exit_code in self.REFRESH_EXIT_CODES:
+            endpoint = url_endpoint(url)
+            if endpoint is not None:
+                self.invalidate(*endpoint)
+
+    def curl_arguments(self, url: str, family: int = socket.AF_UNSPEC) -> List[str]:
+        """Return the ``--resolve`` keys pinning the host of ``url`` for curl."""
+
+        endpoint = url_endpoint(url)
+        if endpoint is None or _is_ip_literal(endpoint[0]):
+            return []
+        host, port = endpoint
+        addresses: List[str] = []
+        for record in self.lookup(host, port, family):
+            address = str(record[4][0])
+            if record[0] == socket.AF_INET6:
+                address = f"[{address}]"
+            if address not in addresses:
+                addresses.append(address)
+        if not addresses:
+            return []
+        return ["--resolve", f"{host}:{port}:{','.join(addresses)}"]
+
+    def prefetch(self, urls: Iterable[str], family: int = socket.AF_UNSPEC) -> List[str]:
+        """Resolve the hosts of ``urls`` and return the ones that failed."""
+
+        failed: List[str] = []
+        seen: set[Tuple[str, int]] = set()
+        for url in urls:
+            endpoint = url_endpoint(url)
+            if endpoint is None or endpoint in seen or _is_ip_literal(endpoint[0]):
+                continue
+            seen.add(endpoint)
+            if not self.lookup(*endpoint, family):
+                failed.append(endpoint[0])
+        return failed
+
+
+def _is_ip_literal(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Probe engines
+# ---------------------------------------------------------------------------
+
+
+class ConcurrencyController:
+    """Number of checks an engine may keep in flight.
+
+    In fixed mode the limit never changes.  In adaptive mode completed checks
+    are grouped into windows of ``limit`` results and the limit is adjusted
+    after every window (additive increase, multiplicative decrease):
+
+    * it is halved when the share of timeouts jumps above its running
+      average or when TCP connect times inflate well above the fastest
+      connect seen, both typical for self-inflicted congestion;
+    * otherwise it grows by one while the estimated throughput (in-flight
+      checks divided by their mean duration) keeps improving, and steps back
+      by one when the last increase did not pay off.
+    """
+
+    def __init__(
+        self,
+        initial: int = PROBE_WORKERS,
+        adaptive: bool = False,
+        maximum: int = PROBE_MAX_WORKERS,
+    ):
+        self.adaptive = adaptive
+        self.maximum = max(1, maximum if adaptive else initial)
+        self.limit = min(max(1, initial), self.maximum)
+        self.lowest = self.highest = self.limit
+        self._lock = threading.Lock()
+        self._window: List[CurlResult] = []
+        self._baseline_connect = float("inf")
+        self._timeout_average: float | None = None
+        self._last_throughput = 0.0
+        self._last_step = 0
+
+    def observe(self, result: CurlResult) -> None:
+        """Feed a finished check into the controller."""
+
+        if not self.adaptive:
+            return
+        with self._lock:
+            self._window.append(result)
+            if len(self._window) >= self.limit:
+                self._adjust(self._window)
+                self._window = []
+
+    def _adjust(self, window: Sequence[CurlResult]) -> None:
+        connects = sorted(
+            item.timings.connect for item in window if item.timings.connect > 0
+        )
+        if connects:
+            self._baseline_connect = min(self._baseline_connect, connects[0])
+        timeout_share = sum(item.status == "DETECTED" for item in window) / len(window)
+        durations = [item.timings.total for item in window if item.timings.total > 0]
+        throughput = (
+            self.limit / (sum(durations) / len(durations)) if durations else 0.0
+        )
+
+        congested = False
+        if self._timeout_average is not None and timeout_share > self._timeout_average + 0.25:
+            congested = True
+        if connects:
+            slow_connect = percentile(connects, 90)
+            if slow_connect > max(3 * self._baseline_connect, self._baseline_connect + 0.05):
+                congested = True
+        self._timeout_average = (
+            timeout_share
+            if self._timeout_average is None
+            else 0.8 * self._timeout_average + 0.2 * timeout_share
+        )
+
+        if congested:
+            new_limit = max(1, self.limit // 2)
+        elif self._last_step > 0 and throughput <= self._last_throughput * 1.05:
+            new_limit = max(1, self.limit - 1)
         else:
-            fail += 1
+            new_limit = min(self.maximum, self.limit + 1)
+        self._last_step = new_limit - self.limit
+        self._last_throughput = throughput
+        self.limit = new_limit
+        self.lowest = min(self.lowest, new_limit)
+        self.highest = max(self.highest, new_limit)
+
+    def describe(self) -> str:
+        if not self.adaptive:
+            return f"{self.limit} (фиксированно)"
+        return (
+            f"адаптивно, итог {self.limit} "
+            f"(мин {self.lowest}, макс {self.highest}, предел {self.maximum})"
+        )
 
-        print(
-            f"Тест {test_id} ({provider}) #{attempt}/{repeats} - {result.status_text} "
-            f"(HTTP {result.http_code}, bytes {result.bytes_downloaded}, "
-            f"IP {result.remote_ip}, error {result.error_message})"
+
+class CurlEngine:
+    """Run every HTTP check as a separate curl.exe process."""
+
+    name = "curl"
+
+    def __init__(
+        self,
+        curl_path: Path,
+        extra_args: Sequence[str],
+        concurrency: ConcurrencyController | None = None,
+        resolver: HostResolver | None = None,
+        early_stop: bool = PROBE_EARLY_STOP,
+    ):
+        self.curl_path = curl_path
+        self.extra_args = list(extra_args)
+        self.concurrency = concurrency or ConcurrencyController()
+        self.resolver = resolver
+        self.early_stop = early_stop
+        self._family = curl_address_family(self.extra_args)
+        self._user_pinned = curl_resolved_endpoints(self.extra_args)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency.maximum)
+        self._gate = threading.Condition()
+        self._in_flight = 0
+
+    def submit(
+        self,
+        url: str,
+        timeout_sec: int,
+        threshold_bytes: int = OK_THRESHOLD_BYTES,
+        source_ports: Tuple[int, int] | None = None,
+    ) -> Future:
+        """Schedule a single check and return a future with its result."""
+
+        return self._executor.submit(
+            self._run, url, timeout_sec, threshold_bytes, source_ports
         )
 
-    summary = f"OK:{ok}, Warn:{warn}, Detected:{detected}, Fail:{fail}"
-    return ok, summary, tuple(sorted(ok_providers))
+    def _run(
+        self,
+        url: str,
+        timeout_sec: int,
+        threshold_bytes: int,
+        source_ports: Tuple[int, int] | None,
+    ) -> CurlResult:
+        with self._gate:
+            while self._in_flight >= self.concurrency.limit:
+                self._gate.wait()
+            self._in_flight += 1
+        try:
+            result = run_curl(
+                self.curl_path,
+                [*self.extra_args, *self._pin_arguments(url)],
+                url,
+                timeout_sec,
+                threshold_bytes,
+                source_ports,
+                self.early_stop,
+            )
+            self.concurrency.observe(result)
+            if self.resolver is not None:
+                self.resolver.observe(url, result)
+            return result
+        finally:
+            with self._gate:
+                self._in_flight -= 1
+                self._gate.notify_all()
 
-def start_winws(executable: Path, strategy: Strategy) -> subprocess.Popen:
-    """Start winws.exe with the provided strategy."""
+    def _pin_arguments(self, url: str) -> List[str]:
+        """Return ``--resolve`` keys for ``url`` unless the user pinned it."""
 
-    arguments = [str(executable), *strategy.split_arguments()]
-    creationflags = 0
-    if platform.system() == "Windows":
-        # Launch winws.exe in a separate console window to mirror the
-        # behaviour of the original batch script.
-        creationflags = getattr(subprocess, "CREATE_NEW_CONSOLE", 0)
+        if self.resolver is None or url_endpoint(url) in self._user_pinned:
+            return []
+        return self.resolver.curl_arguments(url, self._family)
 
-    try:
-        return subprocess.Popen(arguments, creationflags=creationflags)
-    except OSError as exc:
-        raise RuntimeError(f"Не удалось запустить {executable.name}: {exc}") from exc
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
 
 
-def terminate_winws(process: subprocess.Popen | None, executable: Path) -> None:
-    """Terminate the winws process and attempt to kill remaining instances."""
+class CurlBatchEngine(CurlEngine):
+    """Run all checks of a pass in one curl.exe ``--parallel`` process.
+
+    Every URL gets its own ``--next`` segment and a tagged ``--write-out``
+    line carrying ``%{urlnum}`` and ``%{exitcode}``, which is parsed back
+    into the :class:`CurlResult` of that URL as soon as curl prints it.
+    Curl keeps its DNS cache across the segments, but every check still
+    opens its own connection with a full TLS handshake (HTTP/1.1 with
+    ``Connection: close`` and no session reuse), as DPI checks require.
+    Single URLs outside a pass go through :meth:`CurlEngine.submit`.
+    Transfers of a batch cannot be stopped one by one, so early stop only
+    applies to those single URLs and a batch relies on ``--range``.
+    Requires curl 7.75 or newer for the per-URL write-out variables.
+    """
+
+    name = "curl-batch"
+    _TAG = "GOODCHECK"
+
+    def submit_batch(
+        self,
+        urls: Sequence[str],
+        timeout_sec: int,
+        threshold_bytes: int = OK_THRESHOLD_BYTES,
+        source_ports: Tuple[int, int] | None = None,
+    ) -> List[Future]:
+        """Schedule ``urls`` and return their futures in the same order."""
+
+        futures = [Future() for _ in urls]
+        for start in range(0, len(urls), CURL_BATCH_MAX_URLS):
+            end = start + CURL_BATCH_MAX_URLS
+            self._executor.submit(
+                self._run_batch,
+                urls[start:end],
+                futures[start:end],
+                timeout_sec,
+                threshold_bytes,
+                source_ports,
+            )
+        return futures
+
+    def _batch_command(
+        self,
+        urls: Sequence[str],
+        timeout_sec: int,
+        threshold_bytes: int,
+        source_ports: Tuple[int, int] | None,
+    ) -> List[str]:
+        write_out = (
+            f"\\n{self._TAG}|%{{urlnum}}|HTTP_CODE=%{{http_code}};SIZE=%{{size_download}};"
+            "IP=%{remote_ip};T_DNS=%{time_namelookup};T_CONNECT=%{time_connect};"
+            "T_TLS=%{time_appconnect};T_TTFB=%{time_starttransfer};"
+            "T_TOTAL=%{time_total};EXIT=%{exitcode};ERR=%{errormsg}\\n"
+        )
+        command = [
+            str(self.curl_path),
+            "--silent",
+            "--no-progress-meter",
+            "--parallel",
+            "--parallel-immediate",
+            "--parallel-max",
+            str(self.concurrency.limit),
+        ]
+        for number, url in enumerate(urls):
+            if number:
+                command.append("--next")
+            command += [
+                *CURL_CONNECTION_ARGS,
+                *self.extra_args,
+                *self._pin_arguments(url),
+                "--silent",
+                "--max-time",
+                str(timeout_sec),
+                "--connect-timeout",
+                str(timeout_sec),
+                "--range",
+                probe_range(threshold_bytes),
+                "--output",
+                os.devnull,
+                "--write-out",
+                write_out,
+            ]
+            if source_ports is not None:
+                command += ["--local-port", f"{source_ports[0]}-{source_ports[1]}"]
+            command.append(url)
+        return command
+
+    def _run_batch(
+        self,
+        urls: Sequence[str],
+        futures: Sequence[Future],
+        timeout_sec: int,
+        threshold_bytes: int,
+        source_ports: Tuple[int, int] | None,
+    ) -> None:
+        def resolve(number: int, result: CurlResult) -> None:
+            future = futures[number]
+            if not future.done() and future.set_running_or_notify_cancel():
+                self.concurrency.observe(result)
+                if self.resolver is not None:
+                    self.resolver.observe(urls[number], result)
+                future.set_result(result)
 
-    is_windows = platform.system() == "Windows"
-    if is_windows:
-        exe_name = executable.name
         try:
-            subprocess.run(
-                ["taskkill", "/F", "/T", "/IM", exe_name],
-                stdout=subprocess.DEVNULL,
+            process = subprocess.Popen(
+                self._batch_command(urls, timeout_sec, threshold_bytes, source_ports),
+                stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
-                check=False,
+                text=True,
+                errors="replace",
             )
-        except OSError:
-            pass
+        except OSError as exc:
+            for future in futures:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(
+                        RuntimeError(f"Не удалось запустить curl: {exc}")
+                    )
+            return
 
-    if process is not None and process.poll() is None:
-        if is_windows:
-            try:
-                process.wait(timeout=3)
-            except subprocess.TimeoutExpired:
-                process.kill()
-        else:
-            process.terminate()
-            try:
-                process.wait(timeout=3)
-            except subprocess.TimeoutExpired:
+        def stop_when_settled(_: Future) -> None:
+            # A pruned pass cancels its pending checks; curl is stopped
+            # instead of finishing transfers nobody waits for.
+            if all(future.done() for future in futures) and process.poll() is None:
                 process.kill()
 
-    if is_windows:
+        for future in futures:
+            future.add_done_callback(stop_when_settled)
         try:
-            subprocess.run(
-                ["sc", "stop", "windivert"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=False,
+            for line in process.stdout:
+                tag, _, rest = line.strip().partition("|")
+                if tag != self._TAG:
+                    continue
+                number, _, meta = rest.partition("|")
+                exit_code = meta.partition(";EXIT=")[2].partition(";")[0]
+                try:
+                    number_value, exit_value = int(number), int(exit_code)
+                except ValueError:
+                    continue
+                if 0 <= number_value < len(futures):
+                    resolve(
+                        number_value,
+                        parse_curl_output(exit_value, meta, "", threshold_bytes),
+                    )
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        for number in range(len(futures)):
+            resolve(
+                number,
+                classify_transfer(
+                    returncode or 1, 0, "000", "unknown", "curl finished without a result"
+                ),
             )
-        except OSError:
-            pass
 
 
+@dataclass
+class AsyncProbeOptions:
+    """Subset of curl options understood by :class:`AsyncioEngine`."""
 
-def check_network(curl_path: Path, curl_extra_args: List[str]) -> None:
-    """Replicate the pre-flight network check from GoodCheck.cmd."""
+    family: int = socket.AF_UNSPEC
+    insecure: bool = False
+    resolve: dict[Tuple[str, int], str] | None = None
 
-    base_command = [
+
+def translate_curl_args(extra_args: Sequence[str]) -> AsyncProbeOptions | None:
+    """Convert curl extra keys into :class:`AsyncProbeOptions`.
+
+    Returns ``None`` when at least one key has no in-process equivalent, in
+    which case the checks have to be executed by curl.exe itself.
+    """
+
+    options = AsyncProbeOptions(resolve={})
+    assert options.resolve is not None
+    args = list(extra_args)
+    position = 0
+    while position < len(args):
+        arg = args[position]
+        position += 1
+        if arg in {"-4", "--ipv4"}:
+            options.family = socket.AF_INET
+        elif arg in {"-6", "--ipv6"}:
+            options.family = socket.AF_INET6
+        elif arg in {"-k", "--insecure"}:
+            options.insecure = True
+        elif arg == "--resolve" or arg.startswith("--resolve="):
+            if arg == "--resolve":
+                if position >= len(args):
+                    return None
+                value = args[position]
+                position += 1
+            else:
+                value = arg.partition("=")[2]
+            host, sep_port, rest = value.strip('"').partition(":")
+            port_text, sep_addr, addresses = rest.partition(":")
+            if not (sep_port and sep_addr) or not port_text.isdigit():
+                return None
+            if host.startswith(("+", "-")):
+                return None
+            address = addresses.split(",")[0].strip("[]")
+            if not address:
+                return None
+            options.resolve[(host.lower(), int(port_text))] = address
+        else:
+            return None
+    return options
+
+
+class _TransferError(Exception):
+    """Probe failure carrying the equivalent curl exit code."""
+
+    def __init__(self, returncode: int, message: str):
+        super().__init__(message)
+        self.returncode = returncode
+
+
+@dataclass
+class _TransferState:
+    """Progress of an in-flight asyncio probe, kept for timeout reporting."""
+
+    bytes_downloaded: int = 0
+    http_code: str = "000"
+    remote_ip: str = "unknown"
+    started: float = field(default_factory=time.monotonic)
+    timings: ProbeTimings = field(default_factory=ProbeTimings)
+    # Body bytes after which the transfer ends; ``None`` reads it all.
+    stop_after: int | None = None
+    stopped_early: bool = False
+    # Value of the Range header, see :func:`probe_range`.
+    byte_range: str = PROBE_RANGE
+
+    def mark(self, name: str) -> None:
+        """Record the elapsed time of a transfer phase."""
+
+        setattr(self.timings, name, time.monotonic() - self.started)
+
+
+def _bind_source_port(sock: socket.socket, source_ports: Tuple[int, int]) -> None:
+    """Bind ``sock`` to a random free local port from ``source_ports``."""
+
+    low, high = source_ports
+    candidates = random.sample(range(low, high + 1), min(32, high - low + 1))
+    for port in candidates:
+        try:
+            sock.bind(("", port))
+            return
+        except OSError as exc:
+            last_error = exc
+    raise last_error
+
+
+class AsyncioEngine:
+    """Run HTTP checks inside the Python process with asyncio sockets.
+
+    The engine performs the same ranged GET request as :func:`run_curl`
+    without spawning a process per check.  With ``early_stop`` the body is
+    read only up to the threshold and the connection is closed after it.
+    All probes share one event loop running in a background thread;
+    :meth:`submit` is thread-safe and returns regular
+    :class:`concurrent.futures.Future` objects.
+    """
+
+    name = "asyncio"
+
+    def __init__(
+        self,
+        options: AsyncProbeOptions | None = None,
+        concurrency: ConcurrencyController | None = None,
+        resolver: HostResolver | None = None,
+        early_stop: bool = PROBE_EARLY_STOP,
+    ):
+        self.options = options or AsyncProbeOptions(resolve={})
+        self.concurrency = concurrency or ConcurrencyController()
+        self.resolver = resolver
+        self.early_stop = early_stop
+        self._ssl_context = ssl.create_default_context()
+        self._ssl_context.set_alpn_protocols(["http/1.1"])
+        if self.options.insecure:
+            self._ssl_context.check_hostname = False
+            self._ssl_context.verify_mode = ssl.CERT_NONE
+        self._gate: asyncio.Condition | None = None
+        self._in_flight = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name="goodcheck-probes",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def submit(
+        self,
+        url: str,
+        timeout_sec: int,
+        threshold_bytes: int = OK_THRESHOLD_BYTES,
+        source_ports: Tuple[int, int] | None = None,
+    ) -> Future:
+        """Schedule a single check and return a future with its result."""
+
+        return asyncio.run_coroutine_threadsafe(
+            self._limited_probe(url, timeout_sec, threshold_bytes, source_ports),
+            self._loop,
+        )
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+
+        async def shutdown() -> None:
+            current = asyncio.current_task()
+            pending = [task for task in asyncio.all_tasks() if task is not current]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _limited_probe(
+        self,
+        url: str,
+        timeout_sec: int,
+        threshold_bytes: int,
+        source_ports: Tuple[int, int] | None,
+    ) -> CurlResult:
+        if self._gate is None:
+            self._gate = asyncio.Condition()
+        async with self._gate:
+            await self._gate.wait_for(lambda: self._in_flight < self.concurrency.limit)
+            self._in_flight += 1
+        try:
+            result = await self.probe(url, timeout_sec, threshold_bytes, source_ports)
+            self.concurrency.observe(result)
+            if self.resolver is not None:
+                self.resolver.observe(url, result)
+            return result
+        finally:
+            async with self._gate:
+                self._in_flight -= 1
+                self._gate.notify_all()
+
+    async def probe(
+        self,
+        url: str,
+        timeout_sec: int,
+        threshold_bytes: int = OK_THRESHOLD_BYTES,
+        source_ports: Tuple[int, int] | None = None,
+    ) -> CurlResult:
+        """Execute one check and classify it like :func:`run_curl`."""
+
+        state = _TransferState(
+            stop_after=threshold_bytes if self.early_stop else None,
+            byte_range=probe_range(threshold_bytes),
+        )
+        try:
+            await asyncio.wait_for(
+                self._transfer(url, state, source_ports), timeout=timeout_sec
+            )
+        except asyncio.TimeoutError:
+            state.mark("total")
+            elapsed_ms = int(state.timings.total * 1000)
+            return classify_transfer(
+                28,
+                state.bytes_downloaded,
+                state.http_code,
+                state.remote_ip,
+                f"Operation timed out after {elapsed_ms} milliseconds with "
+                f"{state.bytes_downloaded} bytes received",
+                state.timings,
+                threshold_bytes,
+            )
+        except _TransferError as exc:
+            state.mark("total")
+            return classify_transfer(
+                exc.returncode,
+                state.bytes_downloaded,
+                state.http_code,
+                state.remote_ip,
+                str(exc),
+                state.timings,
+                threshold_bytes,
+            )
+        state.mark("total")
+        return classify_transfer(
+            0,
+            state.bytes_downloaded,
+            state.http_code,
+            state.remote_ip,
+            "",
+            state.timings,
+            threshold_bytes,
+            state.stopped_early,
+        )
+
+    async def _transfer(
+        self,
+        url: str,
+        state: _TransferState,
+        source_ports: Tuple[int, int] | None = None,
+    ) -> None:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host = parts.hostname
+        if scheme not in {"http", "https"} or not host:
+            raise _TransferError(3, f"URL rejected: Bad URL: {url}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+        host_header = host if parts.port is None else f"{host}:{port}"
+        resolve = self.options.resolve or {}
+        connect_host = resolve.get((host.lower(), port))
+        # Hosts pinned with --resolve bypass the shared cache.
+        resolver = self.resolver if connect_host is None else None
+
+        loop = asyncio.get_running_loop()
+        addresses = None
+        if resolver is not None:
+            addresses = resolver.cached(host, port, self.options.family)
+        if addresses is None:
+            try:
+                addresses = await loop.getaddrinfo(
+                    connect_host or host,
+                    port,
+                    family=self.options.family,
+                    type=socket.SOCK_STREAM,
+                )
+            except socket.gaierror as exc:
+                raise _TransferError(6, f"Could not resolve host: {host}") from exc
+            if resolver is not None:
+                resolver.store(host, port, self.options.family, addresses)
+        state.mark("namelookup")
+
+        sock = await self._connect(addresses, host, port, state, source_ports)
+        state.mark("connect")
+        reader, writer = await self._open_stream(sock, scheme, host)
+        if scheme == "https":
+            state.mark("appconnect")
+
+        try:
+            request = (
+                f"GET {target} HTTP/1.1\r\n"
+                f"Host: {host_header}\r\n"
+                f"Range: bytes={state.byte_range}\r\n"
+                f"User-Agent: {PROBE_USER_AGENT}\r\n"
+                "Accept: */*\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(request.encode("ascii"))
+            await writer.drain()
+            await self._read_response(reader, state)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError) as exc:
+            raise _TransferError(56, f"Recv failure: {exc}") from exc
+        except ssl.SSLError as exc:
+            raise _TransferError(56, f"TLS recv failure: {exc}") from exc
+        except OSError as exc:
+            raise _TransferError(56, f"Recv failure: {exc}") from exc
+        finally:
+            writer.transport.abort()
+
+    async def _connect(
+        self,
+        addresses: Sequence[tuple],
+        host: str,
+        port: int,
+        state: _TransferState,
+        source_ports: Tuple[int, int] | None = None,
+    ) -> socket.socket:
+        loop = asyncio.get_running_loop()
+        last_error: OSError | None = None
+        for family, sock_type, proto, _, address in addresses:
+            sock = socket.socket(family, sock_type, proto)
+            sock.setblocking(False)
+            try:
+                if source_ports is not None:
+                    _bind_source_port(sock, source_ports)
+                await loop.sock_connect(sock, address)
+            except OSError as exc:
+                sock.close()
+                last_error = exc
+                continue
+            except BaseException:
+                sock.close()
+                raise
+            state.remote_ip = str(address[0])
+            return sock
+        raise _TransferError(
+            7, f"Failed to connect to {host} port {port}: {last_error}"
+        )
+
+    async def _open_stream(
+        self, sock: socket.socket, scheme: str, host: str
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Wrap the connected ``sock`` into a stream, with TLS for https.
+
+        The socket is handed over to the transport created here, which
+        closes it itself when the handshake fails or the probe is cancelled.
+        Closing it again in the caller would free the descriptor while the
+        transport is still registered and break the next probe reusing it.
+        """
+
+        try:
+            return await asyncio.open_connection(
+                sock=sock,
+                ssl=self._ssl_context if scheme == "https" else None,
+                server_hostname=host if scheme == "https" else None,
+            )
+        except OSError as exc:
+            # ssl.SSLError and resets during the handshake alike.
+            raise _TransferError(35, f"TLS connect error: {exc}") from exc
+
+    async def _read_response(
+        self, reader: asyncio.StreamReader, state: _TransferState
+    ) -> None:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            if not state.timings.starttransfer:
+                state.mark("starttransfer")
+            lines = head.decode("iso-8859-1").split("\r\n")
+            status_parts = lines[0].split(" ", 2)
+            if len(status_parts) < 2 or not status_parts[1].isdigit():
+                raise _TransferError(8, "Weird server reply")
+            code = int(status_parts[1])
+            if not 100 <= code < 200:
+                break
+        state.http_code = f"{code:03d}"
+
+        headers: dict[str, str] = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        if code in {204, 304}:
+            return
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            while True:
+                size_line = await reader.readline()
+                if not size_line:
+                    raise _TransferError(18, "transfer closed with outstanding read data remaining")
+                try:
+                    size = int(size_line.split(b";")[0].strip(), 16)
+                except ValueError as exc:
+                    raise _TransferError(56, "Malformed encoding found in chunked-encoding") from exc
+                if size == 0:
+                    return
+                await self._read_body(reader, state, size)
+                if state.stopped_early:
+                    return
+                await reader.readexactly(2)
+
+        length_text = headers.get("content-length")
+        if length_text is not None and length_text.isdigit():
+            await self._read_body(reader, state, int(length_text))
+            return
+        await self._read_body(reader, state, None)
+
+    async def _read_body(
+        self,
+        reader: asyncio.StreamReader,
+        state: _TransferState,
+        length: int | None,
+    ) -> None:
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk_size = 65536 if remaining is None else min(remaining, 65536)
+            data = await reader.read(chunk_size)
+            if not data:
+                if remaining is None:
+                    return
+                raise _TransferError(
+                    18, f"transfer closed with {remaining} bytes remaining to read"
+                )
+            state.bytes_downloaded += len(data)
+            if state.stop_after is not None and state.bytes_downloaded >= state.stop_after:
+                state.stopped_early = remaining is None or remaining > len(data)
+                return
+            if remaining is not None:
+                remaining -= len(data)
+
+
+ProbeEngine = Union[CurlEngine, AsyncioEngine]
+
+
+def create_probe_engine(
+    name: str,
+    curl_path: Path | None,
+    curl_extra_args: Sequence[str],
+    workers: int = PROBE_WORKERS,
+    adaptive: bool = False,
+    max_workers: int = PROBE_MAX_WORKERS,
+    resolver: HostResolver | None = None,
+    early_stop: bool = PROBE_EARLY_STOP,
+) -> ProbeEngine:
+    """Create the probe engine selected by ``name``.
+
+    ``auto`` and ``asyncio`` fall back to curl.exe when the curl extra keys
+    cannot be reproduced in-process.  With a ``resolver`` every check is
+    pinned to the cached addresses of its host; ``early_stop`` ends checks
+    once their threshold has arrived.
+    """
+
+    name = name.lower()
+    if name not in PROBE_ENGINES:
+        raise ValueError(f"Неизвестный движок проверок: {name}")
+    concurrency = ConcurrencyController(workers, adaptive, max_workers)
+
+    if name in {"auto", "asyncio"}:
+        options = translate_curl_args(curl_extra_args)
+        if options is not None:
+            return AsyncioEngine(options, concurrency, resolver, early_stop)
+        print(
+            "Предупреждение: ключи curl не поддерживаются встроенным движком "
+            f"({' '.join(curl_extra_args)}), используется curl.exe."
+        )
+
+    if curl_path is None:
+        raise FileNotFoundError("curl.exe не найден, а встроенный движок недоступен.")
+    if name == "curl-batch":
+        return CurlBatchEngine(curl_path, curl_extra_args, concurrency, resolver, early_stop)
+    return CurlEngine(curl_path, curl_extra_args, concurrency, resolver, early_stop)
+
+
+# ---------------------------------------------------------------------------
+# Test catalogue
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class TestCase:
+    """One HTTP check of a catalogue with its limits filled in."""
+
+    test_id: str
+    provider: str
+    url: str
+    times: int = 1
+    timeout_sec: int = max(1, (TCP_TIMEOUT_MS + 999) // 1000)
+    threshold_bytes: int = OK_THRESHOLD_BYTES
+
+
+class TestCatalogue:
+    """Compiled set of HTTP checks shared by every strategy of a sweep.
+
+    Repetitions are expanded into ``checks`` (order, attempt, test) once,
+    so a pass only has to submit them.  ``weights`` maps providers to their
+    share of a strategy's score; unlisted providers weigh 1.
+    """
+
+    def __init__(
+        self, tests: Sequence[TestCase], weights: dict[str, float] | None = None
+    ):
+        self.tests = tuple(tests)
+        self.weights = dict(weights or {})
+        self.checks: Tuple[Tuple[int, int, TestCase], ...] = tuple(
+            (order, attempt, test)
+            for order, test in enumerate(self.tests)
+            for attempt in range(1, test.times + 1)
+        )
+        self.providers: Tuple[str, ...] = tuple(
+            dict.fromkeys(test.provider for test in self.tests)
+        )
+
+    @classmethod
+    def from_test_cases(
+        cls,
+        test_cases: Iterable[Tuple[str, str, str, int]],
+        timeout_sec: int,
+        threshold_bytes: int = OK_THRESHOLD_BYTES,
+    ) -> TestCatalogue:
+        """Compile ``TEST_CASES``-style tuples with shared limits."""
+
+        return cls(
+            [
+                TestCase(test_id, provider, url, max(times, 1), timeout_sec, threshold_bytes)
+                for test_id, provider, url, times in test_cases
+            ]
+        )
+
+    @classmethod
+    def from_record(cls, record: dict) -> TestCatalogue:
+        """Inverse of :meth:`record`."""
+
+        return cls(
+            [TestCase(**item) for item in record["tests"]],
+            {name: float(value) for name, value in record.get("weights", {}).items()},
+        )
+
+    def __len__(self) -> int:
+        return len(self.tests)
+
+    @property
+    def total_checks(self) -> int:
+        return len(self.checks)
+
+    def urls(self) -> List[str]:
+        return [test.url for test in self.tests]
+
+    def screening(self, timeout_sec: int) -> TestCatalogue:
+        """First test of every provider, run once within ``timeout_sec``."""
+
+        first: dict[str, TestCase] = {}
+        for test in self.tests:
+            first.setdefault(test.provider, test)
+        return TestCatalogue(
+            [
+                replace(test, times=1, timeout_sec=min(test.timeout_sec, timeout_sec))
+                for test in first.values()
+            ],
+            self.weights,
+        )
+
+    def weight(self, provider: str) -> float:
+        return self.weights.get(provider, 1.0)
+
+    def score(self, providers: Iterable[str]) -> float:
+        """Weighted number of ``providers``."""
+
+        return float(sum(self.weight(provider) for provider in providers))
+
+    def record(self) -> dict:
+        """JSON form used in cache keys, checkpoints and distributed jobs."""
+
+        return {
+            "tests": [
+                {
+                    "test_id": test.test_id,
+                    "provider": test.provider,
+                    "url": test.url,
+                    "times": test.times,
+                    "timeout_sec": test.timeout_sec,
+                    "threshold_bytes": test.threshold_bytes,
+                }
+                for test in self.tests
+            ],
+            "weights": dict(sorted(self.weights.items())),
+        }
+
+
+def _catalogue_int(value: object, name: str, where: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"{where}: {name} должно быть положительным целым числом")
+    return value
+
+
+def compile_test_catalogue(
+    data: object,
+    timeout_sec: int,
+    threshold_bytes: int = OK_THRESHOLD_BYTES,
+) -> TestCatalogue:
+    """Validate a parsed catalogue file and compile it.
+
+    ``data`` holds optional defaults (``timeout_ms``, ``threshold_bytes``,
+    ``times``), a ``weights`` table of providers and the ``tests`` list.
+    Every test needs ``id``, ``provider`` and ``url`` and may override the
+    defaults or set ``enabled = false``.  Defaults missing from the file
+    come from ``timeout_sec`` and ``threshold_bytes``.  Raises
+    :class:`ValueError` describing the first problem found.
+    """
+
+    if not isinstance(data, dict):
+        raise ValueError("каталог тестов должен быть таблицей/объектом")
+    unknown = set(data) - {*CATALOGUE_DEFAULT_KEYS, "weights", "tests"}
+    if unknown:
+        raise ValueError(f"неизвестные ключи каталога: {', '.join(sorted(unknown))}")
+
+    default_timeout = timeout_sec
+    if "timeout_ms" in data:
+        timeout_ms = _catalogue_int(data["timeout_ms"], "timeout_ms", "каталог")
+        default_timeout = max(1, (timeout_ms + 999) // 1000)
+    default_threshold = threshold_bytes
+    if "threshold_bytes" in data:
+        default_threshold = _catalogue_int(data["threshold_bytes"], "threshold_bytes", "каталог")
+    default_times = _catalogue_int(data.get("times", 1), "times", "каталог")
+
+    weights: dict[str, float] = {}
+    raw_weights = data.get("weights", {})
+    if not isinstance(raw_weights, dict):
+        raise ValueError("weights: ожидается таблица провайдер = вес")
+    for provider, value in raw_weights.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"weights: вес {provider} должен быть неотрицательным числом")
+        weights[str(provider)] = float(value)
+
+    raw_tests = data.get("tests")
+    if not isinstance(raw_tests, list):
+        raise ValueError("tests: ожидается список тестов")
+    tests: List[TestCase] = []
+    seen: set[str] = set()
+    for position, item in enumerate(raw_tests, start=1):
+        where = f"тест #{position}"
+        if not isinstance(item, dict):
+            raise ValueError(f"{where}: ожидается таблица/объект")
+        unknown = set(item) - set(CATALOGUE_TEST_KEYS)
+        if unknown:
+            raise ValueError(f"{where}: неизвестные ключи {', '.join(sorted(unknown))}")
+        for key in ("id", "provider", "url"):
+            if not isinstance(item.get(key), str) or not item[key].strip():
+                raise ValueError(f"{where}: не задано поле {key}")
+        test_id = item["id"].strip()
+        where = f"тест {test_id}"
+        if test_id in seen:
+            raise ValueError(f"{where}: идентификатор повторяется")
+        seen.add(test_id)
+        url = item["url"].strip()
+        if url_endpoint(url) is None:
+            raise ValueError(f"{where}: ожидается http(s) URL, получено {url}")
+        enabled = item.get("enabled", True)
+        if not isinstance(enabled, bool):
+            raise ValueError(f"{where}: enabled должно быть true или false")
+        test_timeout = default_timeout
+        if "timeout_ms" in item:
+            timeout_ms = _catalogue_int(item["timeout_ms"], "timeout_ms", where)
+            test_timeout = max(1, (timeout_ms + 999) // 1000)
+        test = TestCase(
+            test_id=test_id,
+            provider=item["provider"].strip(),
+            url=url,
+            times=_catalogue_int(item.get("times", default_times), "times", where),
+            timeout_sec=test_timeout,
+            threshold_bytes=_catalogue_int(
+                item.get("threshold_bytes", default_threshold), "threshold_bytes", where
+            ),
+        )
+        if enabled:
+            tests.append(test)
+
+    if not tests:
+        raise ValueError("в каталоге нет включённых тестов")
+    providers = {test.provider for test in tests}
+    return TestCatalogue(
+        tests, {name: value for name, value in weights.items() if name in providers}
+    )
+
+
+def load_test_catalogue(
+    path: Path,
+    timeout_sec: int,
+    threshold_bytes: int = OK_THRESHOLD_BYTES,
+) -> TestCatalogue:
+    """Read a ``.toml`` or ``.json`` test catalogue and compile it.
+
+    Read errors surface as :class:`OSError`, everything else as
+    :class:`ValueError`.
+    """
+
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # pragma: no cover - Python < 3.11
+            raise ValueError(
+                "TOML-каталоги поддерживаются с Python 3.11, используйте JSON"
+            ) from None
+        data = tomllib.loads(text)
+    else:
+        data = json.loads(text)
+    return compile_test_catalogue(data, timeout_sec, threshold_bytes)
+
+
+def catalogues_from_arguments(
+    args: argparse.Namespace,
+) -> Tuple[TestCatalogue, TestCatalogue | None]:
+    """Compile the sweep catalogue and the optional screening catalogue.
+
+    Uses ``--tests``, ``--timeout-ms`` and ``--threshold-bytes`` for the
+    full suite and ``--screen``/``--screen-tests``/``--screen-timeout-ms``
+    for stage one.  A bad file raises :class:`ValueError` naming it.
+    """
+
+    timeout_sec = max(1, (args.timeout_ms + 999) // 1000)
+    screen_timeout_sec = max(1, (args.screen_timeout_ms + 999) // 1000)
+
+    def load(path: Path, default_timeout_sec: int) -> TestCatalogue:
+        try:
+            return load_test_catalogue(path, default_timeout_sec, args.threshold_bytes)
+        except (OSError, ValueError) as exc:
+            raise ValueError(f"Ошибка в каталоге проверок ({path}): {exc}") from exc
+
+    if args.tests is not None:
+        catalogue = load(args.tests, timeout_sec)
+    else:
+        catalogue = TestCatalogue.from_test_cases(TEST_CASES, timeout_sec, args.threshold_bytes)
+    screen = None
+    if args.screen_tests is not None:
+        screen = load(args.screen_tests, screen_timeout_sec)
+    elif args.screen:
+        screen = catalogue.screening(screen_timeout_sec)
+    return catalogue, screen
+
+
+def run_test_suite(
+    engine: ProbeEngine,
+    timeout_sec: int,
+    prune_below: float = -1,
+    on_result: Callable[[str, str, int, CurlResult], None] | None = None,
+    threshold_bytes: int = OK_THRESHOLD_BYTES,
+    ipset_index: IpsetIndex | None = None,
+    source_ports: Tuple[int, int] | None = None,
+    catalogue: TestCatalogue | None = None,
+) -> SuiteResult:
+    """Execute all HTTP checks once and return the aggregated pass result.
+
+    The checks come from ``catalogue``, by default ``TEST_CASES`` with
+    ``timeout_sec`` and ``threshold_bytes`` for every test.  Results are
+    consumed as soon as each check finishes, tagged with their ipset
+    membership when ``ipset_index`` is given and handed to ``on_result``
+    (test id, provider, attempt, result).  When ``prune_below`` is positive
+    the pass is aborted (pending checks are cancelled) once the weighted
+    number of providers that can still succeed drops below that value.
+    """
+
+    if catalogue is None:
+        catalogue = TestCatalogue.from_test_cases(TEST_CASES, timeout_sec, threshold_bytes)
+    checks = catalogue.checks
+    total_tasks = len(checks)
+
+    if total_tasks == 0:
+        return SuiteResult(0, "OK:0, Warn:0, Detected:0, Fail:0", tuple())
+
+    ok = warn = detected = fail = 0
+    results: List[Tuple[int, int, int, str, str, CurlResult]] = []
+    ok_providers: set[str] = set()
+    pending_per_provider: dict[str, int] = {}
+    for _, _, test in checks:
+        pending_per_provider[test.provider] = pending_per_provider.get(test.provider, 0) + 1
+
+    urls = [append_cache_buster(test.url) for _, _, test in checks]
+    submit_batch = getattr(engine, "submit_batch", None)
+    if submit_batch is not None:
+        # One batch per distinct limit pair; the built-in catalogue has one.
+        groups: dict[Tuple[int, int], List[int]] = {}
+        for position, (_, _, test) in enumerate(checks):
+            groups.setdefault((test.timeout_sec, test.threshold_bytes), []).append(position)
+        by_position: dict[int, Future] = {}
+        for (group_timeout, group_threshold), positions in groups.items():
+            batch = submit_batch(
+                [urls[position] for position in positions],
+                group_timeout,
+                group_threshold,
+                source_ports,
+            )
+            by_position.update(zip(positions, batch))
+        submitted = [by_position[position] for position in range(total_tasks)]
+    else:
+        submitted = [
+            engine.submit(url, test.timeout_sec, test.threshold_bytes, source_ports)
+            for url, (_, _, test) in zip(urls, checks)
+        ]
+    futures = dict(zip(submitted, checks))
+
+    aborted = False
+    for future in as_completed(futures):
+        order, attempt, test = futures[future]
+        provider = test.provider
+        result = future.result()
+        if ipset_index is not None:
+            ipset_index.tag(result)
+        results.append((order, attempt, test.times, test.test_id, provider, result))
+        if on_result is not None:
+            on_result(test.test_id, provider, attempt, result)
+        pending_per_provider[provider] -= 1
+        if result.status.upper() == "OK":
+            ok_providers.add(provider)
+        if prune_below <= 0:
+            continue
+        reachable = catalogue.score(
+            name
+            for name, pending in pending_per_provider.items()
+            if pending > 0 or name in ok_providers
+        )
+        if reachable < prune_below:
+            aborted = True
+            for other in futures:
+                other.cancel()
+            break
+
+    results.sort(key=lambda item: (item[0], item[1]))
+
+    tls_times: List[float] = []
+    total_times: List[float] = []
+    ok_outside_ipset = 0
+    for _, attempt, repeats, test_id, provider, result in results:
+        if result.status.upper() == "OK":
+            ok += 1
+            tls_times.append(result.timings.appconnect)
+            total_times.append(result.timings.total)
+            if result.in_ipset is False:
+                ok_outside_ipset += 1
+        elif result.status.upper() == "WARN":
+            warn += 1
+        elif result.status.upper() == "DETECTED":
+            detected += 1
+        else:
+            fail += 1
+
+        print(
+            f"Тест {test_id} ({provider}) #{attempt}/{repeats} - {result.status_text} "
+            f"(HTTP {result.http_code}, bytes {result.bytes_downloaded}{result.transfer_text()}, "
+            f"IP {result.remote_ip}{result.ipset_text()}, error {result.error_message}, "
+            f"TLS {result.timings.appconnect:.3f}s, total {result.timings.total:.3f}s)"
+        )
+
+    summary = f"OK:{ok}, Warn:{warn}, Detected:{detected}, Fail:{fail}"
+    if ok_outside_ipset:
+        summary += f", OK outside ipset:{ok_outside_ipset}"
+    if aborted:
+        summary += f", Skipped:{total_tasks - len(results)}"
+    return SuiteResult(
+        ok,
+        summary,
+        tuple(sorted(ok_providers)),
+        aborted,
+        tuple(tls_times),
+        tuple(total_times),
+    )
+
+
+def start_winws(
+    executable: Path,
+    strategy: Strategy,
+    arguments: Sequence[str] | None = None,
+) -> subprocess.Popen:
+    """Start winws.exe with the provided strategy.
+
+    ``arguments`` replaces the split strategy text, e.g. for a strategy
+    rewritten by :func:`isolate_strategy`.
+    """
+
+    if arguments is None:
+        arguments = strategy.split_arguments()
+    arguments = [str(executable), *arguments]
+    creationflags = 0
+    if platform.system() == "Windows":
+        # Launch winws.exe in a separate console window to mirror the
+        # behaviour of the original batch script.
+        creationflags = getattr(subprocess, "CREATE_NEW_CONSOLE", 0)
+
+    try:
+        return subprocess.Popen(
+            arguments,
+            creationflags=creationflags,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+    except OSError as exc:
+        raise RuntimeError(f"Не удалось запустить {executable.name}: {exc}") from exc
+
+
+def instance_source_ports(slot: int) -> Tuple[int, int]:
+    """Return the inclusive local port range reserved for instance ``slot``."""
+
+    low = PARALLEL_PORT_BASE + slot * PARALLEL_PORT_SPAN
+    return low, low + PARALLEL_PORT_SPAN - 1
+
+
+def _port_filter(field_name: str, ports: str) -> str:
+    """Translate a winws port list such as ``80,443,1000-2000`` to WinDivert."""
+
+    terms = []
+    for item in ports.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        low, _, high = item.partition("-")
+        if high:
+            terms.append(f"({field_name} >= {low} and {field_name} <= {high})")
+        else:
+            terms.append(f"{field_name} == {low}")
+    return " or ".join(terms)
+
+
+def isolate_strategy(
+    arguments: Sequence[str], source_ports: Tuple[int, int]
+) -> List[str] | None:
+    """Limit winws interception to connections from ``source_ports``.
+
+    The ``--wf-tcp`` and ``--wf-l3`` keys are folded into a single
+    ``--wf-raw`` filter that additionally matches the local port, so several
+    instances can run side by side without touching each other's traffic.
+    UDP interception is dropped because all checks use TCP.  Returns
+    ``None`` for strategies that already carry their own ``--wf-raw`` filter;
+    those have to run alone.
+    """
+
+    tcp_ports = ""
+    families: List[str] = []
+    remaining: List[str] = []
+    for argument in arguments:
+        key, _, value = argument.partition("=")
+        key = key.lower()
+        if key == "--wf-raw":
+            return None
+        if key == "--wf-tcp":
+            tcp_ports = ",".join(filter(None, (tcp_ports, value)))
+        elif key == "--wf-l3":
+            families.extend(part.strip().lower() for part in value.split(","))
+        elif key != "--wf-udp":
+            remaining.append(argument)
+
+    low, high = source_ports
+    outbound = f"outbound and tcp.SrcPort >= {low} and tcp.SrcPort <= {high}"
+    inbound = f"inbound and tcp.DstPort >= {low} and tcp.DstPort <= {high}"
+    if tcp_ports:
+        outbound += f" and ({_port_filter('tcp.DstPort', tcp_ports)})"
+        inbound += f" and ({_port_filter('tcp.SrcPort', tcp_ports)})"
+    expression = f"({outbound}) or ({inbound})"
+    if families and not ("ipv4" in families and "ipv6" in families):
+        expression = f"{'ipv6' if 'ipv6' in families else 'ip'} and ({expression})"
+    return [f"--wf-raw={expression}", *remaining]
+
+
+def wait_winws_ready(
+    process: subprocess.Popen,
+    timeout_sec: float = WINWS_READY_TIMEOUT_SEC,
+    marker: str = WINWS_READY_MARKER,
+    silent_delay_sec: float = WINWS_SILENT_DELAY_SEC,
+    echo: TextIO | None = None,
+) -> bool:
+    """Wait until winws reports that packet capture is active.
+
+    The output of winws is drained by a background thread for the whole
+    lifetime of the process so that it never blocks on a full pipe, and every
+    line is echoed to ``echo`` (``sys.stdout`` at the time of the call, so
+    the lines reach the log file by default).  When winws prints nothing
+    within ``silent_delay_sec`` it is assumed to be ready, as with the fixed
+    delay used before.  Returns ``False`` when winws printed output
+    but not the marker within ``timeout_sec`` and raises
+    :class:`RuntimeError` when the process exits before becoming ready.
+    """
+
+    stream = process.stdout
+    if stream is None:
+        time.sleep(min(silent_delay_sec, timeout_sec))
+        return False
+    if echo is None:
+        echo = sys.stdout
+
+    ready = threading.Event()
+    tail: deque[str] = deque(maxlen=10)
+
+    def drain() -> None:
+        for raw in iter(stream.readline, b""):
+            line = raw.decode("utf-8", errors="replace").rstrip()
+            if line:
+                tail.append(line)
+                if echo is not None:
+                    try:
+                        echo.write(f"[winws {process.pid}] {line}\n")
+                        echo.flush()
+                    except (OSError, ValueError):
+                        pass
+            if marker in line:
+                ready.set()
+
+    threading.Thread(target=drain, name="winws-output", daemon=True).start()
+
+    started = time.monotonic()
+    while not ready.wait(0.05):
+        if process.poll() is not None:
+            if ready.wait(0.2):
+                return True
+            details = "; ".join(tail) or "нет вывода"
+            raise RuntimeError(
+                f"winws завершился с кодом {process.returncode}: {details}"
+            )
+        elapsed = time.monotonic() - started
+        if not tail and elapsed >= min(silent_delay_sec, timeout_sec):
+            return True
+        if elapsed >= timeout_sec:
+            return False
+    return True
+
+
+class ThreadOutputRouter(io.TextIOBase):
+    """Stdout proxy that buffers the output of capturing threads.
+
+    Parallel strategies print their progress into private buffers, which are
+    written out in one piece once the strategy finishes, so the log keeps one
+    readable block per strategy.
+    """
+
+    def __init__(self, target: TextIO):
+        self._target = target
+        self._local = threading.local()
+
+    def write(self, s: str) -> int:  # type: ignore[override]
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None:
+            return buffer.write(s)
+        return self._target.write(s)
+
+    def flush(self) -> None:  # type: ignore[override]
+        if getattr(self._local, "buffer", None) is None:
+            self._target.flush()
+
+    def isatty(self) -> bool:  # type: ignore[override]
+        return self._target.isatty()
+
+    @property
+    def encoding(self) -> str | None:  # type: ignore[override]
+        return getattr(self._target, "encoding", None)
+
+    def capture(self, func: Callable[[], object]) -> Tuple[object, str]:
+        """Run ``func`` with the output of this thread buffered."""
+
+        self._local.buffer = io.StringIO()
+        try:
+            return func(), self._local.buffer.getvalue()
+        finally:
+            self._local.buffer = None
+
+
+class StrategyScheduler:
+    """Evaluate up to ``instances`` strategies at the same time.
+
+    Tasks receive the local port range of their instance (``None`` when the
+    strategy runs alone) and their ``on_done`` callbacks always run in the
+    calling thread, in completion order.  With ``first_slot`` set even a
+    single instance runs isolated, in the port ranges from that slot on, so
+    several sweeps can share one machine.
+    """
+
+    def __init__(self, instances: int, first_slot: int | None = None):
+        self.instances = instances
+        self._router: ThreadOutputRouter | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        first = first_slot or 0
+        self._free_slots = list(range(first, first + instances))
+        self._pending: dict[Future, Tuple[int, Callable[[object], None]]] = {}
+        if instances > 1 or first_slot is not None:
+            self._router = ThreadOutputRouter(sys.stdout)
+            sys.stdout = self._router
+            self._executor = ThreadPoolExecutor(
+                max_workers=instances, thread_name_prefix="GoodCheckInstance"
+            )
+
+    @property
+    def parallel(self) -> bool:
+        return self._executor is not None
+
+    def submit(
+        self,
+        task: Callable[[Tuple[int, int] | None], object],
+        on_done: Callable[[object], None],
+        exclusive: bool = False,
+    ) -> None:
+        """Run ``task`` on a free instance, waiting for one if necessary."""
+
+        if self._executor is None or exclusive:
+            self.drain()
+            on_done(task(None))
+            return
+        while not self._free_slots:
+            self._complete(wait_first=True)
+        slot = self._free_slots.pop(0)
+        source_ports = instance_source_ports(slot)
+        future = self._executor.submit(
+            self._router.capture, partial(task, source_ports)
+        )
+        self._pending[future] = (slot, on_done)
+
+    def drain(self) -> None:
+        """Wait for every running strategy and report it."""
+
+        while self._pending:
+            self._complete(wait_first=True)
+
+    def _complete(self, wait_first: bool) -> None:
+        for future in as_completed(list(self._pending)):
+            slot, on_done = self._pending.pop(future)
+            self._free_slots.append(slot)
+            result, output = future.result()
+            sys.stdout.write(output)
+            on_done(result)
+            if wait_first:
+                return
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._router is not None and sys.stdout is self._router:
+            sys.stdout = self._router._target
+
+
+def terminate_winws(
+    process: subprocess.Popen | None,
+    executable: Path,
+    exclusive: bool = True,
+) -> None:
+    """Terminate the winws process and attempt to kill remaining instances.
+
+    With ``exclusive`` disabled only ``process`` itself is stopped and the
+    WinDivert driver is left running for the other parallel instances.
+    """
+
+    is_windows = platform.system() == "Windows"
+    if is_windows and (exclusive or process is not None):
+        if exclusive:
+            target = ["/IM", executable.name]
+        else:
+            target = ["/PID", str(process.pid)]
+        try:
+            subprocess.run(
+                ["taskkill", "/F", "/T", *target],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=False,
+            )
+        except OSError:
+            pass
+
+    if process is not None and process.poll() is None:
+        if is_windows:
+            try:
+                process.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        else:
+            process.terminate()
+            try:
+                process.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    if is_windows and exclusive:
+        try:
+            subprocess.run(
+                ["sc", "stop", "windivert"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=False,
+            )
+        except OSError:
+            pass
+
+
+
+# ---------------------------------------------------------------------------
+# ipset index
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class IpsetEntry:
+    """A network from an ipset file with the ``# AS...`` group it belongs to."""
+
+    network: ipaddress.IPv4Network | ipaddress.IPv6Network
+    group: str
+
+
+def load_ipset(paths: Iterable[Path]) -> List[IpsetEntry]:
+    """Parse ipset files into a list of networks.
+
+    Lines starting with ``#`` open a new group (``# AS13335``); empty lines
+    and ``/`` comments are ignored, as are lines that are not valid
+    addresses or CIDRs.
+    """
+
+    entries: List[IpsetEntry] = []
+    for path in paths:
+        group = ""
+        with path.open("r", encoding="utf-8", errors="ignore") as handle:
+            for line in handle:
+                stripped = line.strip()
+                if not stripped or stripped.startswith("/"):
+                    continue
+                if stripped.startswith("#"):
+                    group = stripped.lstrip("#").strip()
+                    continue
+                try:
+                    network = ipaddress.ip_network(stripped, strict=False)
+                except ValueError:
+                    continue
+                entries.append(IpsetEntry(network, group))
+    return entries
+
+
+class IpsetIndex:
+    """Sorted, non-overlapping address intervals for fast membership tests.
+
+    Nested networks are flattened so that every address maps to the most
+    specific network that contains it.  A lookup is a single
+    :func:`bisect.bisect_right` over integer arrays.
+    """
+
+    def __init__(self, entries: Iterable[IpsetEntry]):
+        self.groups: List[str] = []
+        group_ids: dict[str, int] = {}
+        per_family: dict[int, List[Tuple[int, int, int]]] = {4: [], 6: []}
+        self.network_count = 0
+        for entry in entries:
+            network = entry.network
+            group_id = group_ids.setdefault(entry.group, len(group_ids))
+            if group_id == len(self.groups):
+                self.groups.append(entry.group)
+            per_family[network.version].append(
+                (int(network.network_address), int(network.broadcast_address), group_id)
+            )
+            self.network_count += 1
+
+        self._starts: dict[int, Sequence[int]] = {}
+        self._ends: dict[int, Sequence[int]] = {}
+        self._group_ids: dict[int, Sequence[int]] = {}
+        for version, intervals in per_family.items():
+            starts, ends, ids = self._flatten(intervals)
+            if version == 4:
+                self._starts[4] = array("I", starts)
+                self._ends[4] = array("I", ends)
+            else:
+                # 128-bit values do not fit into array typecodes.
+                self._starts[6] = starts
+                self._ends[6] = ends
+            self._group_ids[version] = array("I", ids)
+
+    @staticmethod
+    def _flatten(
+        intervals: List[Tuple[int, int, int]]
+    ) -> Tuple[List[int], List[int], List[int]]:
+        """Turn nested CIDR intervals into disjoint, sorted segments.
+
+        CIDR blocks are either disjoint or nested, so a stack of the
+        enclosing blocks is enough; the innermost block wins.
+        """
+
+        starts: List[int] = []
+        ends: List[int] = []
+        ids: List[int] = []
+
+        def emit(start: int, end: int, group_id: int) -> None:
+            if start > end:
+                return
+            if ends and ends[-1] + 1 == start and ids[-1] == group_id:
+                ends[-1] = end
+                return
+            starts.append(start)
+            ends.append(end)
+            ids.append(group_id)
+
+        stack: List[Tuple[int, int]] = []
+        cursor = 0
+        for start, end, group_id in sorted(intervals, key=lambda item: (item[0], -item[1])):
+            while stack and stack[-1][0] < start:
+                top_end, top_group = stack.pop()
+                emit(cursor, top_end, top_group)
+                cursor = top_end + 1
+            if stack:
+                emit(cursor, start - 1, stack[-1][1])
+            stack.append((end, group_id))
+            cursor = start
+        while stack:
+            top_end, top_group = stack.pop()
+            emit(cursor, top_end, top_group)
+            cursor = top_end + 1
+        return starts, ends, ids
+
+    def __len__(self) -> int:
+        return self.network_count
+
+    def lookup(self, address: str) -> Tuple[bool, str] | None:
+        """Return ``(in_ipset, group)`` for ``address`` or ``None`` if invalid."""
+
+        try:
+            ip = ipaddress.ip_address(address.strip("[]"))
+        except ValueError:
+            return None
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        value = int(ip)
+        starts = self._starts[ip.version]
+        position = bisect_right(starts, value) - 1
+        if position >= 0 and value <= self._ends[ip.version][position]:
+            return True, self.groups[self._group_ids[ip.version][position]]
+        return False, ""
+
+    def tag(self, result: CurlResult) -> None:
+        """Fill :attr:`CurlResult.in_ipset` and :attr:`CurlResult.ipset_as`."""
+
+        match = self.lookup(result.remote_ip)
+        if match is not None:
+            result.in_ipset, result.ipset_as = match
+
+
+def _drop_covered(entries: Sequence[IpsetEntry]) -> List[IpsetEntry]:
+    """Remove networks contained in another network of the same family."""
+
+    kept: List[IpsetEntry] = []
+    ordered = sorted(
+        entries,
+        key=lambda item: (
+            item.network.version,
+            int(item.network.network_address),
+            -int(item.network.broadcast_address),
+        ),
+    )
+    version = 0
+    covered_until = -1
+    for entry in ordered:
+        network = entry.network
+        if network.version != version:
+            version = network.version
+            covered_until = -1
+        if int(network.broadcast_address) <= covered_until:
+            continue
+        covered_until = int(network.broadcast_address)
+        kept.append(entry)
+    return kept
+
+
+def compact_ipset(
+    entries: Sequence[IpsetEntry], keep_groups: bool = True
+) -> List[IpsetEntry]:
+    """Return a minimal list of networks covering the same addresses.
+
+    Networks covered by another one are dropped regardless of their group;
+    adjacent networks are merged into supernets.  With ``keep_groups``
+    merging only happens inside an ``# AS`` group, so the grouping of the
+    source file survives; otherwise all networks of a family are collapsed
+    together into a single unnamed group.
+    """
+
+    if not keep_groups:
+        entries = [IpsetEntry(entry.network, "") for entry in entries]
+
+    current = list(entries)
+    while True:
+        group_order = list(dict.fromkeys(entry.group for entry in current))
+        grouped: dict[Tuple[str, int], list] = {}
+        for entry in _drop_covered(current):
+            grouped.setdefault((entry.group, entry.network.version), []).append(
+                entry.network
+            )
+        compacted = [
+            IpsetEntry(network, group)
+            for group in group_order
+            for version in (4, 6)
+            for network in ipaddress.collapse_addresses(grouped.get((group, version), []))
+        ]
+        if len(compacted) == len(current):
+            return compacted
+        current = compacted
+
+
+def write_ipset(path: Path, entries: Sequence[IpsetEntry]) -> None:
+    """Write ``entries`` in the ipset file format, one ``# group`` block each."""
+
+    lines: List[str] = []
+    group: str | None = None
+    for entry in entries:
+        if entry.group != group:
+            if lines:
+                lines.append("")
+            if entry.group:
+                lines.append(f"# {entry.group}")
+            group = entry.group
+        lines.append(str(entry.network))
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+def compact_ipset_command(args: argparse.Namespace, root: Path) -> int:
+    """Entry point of the ``compact-ipset`` subcommand."""
+
+    paths: List[Path] = list(args.files) or [
+        root / name for name in IPSET_FILES if (root / name).exists()
+    ]
+    if not paths:
+        print("Не найдены ipset-файлы для сжатия.")
+        return EXIT_ERROR
+
+    for path in paths:
+        try:
+            entries = load_ipset([path])
+        except OSError as exc:
+            print(f"Не удалось прочитать {path}: {exc}")
+            return EXIT_ERROR
+        compacted = compact_ipset(entries, keep_groups=not args.ignore_groups)
+
+        if args.in_place:
+            target = path
+        else:
+            target_dir = args.output_dir or path.parent
+            target = target_dir / f"{path.stem}-compact{path.suffix}"
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            write_ipset(target, compacted)
+        except OSError as exc:
+            print(f"Не удалось записать {target}: {exc}")
+            return EXIT_ERROR
+
+        for version in (4, 6):
+            before = sum(1 for entry in entries if entry.network.version == version)
+            after = sum(1 for entry in compacted if entry.network.version == version)
+            if before:
+                print(f"{path.name}: IPv{version} {before} -> {after} сетей")
+        print(f"Записано: {target}")
+    return EXIT_SUCCESS
+
+
+# ---------------------------------------------------------------------------
+# Result cache
+# ---------------------------------------------------------------------------
+
+
+def result_cache_key(
+    strategy_text: str,
+    curl_args: Sequence[str],
+    passes: int,
+    timeout_sec: int,
+    threshold_bytes: int = OK_THRESHOLD_BYTES,
+    adaptive_passes: bool = False,
+    catalogue: TestCatalogue | None = None,
+    screen: TestCatalogue | None = None,
+    screen_min_score: float = SCREEN_MIN_PROVIDERS,
+    engine_name: str = "",
+) -> str:
+    """Return the cache key of a strategy run.
+
+    The key covers everything that influences the outcome: the canonical
+    strategy text, the curl keys of the strategy file (without keys added
+    by the network check), the compiled catalogue (``TEST_CASES`` with
+    ``timeout_sec`` and ``threshold_bytes`` by default), the screening
+    stage, the pass settings and the probe engine.
+    """
+
+    if catalogue is None:
+        catalogue = TestCatalogue.from_test_cases(TEST_CASES, timeout_sec, threshold_bytes)
+    fields = [
+        canonical_strategy_text(strategy_text),
+        list(curl_args),
+        catalogue.record(),
+        passes,
+    ]
+    if adaptive_passes:
+        fields.append("adaptive")
+    if screen is not None:
+        fields.append(["screen", screen.record(), screen_min_score])
+    if engine_name:
+        fields.append(["engine", engine_name])
+    payload = json.dumps(fields, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def outcome_record(outcome: StrategyOutcome) -> dict:
+    """Serialise the result fields of ``outcome`` for the JSONL stores."""
+
+    return {
+        "strategy": outcome.strategy.text,
+        "successes": outcome.successes,
+        "summary": outcome.summary,
+        "providers": list(outcome.providers),
+        "score": outcome.score,
+        "screened_out": outcome.screened_out,
+        "tls_times": [round(value, 4) for value in outcome.tls_times],
+        "total_times": [round(value, 4) for value in outcome.total_times],
+    }
+
+
+def outcome_from_record(record: dict, strategy: Strategy) -> StrategyOutcome:
+    """Inverse of :func:`outcome_record`."""
+
+    return StrategyOutcome(
+        successes=int(record["successes"]),
+        strategy=strategy,
+        summary=str(record["summary"]),
+        providers=tuple(record["providers"]),
+        pruned=bool(record.get("pruned", False)),
+        screened_out=bool(record.get("screened_out", False)),
+        tls_times=tuple(record.get("tls_times", ())),
+        total_times=tuple(record.get("total_times", ())),
+        score=record.get("score"),
+    )
+
+
+class ResultCache:
+    """Append-only JSONL store of finished :class:`StrategyOutcome` objects.
+
+    Every finished strategy appends one line; when the same key is stored
+    again the newest line wins.  Expired and superseded lines are dropped by
+    :meth:`compact`, which rewrites the file atomically.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_sec: float = RESULT_CACHE_TTL_SEC,
+        max_age_sec: float = RESULT_CACHE_MAX_AGE_SEC,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.max_age_sec = max_age_sec
+        self.max_entries = max_entries
+        self._entries: dict[str, dict] = {}
+        self._stale_lines = 0
+        self.hits = 0
+        self._load()
+        self._handle = self.path.open("a", encoding="utf-8")
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8", errors="ignore") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    key = record["key"]
+                    float(record["timestamp"])
+                except (ValueError, KeyError, TypeError):
+                    self._stale_lines += 1
+                    continue
+                if key in self._entries:
+                    self._stale_lines += 1
+                self._entries[key] = record
+
+    def lookup(self, key: str, strategy: Strategy) -> StrategyOutcome | None:
+        """Return the cached outcome for ``key`` if it is younger than the TTL."""
+
+        if self.ttl_sec <= 0:
+            return None
+        record = self._entries.get(key)
+        if record is None or time.time() - record["timestamp"] > self.ttl_sec:
+            return None
+        self.hits += 1
+        return outcome_from_record(record, strategy)
+
+    def store(
+        self,
+        key: str,
+        curl_args: Sequence[str],
+        outcome: StrategyOutcome,
+        test_ids: Sequence[str] = (),
+    ) -> None:
+        """Append ``outcome`` to the cache file."""
+
+        record = {
+            "key": key,
+            "timestamp": time.time(),
+            "curl_args": list(curl_args),
+            "tests": list(test_ids),
+            **outcome_record(outcome),
+        }
+        if key in self._entries:
+            self._stale_lines += 1
+        self._entries[key] = record
+        self._handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._handle.flush()
+
+    def compact(self) -> int:
+        """Evict expired/superseded entries and rewrite the file.
+
+        Entries older than ``max_age_sec`` are removed and only the newest
+        ``max_entries`` are kept.  Returns the number of evicted entries.
+        """
+
+        now = time.time()
+        fresh = [
+            record
+            for record in self._entries.values()
+            if now - record["timestamp"] <= self.max_age_sec
+        ]
+        fresh.sort(key=lambda record: record["timestamp"], reverse=True)
+        kept = fresh[: self.max_entries]
+        evicted = len(self._entries) - len(kept)
+        if not evicted and not self._stale_lines:
+            return 0
+        self._rewrite(reversed(kept))
+        return evicted
+
+    def discard(self, keys: Iterable[str]) -> None:
+        """Remove the entries of ``keys`` and rewrite the file."""
+
+        keys = set(keys) & self._entries.keys()
+        if keys:
+            self._rewrite(
+                record for key, record in self._entries.items() if key not in keys
+            )
+
+    def _rewrite(self, records: Iterable[dict]) -> None:
+        """Replace the file and the entries with ``records``, oldest first."""
+
+        records = list(records)
+        self._handle.close()
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with temp_path.open("w", encoding="utf-8") as handle:
+            for record in records:
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.path)
+        self._entries = {record["key"]: record for record in records}
+        self._stale_lines = 0
+        self._handle = self.path.open("a", encoding="utf-8")
+
+    def close(self) -> None:
+        try:
+            self.compact()
+        finally:
+            self._handle.close()
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+
+
+def sweep_fingerprint(
+    strategy_paths: Sequence[Path],
+    curl_args: Sequence[Sequence[str]],
+    settings: SweepSettings,
+) -> str:
+    """Identify a sweep by its strategy files, checks and pass settings."""
+
+    digest = hashlib.sha256()
+    for path in strategy_paths:
+        digest.update(path.read_bytes())
+        digest.update(b"\0")
+    payload = [
+        [list(args) for args in curl_args],
+        settings.catalogue.record(),
+        settings.screen.record() if settings.screen is not None else None,
+        settings.screen_min_score,
+        settings.passes,
+        settings.prune,
+        settings.adaptive_passes,
+    ]
+    digest.update(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SweepCheckpoint:
+    """Crash-safe record of the finished strategies of a sweep.
+
+    Finished outcomes are appended to ``<path>l`` (a JSONL log).  After
+    every outcome the small state file ``path`` is replaced atomically; it
+    holds the number of valid log lines and the size of the probe log at
+    that moment.  A crash at any point therefore leaves a consistent
+    checkpoint: log lines and probes written after the last state are
+    discarded on resume and the affected strategies run again.
+    """
+
+    def __init__(self, path: Path, fingerprint: str):
+        self.path = path
+        self.log_path = path.with_name(path.name + "l")
+        self.fingerprint = fingerprint
+        self.state: dict = {}
+        self._handle: TextIO | None = None
+
+    def load(self) -> bool:
+        """Read an existing checkpoint of the same sweep."""
+
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if state.get("fingerprint") != self.fingerprint:
+            return False
+        self.state = state
+        return True
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def restore(self) -> List[Tuple[str, StrategyOutcome]]:
+        """Return ``(cache key, outcome)`` of every checkpointed strategy."""
+
+        restored: List[Tuple[str, StrategyOutcome]] = []
+        count = int(self.state.get("completed", 0))
+        with self.log_path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if len(restored) >= count:
+                    break
+                record = json.loads(line)
+                strategy = Strategy(index=int(record["index"]), text=record["strategy"])
+                restored.append((record["key"], outcome_from_record(record, strategy)))
+        return restored
+
+    def start(self, probes_path: Path | None, summary_path: Path | None) -> None:
+        """Begin a fresh checkpoint or continue the loaded one."""
+
+        completed = int(self.state.get("completed", 0))
+        self.state = {
+            "fingerprint": self.fingerprint,
+            "probes_path": str(probes_path) if probes_path else None,
+            "summary_path": str(summary_path) if summary_path else None,
+            "probes_size": int(self.state.get("probes_size", 0)),
+            "completed": completed,
+        }
+        if completed:
+            # Drop log lines that were written after the last state update.
+            with self.log_path.open("r", encoding="utf-8") as handle:
+                valid = [line for _, line in zip(range(completed), handle)]
+            self._replace(self.log_path, "".join(valid))
+            self.state["completed"] = len(valid)
+        self._handle = self.log_path.open("a" if completed else "w", encoding="utf-8")
+        self._save()
+
+    def record(self, key: str, outcome: StrategyOutcome, probes_size: int) -> None:
+        """Checkpoint one finished strategy."""
+
+        record = {
+            "key": key,
+            "index": outcome.strategy.index,
+            "pruned": outcome.pruned,
+            **outcome_record(outcome),
+        }
+        self._handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self.state["completed"] += 1
+        self.state["probes_size"] = probes_size
+        self._save()
+
+    def discard(self, keys: Iterable[str]) -> None:
+        """Drop the checkpointed strategies of ``keys`` so they run again on resume.
+
+        The log is rewritten before the state, so a crash in between leaves
+        a count that still covers every remaining line.
+        """
+
+        keys = set(keys)
+        self._handle.close()
+        with self.log_path.open("r", encoding="utf-8") as handle:
+            lines = [line for _, line in zip(range(self.state["completed"]), handle)]
+        kept = [line for line in lines if json.loads(line)["key"] not in keys]
+        self._replace(self.log_path, "".join(kept))
+        self._handle = self.log_path.open("a", encoding="utf-8")
+        self.state["completed"] = len(kept)
+        self._save()
+
+    def _save(self) -> None:
+        self._replace(self.path, json.dumps(self.state, ensure_ascii=False))
+
+    @staticmethod
+    def _replace(path: Path, text: str) -> None:
+        temp_path = path.with_name(path.name + ".tmp")
+        with temp_path.open("w", encoding="utf-8") as handle:
+            handle.write(text)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def remove(self) -> None:
+        """Delete the checkpoint after the sweep finished."""
+
+        self.close()
+        for path in (self.path, self.log_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# Structured output
+# ---------------------------------------------------------------------------
+
+
+PROBE_RECORD_FIELDS: Tuple[str, ...] = (
+    "timestamp",
+    "strategy_index",
+    "strategy",
+    "pass",
+    "test_id",
+    "provider",
+    "attempt",
+    "status",
+    "bytes",
+    "http_code",
+    "range_honoured",
+    "stopped_early",
+    "remote_ip",
+    "error",
+    "in_ipset",
+    "ipset_as",
+    "time_namelookup",
+    "time_connect",
+    "time_appconnect",
+    "time_starttransfer",
+    "time_total",
+)
+
+SUMMARY_RECORD_FIELDS: Tuple[str, ...] = (
+    "strategy_index",
+    "strategy",
+    "successes",
+    "total_checks",
+    "provider_count",
+    "providers",
+    "score",
+    "summary",
+    "pruned",
+    "screened_out",
+    "tls_p50",
+    "tls_p90",
+    "total_p50",
+    "total_p90",
+)
+
+
+class _RecordWriter:
+    """Append records to a JSONL or, for ``.csv`` paths, a CSV file.
+
+    Writes are serialised with a lock: with ``--instances`` several
+    strategies report their probes at the same time.
+    """
+
+    def __init__(self, path: Path, fields: Sequence[str], resume_size: int | None = None):
+        self.path = path
+        if resume_size is not None and path.exists():
+            # Continue an interrupted sweep: drop whatever was written after
+            # the checkpoint and append from there.
+            with path.open("r+b") as handle:
+                handle.truncate(resume_size)
+        else:
+            resume_size = None
+        self._handle = path.open(
+            "a" if resume_size is not None else "w", encoding="utf-8", newline=""
+        )
+        self._lock = threading.Lock()
+        self._csv: csv.DictWriter | None = None
+        if path.suffix.lower() == ".csv":
+            self._csv = csv.DictWriter(self._handle, fieldnames=list(fields))
+            if not resume_size:
+                self._csv.writeheader()
+
+    def write(self, record: dict) -> None:
+        if self._csv is not None:
+            row = {
+                key: ";".join(value) if isinstance(value, list) else value
+                for key, value in record.items()
+            }
+            with self._lock:
+                self._csv.writerow(row)
+                self._handle.flush()
+        else:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            with self._lock:
+                self._handle.write(line)
+                self._handle.flush()
+
+    def size(self) -> int:
+        """Number of bytes written so far."""
+
+        with self._lock:
+            return self._handle.tell()
+
+    def close(self) -> None:
+        with self._lock:
+            self._handle.close()
+
+
+def write_summary_file(
+    path: Path, results: Sequence[StrategyOutcome], total_checks: int
+) -> None:
+    """Store one summary record per strategy in ``path`` (.jsonl/.csv)."""
+
+    writer = _RecordWriter(path, SUMMARY_RECORD_FIELDS)
+    try:
+        for outcome in results:
+            writer.write(
+                {
+                    "strategy_index": outcome.strategy.index,
+                    "strategy": outcome.strategy.text,
+                    "successes": outcome.successes,
+                    "total_checks": total_checks,
+                    "provider_count": outcome.provider_count,
+                    "providers": list(outcome.providers),
+                    "score": outcome.score,
+                    "summary": outcome.summary,
+                    "pruned": outcome.pruned,
+                    "screened_out": outcome.screened_out,
+                    "tls_p50": round(outcome.tls_latency[0], 6),
+                    "tls_p90": round(outcome.tls_latency[1], 6),
+                    "total_p50": round(outcome.total_latency[0], 6),
+                    "total_p90": round(outcome.total_latency[1], 6),
+                }
+            )
+    finally:
+        writer.close()
+
+
+class StructuredResultSink:
+    """Machine-readable mirror of the sweep next to the text log.
+
+    Every finished check is appended to ``probes_path`` as soon as it
+    completes; :meth:`write_summary` stores one record per strategy in
+    ``summary_path``.  ``resume_size`` continues an existing probe log,
+    truncated to that many bytes.
+    """
+
+    def __init__(
+        self, probes_path: Path, summary_path: Path, resume_size: int | None = None
+    ):
+        self.probes_path = probes_path
+        self.summary_path = summary_path
+        self._probes = _RecordWriter(probes_path, PROBE_RECORD_FIELDS, resume_size)
+
+    def probes_size(self) -> int:
+        return self._probes.size()
+
+    def record_probe(
+        self,
+        strategy: Strategy,
+        current_pass: int,
+        test_id: str,
+        provider: str,
+        attempt: int,
+        result: CurlResult,
+    ) -> None:
+        timings = result.timings
+        self._probes.write(
+            {
+                "timestamp": round(time.time(), 3),
+                "strategy_index": strategy.index,
+                "strategy": strategy.text,
+                "pass": current_pass,
+                "test_id": test_id,
+                "provider": provider,
+                "attempt": attempt,
+                "status": result.status,
+                "bytes": result.bytes_downloaded,
+                "http_code": result.http_code,
+                "range_honoured": result.range_honoured,
+                "stopped_early": result.stopped_early,
+                "remote_ip": result.remote_ip,
+                "error": result.error_message,
+                "in_ipset": result.in_ipset,
+                "ipset_as": result.ipset_as,
+                "time_namelookup": round(timings.namelookup, 6),
+                "time_connect": round(timings.connect, 6),
+                "time_appconnect": round(timings.appconnect, 6),
+                "time_starttransfer": round(timings.starttransfer, 6),
+                "time_total": round(timings.total, 6),
+            }
+        )
+
+    def write_summary(self, results: Sequence[StrategyOutcome], total_checks: int) -> None:
+        write_summary_file(self.summary_path, results, total_checks)
+
+    def close(self) -> None:
+        self._probes.close()
+
+
+def check_network(
+    curl_path: Path, curl_extra_args: List[str], url: str | None = None
+) -> bool:
+    """Replicate the pre-flight network check from GoodCheck.cmd.
+
+    Returns whether ``url`` (``NETWORK_TEST_URL`` by default) was reachable.
+    """
+
+    if url is None:
+        url = NETWORK_TEST_URL
+    base_command = [
         str(curl_path),
         *curl_extra_args,
         "--silent",
@@ -700,12 +3646,12 @@ def check_network(curl_path: Path, curl_extra_args: List[str]) -> None:
         str(CURL_MIN_TIMEOUT),
         "--output",
         os.devnull,
-        NETWORK_TEST_URL,
+        url,
     ]
 
     result = subprocess.run(base_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     if result.returncode == 0:
-        return
+        return True
 
     print("Предупреждение: HTTPS проверка не удалась, повторная попытка с --insecure.")
     insecure_command = base_command.copy()
@@ -720,37 +3666,732 @@ def check_network(curl_path: Path, curl_extra_args: List[str]) -> None:
             "Предупреждение: сетевой тест не пройден. Проверки могут завершиться "
             "со статусом DETECTED/FAIL до устранения проблем с подключением."
         )
-    elif "--insecure" not in curl_extra_args:
+        return False
+    if "--insecure" not in curl_extra_args:
         curl_extra_args.append("--insecure")
+    return True
+
+
+class NetworkMonitor:
+    """Re-check ``url`` (``NETWORK_TEST_URL`` by default) during the sweep.
+
+    A check runs after a strategy without working providers and otherwise
+    at most every ``interval_sec``.  It goes through the probe engine from
+    the main thread, while no exclusive winws is running, so it sees the
+    plain uplink.  When two probes in a row fail the sweep is paused until
+    the target answers again.  The outage is taken to span from the last
+    good check to the recovery.  Strategies that ran during it are reported
+    by :meth:`affected` while they finish and, if they were already
+    recorded with :meth:`remember`, by :meth:`take_affected`.
+
+    ``clock`` and ``sleep`` default to :func:`time.monotonic` and
+    :func:`time.sleep`.
+    """
 
+    def __init__(
+        self,
+        interval_sec: float = HEALTH_CHECK_INTERVAL_SEC,
+        url: str | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.interval_sec = interval_sec
+        self.url = url if url is not None else NETWORK_TEST_URL
+        self.outages: List[Tuple[float, float]] = []
+        self._clock = clock
+        self._sleep = sleep
+        self._last_ok = clock()
+        self._last_check = self._last_ok
+        self._runs: dict[int, Tuple[float, float]] = {}
+
+    def due(self, outcome: StrategyOutcome) -> bool:
+        return (
+            outcome.provider_count == 0
+            or self._clock() - self._last_check >= self.interval_sec
+        )
+
+    def _reachable(self, engine: ProbeEngine) -> bool:
+        for _ in range(2):
+            result = engine.submit(self.url, CURL_MIN_TIMEOUT, 1).result()
+            if result.status in ("OK", "WARN"):
+                return True
+        return False
+
+    def check(self, engine: ProbeEngine) -> bool:
+        """Probe the baseline target, waiting out an outage.
+
+        Returns ``False`` when an outage was detected.
+        """
+
+        self._last_check = self._clock()
+        if self._reachable(engine):
+            self._last_ok = self._last_check
+            return True
+        print(
+            f"\nСеть недоступна ({self.url} не отвечает), проверка "
+            "стратегий приостановлена."
+        )
+        while True:
+            self._sleep(HEALTH_RETRY_SEC)
+            if self._reachable(engine):
+                break
+        recovered = self._clock()
+        self.outages.append((self._last_ok, recovered))
+        print(
+            f"Сеть снова доступна, перерыв {recovered - self._last_ok:.0f} с. "
+            "Стратегии, проверявшиеся в это время, будут перепроверены."
+        )
+        self._last_ok = self._last_check = recovered
+        return False
+
+    def affected(self, started: float, finished: float) -> bool:
+        """Whether a strategy run between ``started`` and ``finished`` overlaps an outage."""
+
+        return any(started < end and finished > begin for begin, end in self.outages)
+
+    def remember(self, index: int, started: float, finished: float) -> None:
+        """Keep the run of recorded strategy ``index`` for :meth:`take_affected`."""
+
+        self._runs[index] = (started, finished)
+
+    def take_affected(self) -> List[int]:
+        """Forget and return the remembered strategies whose run overlaps an outage."""
+
+        indexes = [index for index, run in self._runs.items() if self.affected(*run)]
+        for index in indexes:
+            del self._runs[index]
+        return indexes
 
-def summarise_results(results: List[StrategyOutcome], total_checks: int) -> None:
-    """Print a grouped summary mirroring the batch script output."""
+    @property
+    def lost_sec(self) -> float:
+        return sum(end - begin for begin, end in self.outages)
+
+
+def summarise_results(
+    results: Sequence[StrategyOutcome], stream: TextIO | None = None
+) -> None:
+    """Print the strategies grouped by the number of successful checks.
+
+    The results are grouped in a single pass and every strategy gets its own
+    line, so the report is written out incrementally instead of as one
+    joined line per group.
+    """
 
     if not results:
         return
 
-    print("\nСводка по количеству успешных тестов:")
-    for successes in range(total_checks + 1):
-        matching = [
-            f"{item.strategy.text} ({item.summary})"
-            for item in results
-            if item.successes == successes
-        ]
-        if matching:
-            joined = " ".join(matching)
-            print(f"{successes} успехов - Стратегии: {joined}")
+    groups: dict[int, List[StrategyOutcome]] = {}
+    for item in results:
+        groups.setdefault(item.successes, []).append(item)
+
+    write = (stream or sys.stdout).write
+    write("\nСводка по количеству успешных тестов:\n")
+    for successes in sorted(groups):
+        group = groups[successes]
+        write(f"{successes} успехов - Стратегии ({len(group)}):\n")
+        for item in group:
+            write(f"  {item.strategy.text} ({item.summary}; {item.latency_text()})\n")
+
+
+def rank_key(outcome: StrategyOutcome) -> Tuple[float, int, bool, int, float]:
+    """Sort key: higher weighted provider score, more providers, full suite
+    before screening-only results, then more successes, then lower p50 time."""
+
+    return (
+        outcome.score,
+        outcome.provider_count,
+        not outcome.screened_out,
+        outcome.successes,
+        -outcome.total_latency[0] if outcome.total_times else -float("inf"),
+    )
+
+
+def rank_results(results: Sequence[StrategyOutcome]) -> List[StrategyOutcome]:
+    """Order outcomes from worst to best by providers, successes and latency."""
+
+    return sorted(results, key=rank_key)
+
+
+def best_results(
+    results: Sequence[StrategyOutcome], limit: int = BEST_STRATEGIES_LIMIT
+) -> Tuple[List[StrategyOutcome], int]:
+    """Select the top ``limit`` outcomes with the highest provider score.
+
+    The score is the provider count unless the catalogue weighs providers.
+    Returns the selection, best first, and the number of further outcomes
+    with the same score that were left out.
+    """
+
+    if not results:
+        return [], 0
+    leader_score = max(outcome.score for outcome in results)
+    leaders = [outcome for outcome in results if outcome.score == leader_score]
+    return heapq.nlargest(limit, leaders, key=rank_key), max(0, len(leaders) - limit)
+
+
+def max_provider_count(results: Iterable[StrategyOutcome]) -> int:
+    """Return the most providers reached by a strategy on the full suite.
+
+    Outcomes rejected by the screening stage only ran the quick checks and
+    are left out; ``-1`` when no strategy completed the suite.
+    """
+
+    return max(
+        (outcome.provider_count for outcome in results if not outcome.screened_out),
+        default=-1,
+    )
+
+
+def print_report(results: Sequence[StrategyOutcome], top: int = BEST_STRATEGIES_LIMIT) -> None:
+    """Print the best strategies and the full ranking of ``results``."""
+
+    if not results:
+        return
+    best, omitted = best_results(results, top)
+    print("\nЛучшие стратегии (по числу рабочих провайдеров):")
+    for outcome in best:
+        providers_line = ", ".join(outcome.providers)
+        print(
+            f"* {outcome.strategy.text} - {outcome.provider_count} провайдеров "
+            f"({providers_line}) -> {outcome.summary}; {outcome.latency_text()}"
+        )
+    if omitted:
+        print(f"... и ещё {omitted} стратегий с тем же числом провайдеров")
+
+    print(
+        "\nРейтинг стратегий по рабочим провайдерам и задержке "
+        "(от худших к лучшим):"
+    )
+    write = sys.stdout.write
+    for outcome in rank_results(results):
+        write(
+            f"* {outcome.strategy.text} - {outcome.provider_count} провайдеров "
+            f"({', '.join(outcome.providers)}); {outcome.latency_text()}\n"
+        )
+
+
+def positive_int(value: str) -> int:
+    """argparse type for strictly positive integers."""
+
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается целое число: {value}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"ожидается положительное число: {value}")
+    return number
+
+
+def add_sweep_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options that define the checks and the ranking of a sweep.
+
+    Shared with the coordinator of ``GoodCheckDistributed.py``.
+    """
+
+    parser.add_argument(
+        "--adaptive-passes",
+        action="store_true",
+        default=ADAPTIVE_PASSES,
+        help="останавливать прогоны стратегии, как только результат по "
+        "провайдерам статистически устойчив",
+    )
+    parser.add_argument(
+        "--timeout-ms",
+        type=positive_int,
+        default=TCP_TIMEOUT_MS,
+        help=f"таймаут одной проверки, мс (по умолчанию {TCP_TIMEOUT_MS})",
+    )
+    parser.add_argument(
+        "--threshold-bytes",
+        type=positive_int,
+        default=OK_THRESHOLD_BYTES,
+        help=f"порог успешного скачивания, байт (по умолчанию {OK_THRESHOLD_BYTES})",
+    )
+    parser.add_argument(
+        "--tests",
+        type=Path,
+        metavar="FILE",
+        help="каталог HTTP-проверок (.toml/.json) вместо встроенного: таймауты, "
+        "пороги, повторы и веса провайдеров для каждого теста",
+    )
+    parser.add_argument(
+        "--screen",
+        action="store_true",
+        help="двухэтапная проверка: сначала по одной быстрой проверке на провайдера, "
+        "полный набор - только для прошедших отбор",
+    )
+    parser.add_argument(
+        "--screen-tests",
+        type=Path,
+        metavar="FILE",
+        help="каталог проверок первого этапа (включает --screen; по умолчанию "
+        "первый тест каждого провайдера)",
+    )
+    parser.add_argument(
+        "--screen-timeout-ms",
+        type=positive_int,
+        default=SCREEN_TIMEOUT_MS,
+        help=f"таймаут проверок первого этапа, мс (по умолчанию {SCREEN_TIMEOUT_MS})",
+    )
+    parser.add_argument(
+        "--screen-min-providers",
+        type=positive_int,
+        default=SCREEN_MIN_PROVIDERS,
+        help="сколько провайдеров должно работать на первом этапе для полной "
+        f"проверки (по умолчанию {SCREEN_MIN_PROVIDERS})",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        default=PRUNE_STRATEGIES,
+        help="прерывать стратегии, которые не могут превзойти лидера",
+    )
+    parser.add_argument(
+        "--min-providers",
+        type=positive_int,
+        default=1,
+        help="минимальное число рабочих провайдеров для кода выхода 0",
+    )
+    parser.add_argument(
+        "--top",
+        type=positive_int,
+        default=BEST_STRATEGIES_LIMIT,
+        help="сколько лучших стратегий показать в итогах "
+        f"(по умолчанию {BEST_STRATEGIES_LIMIT})",
+    )
+
+
+def add_probe_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of the machine that runs winws and the checks.
+
+    Shared with the worker of ``GoodCheckDistributed.py``.
+    """
+
+    parser.add_argument(
+        "--engine",
+        choices=PROBE_ENGINES,
+        default=PROBE_ENGINE,
+        help="движок HTTP-проверок",
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=PROBE_WORKERS,
+        help=f"число одновременных проверок (по умолчанию {PROBE_WORKERS})",
+    )
+    parser.add_argument(
+        "--adaptive-workers",
+        action="store_true",
+        help="подстраивать число одновременных проверок под таймауты и пропускную способность",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=positive_int,
+        default=PROBE_MAX_WORKERS,
+        help=f"верхняя граница адаптивного режима (по умолчанию {PROBE_MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--full-transfer",
+        dest="early_stop",
+        action="store_false",
+        default=PROBE_EARLY_STOP,
+        help="дочитывать ответ до конца, а не останавливать проверку при достижении порога",
+    )
+    parser.add_argument("--curl", type=Path, help="путь до curl.exe")
+    parser.add_argument(
+        "--ipset",
+        type=Path,
+        nargs="*",
+        metavar="FILE",
+        help=(
+            "ipset-файлы для пометки адресов проверок (по умолчанию "
+            f"{', '.join(IPSET_FILES)} рядом со скриптом; без значений - отключить)"
+        ),
+    )
+    parser.add_argument(
+        "--instances",
+        type=positive_int,
+        default=PARALLEL_INSTANCES,
+        help="число стратегий, проверяемых одновременно отдельными копиями winws "
+        f"(по умолчанию {PARALLEL_INSTANCES})",
+    )
+    parser.add_argument(
+        "--health-interval",
+        type=float,
+        default=HEALTH_CHECK_INTERVAL_SEC,
+        help="как часто между стратегиями проверять доступность сети, с "
+        f"(по умолчанию {HEALTH_CHECK_INTERVAL_SEC:g}; 0 - не проверять)",
+    )
+    parser.add_argument(
+        "--dns-ttl",
+        type=float,
+        default=DNS_CACHE_TTL_SEC,
+        help="сколько секунд использовать адреса хостов проверок без повторного "
+        f"запроса DNS (по умолчанию {DNS_CACHE_TTL_SEC}; 0 - определять при каждой проверке)",
+    )
+    parser.add_argument(
+        "--ready-timeout",
+        type=float,
+        default=WINWS_READY_TIMEOUT_SEC,
+        help="максимальное ожидание готовности winws, с",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        help="каталог для лога и файлов результатов (по умолчанию каталог скрипта)",
+    )
+    parser.add_argument("--probes-out", type=Path, help="файл результатов проверок (.jsonl/.csv)")
+
+
+def parse_arguments(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    """Parse command line options; missing paths are prompted for later."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Проверка стратегий zapret. Параметры, не указанные в командной "
+            "строке, запрашиваются интерактивно (кроме режима --batch)."
+        ),
+    )
+    parser.add_argument("--winws", type=Path, help="путь до winws.exe")
+    parser.add_argument(
+        "-s",
+        "--strategies",
+        type=Path,
+        nargs="+",
+        metavar="FILE",
+        help="один или несколько файлов стратегий",
+    )
+    parser.add_argument(
+        "-p",
+        "--passes",
+        type=int,
+        choices=range(1, 10),
+        metavar="1-9",
+        help="количество прогонов на стратегию (с --adaptive-passes - максимум)",
+    )
+    add_sweep_arguments(parser)
+    add_probe_arguments(parser)
+    parser.add_argument("--summary-out", type=Path, help="файл сводки по стратегиям (.jsonl/.csv)")
+    parser.add_argument("--cache-file", type=Path, help="файл кэша результатов")
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=RESULT_CACHE_TTL_SEC,
+        help="не перепроверять стратегии с результатом моложе N секунд",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="продолжить прерванную проверку с того же набора стратегий и параметров",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="не задавать вопросов; недостающие параметры считаются ошибкой",
+    )
+
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    compact = commands.add_parser(
+        "compact-ipset",
+        help="объединить вложенные и соседние сети в ipset-файлах",
+        description=(
+            "Убирает сети, покрытые другими, и объединяет соседние сети внутри "
+            "групп # AS. Результат пишется в <имя>-compact.txt."
+        ),
+    )
+    compact.add_argument(
+        "files",
+        type=Path,
+        nargs="*",
+        help=f"ipset-файлы (по умолчанию {', '.join(IPSET_FILES)} рядом со скриптом)",
+    )
+    compact.add_argument("--output-dir", type=Path, help="каталог для сжатых файлов")
+    compact.add_argument("--in-place", action="store_true", help="перезаписать исходные файлы")
+    compact.add_argument(
+        "--ignore-groups",
+        action="store_true",
+        help="объединять сети разных групп # AS (группы в результате не сохраняются)",
+    )
+    return parser.parse_args(argv)
+
+
+class PassTally:
+    """Per-provider success counts across the passes of one strategy.
+
+    A provider counts as working in a pass when at least one of its checks
+    succeeded.  Used by the adaptive pass mode to decide whether another
+    pass can still change the verdict.
+    """
+
+    def __init__(self, catalogue: TestCatalogue) -> None:
+        self.catalogue = catalogue
+        self.passes = 0
+        self.ok_checks = 0
+        self.wins = dict.fromkeys(catalogue.providers, 0)
+
+    def add(self, suite: SuiteResult) -> None:
+        self.passes += 1
+        self.ok_checks += suite.ok
+        for provider in suite.providers:
+            self.wins[provider] = self.wins.get(provider, 0) + 1
+
+    def _verdict(self, provider: str) -> bool | None:
+        """True/False once the provider is settled, otherwise None."""
+
+        low, high = wilson_interval(self.wins[provider], self.passes)
+        if low > ADAPTIVE_DECISION_RATE:
+            return True
+        if high < ADAPTIVE_DECISION_RATE:
+            return False
+        return None
+
+    def stop_reason(self, leader_score: float = -1) -> str | None:
+        """Explain why further passes cannot change the result, if so.
+
+        A negative ``leader_score`` leaves the leader out of the decision,
+        as ``run_test_suite`` does with ``prune_below``.
+        """
+
+        verdicts = {provider: self._verdict(provider) for provider in self.wins}
+        if None not in verdicts.values():
+            return "результат по всем провайдерам устойчив"
+        reachable = self.catalogue.score(
+            provider for provider, verdict in verdicts.items() if verdict is not False
+        )
+        if leader_score >= 0 and reachable < leader_score:
+            return f"не может догнать лидера ({leader_score:g} провайдеров)"
+        return None
+
+    def providers(self) -> Tuple[str, ...]:
+        """Providers that worked in at least the decision share of passes."""
+
+        return tuple(
+            sorted(
+                provider
+                for provider, wins in self.wins.items()
+                if self.passes and wins / self.passes >= ADAPTIVE_DECISION_RATE
+            )
+        )
+
+    def summary(self, total_checks: int) -> str:
+        rates = ", ".join(
+            f"{provider} {wins}/{self.passes}" for provider, wins in self.wins.items()
+        )
+        average = self.ok_checks / self.passes if self.passes else 0.0
+        return (
+            f"прогонов: {self.passes}, в среднем OK {average:.1f}/{total_checks}, "
+            f"провайдеры по прогонам: {rates}"
+        )
+
+
+def screen_strategy(
+    settings: SweepSettings,
+    strategy: Strategy,
+    engine: ProbeEngine,
+    sink: StructuredResultSink | None = None,
+    source_ports: Tuple[int, int] | None = None,
+) -> StrategyOutcome | None:
+    """Run the screening stage of ``strategy`` under an already started winws.
+
+    Returns the outcome of a rejected strategy, or ``None`` when it cleared
+    ``settings.screen_min_score`` and deserves the full passes.  The checks
+    stop as soon as the bar is out of reach; their probe records carry
+    pass 0.
+    """
+
+    screen = settings.screen
+    assert screen is not None
+    print(f"\nОтбор: {screen.total_checks} быстрых проверок")
+    suite = run_test_suite(
+        engine=engine,
+        timeout_sec=settings.timeout_sec,
+        prune_below=settings.screen_min_score,
+        on_result=partial(sink.record_probe, strategy, 0) if sink is not None else None,
+        threshold_bytes=settings.threshold_bytes,
+        ipset_index=settings.ipset_index,
+        source_ports=source_ports,
+        catalogue=screen,
+    )
+    score = screen.score(suite.providers)
+    print(
+        f"Результат отбора: {suite.ok}/{screen.total_checks} ({suite.summary}), "
+        f"провайдеры: ({', '.join(suite.providers)})"
+    )
+    if score >= settings.screen_min_score:
+        return None
+    print(
+        f"Стратегия не прошла отбор (нужно провайдеров: {settings.screen_min_score:g}), "
+        "полная проверка пропущена."
+    )
+    return StrategyOutcome(
+        successes=suite.ok,
+        strategy=strategy,
+        summary=f"отбор: {suite.summary}",
+        providers=suite.providers,
+        tls_times=suite.tls_times,
+        total_times=suite.total_times,
+        screened_out=True,
+        score=score,
+    )
+
+
+def evaluate_strategy(
+    settings: SweepSettings,
+    strategy: Strategy,
+    engine: ProbeEngine,
+    total_checks: int,
+    leader_score: float = -1,
+    sink: StructuredResultSink | None = None,
+    source_ports: Tuple[int, int] | None = None,
+) -> StrategyOutcome | None:
+    """Run every pass of ``strategy`` under winws and aggregate the best one.
+
+    With a screening stage configured the strategy first has to clear it in
+    the same winws session, otherwise its screening outcome is returned.
+    Returns ``None`` when winws could not be started.  ``leader_score`` is
+    the provider score of the current leader, used by pruning.  With
+    ``source_ports`` set winws and the checks share that local port range and
+    other instances are left running.
+    """
+
+    winws_path = settings.winws_path
+    exclusive = source_ports is None
+    arguments = None
+    if source_ports is not None:
+        arguments = isolate_strategy(strategy.split_arguments(), source_ports)
+    process: subprocess.Popen | None = None
+    try:
+        process = start_winws(winws_path, strategy, arguments)
+        if not wait_winws_ready(process, settings.ready_timeout_sec):
+            print(
+                "Предупреждение: winws не сообщил о готовности за "
+                f"{settings.ready_timeout_sec:g} с, проверки запускаются без подтверждения."
+            )
+    except Exception as exc:
+        print(f"Не удалось запустить winws.exe: {exc}")
+        terminate_winws(process, winws_path, exclusive)
+        return None
+
+    catalogue = settings.catalogue
+    best_ok = -1
+    best_summary = "Нет данных"
+    best_providers: Tuple[str, ...] = tuple()
+    best_score = -1.0
+    pruned = False
+    tls_times: List[float] = []
+    total_times: List[float] = []
+    tally = PassTally(catalogue)
+
+    try:
+        if settings.screen is not None:
+            rejected = screen_strategy(settings, strategy, engine, sink, source_ports)
+            if rejected is not None:
+                return rejected
+        for current_pass in range(1, settings.passes + 1):
+            print(f"\nПрогон {current_pass} из {settings.passes}")
+            suite = run_test_suite(
+                engine=engine,
+                timeout_sec=settings.timeout_sec,
+                prune_below=leader_score if settings.prune else -1,
+                on_result=(
+                    partial(sink.record_probe, strategy, current_pass)
+                    if sink is not None
+                    else None
+                ),
+                threshold_bytes=settings.threshold_bytes,
+                ipset_index=settings.ipset_index,
+                source_ports=source_ports,
+                catalogue=catalogue,
+            )
+            pass_ok, summary, providers = suite.ok, suite.summary, suite.providers
+            tls_times.extend(suite.tls_times)
+            total_times.extend(suite.total_times)
+            providers_line = ", ".join(providers)
+            if providers_line:
+                providers_text = providers_line
+            else:
+                providers_text = ""
+            print(
+                f"Результат прогона: {pass_ok}/{total_checks} ({summary}), "
+                f"провайдеры: ({providers_text})"
+            )
+            tally.add(suite)
+            score = catalogue.score(providers)
+            if (
+                score > best_score
+                or (
+                    score == best_score
+                    and pass_ok > best_ok
+                )
+            ):
+                best_ok = pass_ok
+                best_summary = summary
+                best_providers = providers
+                best_score = score
+            if suite.aborted:
+                print(
+                    "Стратегия не может превзойти лидера "
+                    f"({leader_score:g} провайдеров), оставшиеся "
+                    "проверки и прогоны отменены."
+                )
+                pruned = True
+                break
+            if settings.adaptive_passes and current_pass < settings.passes:
+                reason = tally.stop_reason(leader_score if settings.prune else -1)
+                if reason is not None:
+                    print(
+                        f"Прогоны остановлены после {current_pass}: {reason}."
+                    )
+                    break
+    finally:
+        terminate_winws(process, winws_path, exclusive)
+
+    if best_score < 0:
+        return None
+    if settings.adaptive_passes:
+        providers = tally.providers()
+        return StrategyOutcome(
+            successes=round(tally.ok_checks / tally.passes),
+            strategy=strategy,
+            summary=tally.summary(total_checks),
+            providers=providers,
+            pruned=pruned,
+            tls_times=tuple(tls_times),
+            total_times=tuple(total_times),
+            score=catalogue.score(providers),
+        )
+    return StrategyOutcome(
+        successes=best_ok,
+        strategy=strategy,
+        summary=best_summary,
+        providers=best_providers,
+        pruned=pruned,
+        tls_times=tuple(tls_times),
+        total_times=tuple(total_times),
+        score=best_score,
+    )
 
 
-def main() -> int:
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_arguments(argv)
     root = Path(__file__).resolve().parent
+    if args.command == "compact-ipset":
+        return compact_ipset_command(args, root)
+    output_dir = (args.output_dir or root).resolve()
+    interactive = not args.batch and sys.stdin.isatty()
 
     try:
-        log_path, restore_logging = setup_file_logging(root)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        log_path, restore_logging = setup_file_logging(output_dir)
     except OSError as exc:  # pragma: no cover - log path error is rare
         print(f"Не удалось создать лог-файл: {exc}")
-        return 1
+        return EXIT_ERROR
 
+    engines: dict[Tuple[str, ...], ProbeEngine] = {}
+    cache: ResultCache | None = None
+    sink: StructuredResultSink | None = None
+    scheduler: StrategyScheduler | None = None
+    checkpoint: SweepCheckpoint | None = None
     try:
         print("==============================")
         print("GoodCheck Python")
@@ -758,125 +4399,452 @@ def main() -> int:
 
         print(f"Лог-файл: {log_path.name}")
 
-        winws_path = prompt_path("Введите путь до winws.exe: ")
-        strategy_path = prompt_path("Введите путь до файла стратегий (.txt): ")
-
-        try:
-            strategies, strategy_curl_extra = load_strategies(strategy_path)
-        except Exception as exc:  # pragma: no cover - interactive error path
-            print(f"Ошибка при чтении стратегий: {exc}")
-            return 1
+        winws_path = args.winws
+        if winws_path is None and interactive:
+            winws_path = prompt_path("Введите путь до winws.exe: ")
+        strategy_paths: List[Path] = list(args.strategies or [])
+        if not strategy_paths and interactive:
+            strategy_paths.append(prompt_path("Введите путь до файла стратегий (.txt): "))
+        if winws_path is None or not strategy_paths:
+            print("Не указаны пути до winws.exe (--winws) и/или файла стратегий (--strategies).")
+            return EXIT_ERROR
+        for path in (winws_path, *strategy_paths):
+            if not path.exists():
+                print(f"Файл или каталог не найден: {path}")
+                return EXIT_ERROR
+
+        sources: List[Tuple[Path, StrategySource, List[str]]] = []
+        for strategy_path in strategy_paths:
+            try:
+                source, strategy_curl_extra = load_strategies(strategy_path)
+            except Exception as exc:  # pragma: no cover - interactive error path
+                print(f"Ошибка при чтении стратегий ({strategy_path}): {exc}")
+                return EXIT_ERROR
+            sources.append((strategy_path, source, strategy_curl_extra))
+        # The sweep is identified by the curl arguments of the strategy
+        # files, before the network check may add --insecure to them.
+        requested_curl_args = [list(item[2]) for item in sources]
+
+        curl_path: Path | None = args.curl
+        if curl_path is None:
+            try:
+                curl_path = find_curl_executable(root)
+            except FileNotFoundError as exc:
+                if args.engine.startswith("curl"):
+                    print(exc)
+                    return EXIT_ERROR
+                print(f"{exc} Сетевой тест пропущен.")
+
+        network_ok = False
+        if curl_path is not None:
+            network_args = sources[0][2].copy()
+            network_ok = check_network(curl_path, network_args)
+            if "--insecure" in network_args and "--insecure" not in sources[0][2]:
+                for _, _, file_curl_args in sources:
+                    if "--insecure" not in file_curl_args:
+                        file_curl_args.append("--insecure")
 
         try:
-            curl_path = find_curl_executable(root)
-        except FileNotFoundError as exc:
+            catalogue, screen = catalogues_from_arguments(args)
+        except ValueError as exc:
             print(exc)
-            return 1
-
-        curl_extra_args = strategy_curl_extra.copy()
-        timeout_sec = max(1, (TCP_TIMEOUT_MS + 999) // 1000)
-
-        check_network(curl_path, curl_extra_args)
+            return EXIT_ERROR
+        if args.tests is not None:
+            print(f"Каталог проверок: {args.tests} (тестов: {len(catalogue)})")
+
+        passes = args.passes
+        if passes is None:
+            passes = prompt_passes() if interactive else 1
+        settings = SweepSettings(
+            winws_path=winws_path,
+            passes=passes,
+            timeout_sec=max(1, (args.timeout_ms + 999) // 1000),
+            threshold_bytes=args.threshold_bytes,
+            prune=args.prune,
+            ready_timeout_sec=args.ready_timeout,
+            adaptive_passes=args.adaptive_passes,
+            catalogue=catalogue,
+            screen=screen,
+            screen_min_score=args.screen_min_providers,
+        )
+        ipset_paths = (
+            args.ipset
+            if args.ipset is not None
+            else [root / name for name in IPSET_FILES if (root / name).exists()]
+        )
+        if ipset_paths:
+            try:
+                settings.ipset_index = IpsetIndex(load_ipset(ipset_paths))
+                print(f"Загружено сетей из ipset: {len(settings.ipset_index)}")
+            except OSError as exc:
+                print(f"Предупреждение: не удалось прочитать ipset: {exc}")
 
-        passes = prompt_passes()
-        total_checks = sum(max(item[3], 1) for item in TEST_CASES)
+        total_checks = catalogue.total_checks
+        total_strategies = sum(len(source) for _, source, _ in sources)
 
-        print(f"Загружено стратегий: {len(strategies)}")
+        print(f"Загружено стратегий: {total_strategies}")
         print(f"Будет выполнено {total_checks} HTTP-проверок на каждый прогон.")
-
-        results: List[StrategyOutcome] = []
-        max_provider_count = -1
-
-        for strategy in strategies:
-            print("\n----------------------------------------")
+        if screen is not None:
             print(
-                f"Стратегия {strategy.index}/{len(strategies)}: {strategy.text}"
+                f"Отбор: {screen.total_checks} быстрых проверок, для полной проверки "
+                f"нужно провайдеров: {args.screen_min_providers}"
             )
-            process: subprocess.Popen | None = None
-            try:
-                process = start_winws(winws_path, strategy)
-                time.sleep(1)
-            except Exception as exc:
-                print(f"Не удалось запустить winws.exe: {exc}")
-                terminate_winws(process, winws_path)
-                continue
 
-            best_ok = -1
-            best_summary = "Нет данных"
-            best_providers: Tuple[str, ...] = tuple()
-            best_provider_count = -1
+        try:
+            cache = ResultCache(
+                args.cache_file or output_dir / RESULT_CACHE_FILE,
+                ttl_sec=args.cache_ttl,
+            )
+        except OSError as exc:
+            print(f"Предупреждение: кэш результатов недоступен: {exc}")
 
-            try:
-                for current_pass in range(1, passes + 1):
-                    print(f"\nПрогон {current_pass} из {passes}")
-                    pass_ok, summary, providers = run_test_suite(
-                        curl_path=curl_path,
-                        curl_extra_args=curl_extra_args,
-                        timeout_sec=timeout_sec,
+        restored: List[Tuple[str, StrategyOutcome]] = []
+        try:
+            checkpoint = SweepCheckpoint(
+                output_dir / CHECKPOINT_FILE,
+                sweep_fingerprint(strategy_paths, requested_curl_args, settings),
+            )
+            resume = args.resume
+            if checkpoint.load() and checkpoint.state.get("completed"):
+                completed = checkpoint.state["completed"]
+                if not resume and interactive:
+                    resume = prompt_yes_no(
+                        f"Найдена незавершённая проверка ({completed} стратегий). "
+                        "Продолжить её? (Y/N): "
                     )
-                    providers_line = ", ".join(providers)
-                    if providers_line:
-                        providers_text = providers_line
-                    else:
-                        providers_text = ""
+                elif not resume:
                     print(
-                        f"Результат прогона: {pass_ok}/{total_checks} ({summary}), "
-                        f"провайдеры: ({providers_text})"
+                        f"Найдена незавершённая проверка ({completed} стратегий), она "
+                        "начинается заново. Для продолжения используйте --resume."
                     )
-                    provider_count = len(providers)
-                    if (
-                        provider_count > best_provider_count
-                        or (
-                            provider_count == best_provider_count
-                            and pass_ok > best_ok
-                        )
-                    ):
-                        best_ok = pass_ok
-                        best_summary = summary
-                        best_providers = providers
-                        best_provider_count = provider_count
-            finally:
-                terminate_winws(process, winws_path)
-
-            if best_provider_count >= 0:
-                outcome = StrategyOutcome(
-                    successes=best_ok,
-                    strategy=strategy,
-                    summary=best_summary,
-                    providers=best_providers,
+            elif resume:
+                print("Контрольная точка этого набора стратегий не найдена, проверка начинается с начала.")
+                resume = False
+            if resume:
+                restored = checkpoint.restore()
+                print(f"Продолжение проверки: готово стратегий - {len(restored)}")
+            else:
+                checkpoint.state = {}
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"Предупреждение: контрольная точка недоступна: {exc}")
+            checkpoint = None
+            restored = []
+
+        run_stamp = log_path.stem.partition("-")[2]
+        probes_path = args.probes_out or output_dir / f"Probes-{run_stamp}.jsonl"
+        summary_path = args.summary_out or output_dir / f"Summary-{run_stamp}.jsonl"
+        resume_size: int | None = None
+        if restored and checkpoint.state.get("probes_path"):
+            probes_path = Path(checkpoint.state["probes_path"])
+            summary_path = Path(checkpoint.state["summary_path"])
+            resume_size = checkpoint.state["probes_size"]
+        try:
+            sink = StructuredResultSink(probes_path, summary_path, resume_size)
+            print(f"Результаты проверок: {sink.probes_path}")
+        except OSError as exc:
+            print(f"Предупреждение: структурированный вывод недоступен: {exc}")
+        if checkpoint is not None:
+            try:
+                checkpoint.start(
+                    sink.probes_path if sink else None,
+                    sink.summary_path if sink else None,
                 )
-                results.append(outcome)
-                if best_provider_count > max_provider_count:
-                    max_provider_count = best_provider_count
+            except OSError as exc:
+                print(f"Предупреждение: контрольная точка недоступна: {exc}")
+                checkpoint = None
+
+        results: List[StrategyOutcome] = [outcome for _, outcome in restored]
+        completed_keys = {key for key, _ in restored}
+        leader_score = max((outcome.score for outcome in results), default=-1.0)
+        deduplicator = StrategyDeduplicator()
+        index_offset = 0
+        scheduler = StrategyScheduler(args.instances)
+        if scheduler.parallel:
+            print(f"Одновременно проверяемых стратегий: {args.instances}")
+        # A target that is unreachable from the start cannot serve as the
+        # baseline, so the monitor only runs after a passed preflight check.
+        monitor: NetworkMonitor | None = None
+        if network_ok and args.health_interval > 0:
+            monitor = NetworkMonitor(args.health_interval)
+        # Hosts are resolved before the first winws starts, so no strategy
+        # can interfere with the lookups.
+        resolver: HostResolver | None = None
+        if args.dns_ttl > 0:
+            resolver = HostResolver(args.dns_ttl)
+            unresolved = resolver.prefetch(
+                catalogue.urls()
+                + (screen.urls() if screen is not None else [])
+                + [NETWORK_TEST_URL],
+                curl_address_family(sources[0][2]),
+            )
+            if unresolved:
+                print(f"Предупреждение: не удалось определить адреса: {', '.join(unresolved)}")
+        started_at: dict[int, float] = {}
+        retests: dict[int, int] = {}
+        retest_queue: List[Tuple[Strategy, ProbeEngine, str, List[str]]] = []
+        # Strategies run and recorded by this sweep, by index, so an outage
+        # found later can withdraw the ones that overlapped it.
+        recorded: dict[int, Tuple[Strategy, ProbeEngine, str, List[str], StrategyOutcome]] = {}
+
+        def evaluate(
+            strategy: Strategy,
+            engine: ProbeEngine,
+            source_ports: Tuple[int, int] | None,
+        ) -> StrategyOutcome | None:
+            started_at[strategy.index] = time.monotonic()
+            print("\n----------------------------------------")
+            print(f"Стратегия {strategy.index}/{total_strategies}: {strategy.text}")
+            return evaluate_strategy(
+                settings,
+                strategy,
+                engine,
+                total_checks,
+                leader_score,
+                sink,
+                source_ports,
+            )
 
-        summarise_results(results, total_checks)
+        def record(
+            strategy: Strategy,
+            engine: ProbeEngine,
+            cache_key: str,
+            requested_args: List[str],
+            outcome: StrategyOutcome | None,
+        ) -> None:
+            nonlocal leader_score
+            if outcome is None:
+                return
+            if monitor is not None:
+                finished = time.monotonic()
+                if monitor.due(outcome) and not monitor.check(engine):
+                    withdraw(monitor.take_affected())
+                if monitor.affected(started_at[strategy.index], finished) and requeue(
+                    strategy, engine, cache_key, requested_args
+                ):
+                    return
+                monitor.remember(strategy.index, started_at[strategy.index], finished)
+                recorded[strategy.index] = (
+                    strategy,
+                    engine,
+                    cache_key,
+                    requested_args,
+                    outcome,
+                )
+            results.append(outcome)
+            if cache is not None and not outcome.pruned:
+                try:
+                    cache.store(
+                        cache_key,
+                        requested_args,
+                        outcome,
+                        [test.test_id for test in catalogue.tests],
+                    )
+                except OSError as exc:
+                    print(f"Предупреждение: не удалось записать кэш: {exc}")
+            checkpoint_outcome(cache_key, outcome)
+            leader_score = max(leader_score, outcome.score)
+
+        def requeue(
+            strategy: Strategy,
+            engine: ProbeEngine,
+            cache_key: str,
+            requested_args: List[str],
+        ) -> bool:
+            count = retests.get(strategy.index, 0)
+            if count >= HEALTH_MAX_RETESTS:
+                return False
+            retests[strategy.index] = count + 1
+            retest_queue.append((strategy, engine, cache_key, requested_args))
+            return True
+
+        def withdraw(indexes: List[int]) -> None:
+            """Drop recorded strategies that overlapped an outage and re-test them."""
+
+            nonlocal leader_score, checkpoint
+            withdrawn = [
+                recorded.pop(index)
+                for index in indexes
+                if requeue(*recorded[index][:4])
+            ]
+            if not withdrawn:
+                return
+            keys = [cache_key for _, _, cache_key, _, _ in withdrawn]
+            outcomes = {id(outcome) for *_, outcome in withdrawn}
+            results[:] = [outcome for outcome in results if id(outcome) not in outcomes]
+            leader_score = max((outcome.score for outcome in results), default=-1.0)
+            if cache is not None:
+                try:
+                    cache.discard(keys)
+                except OSError as exc:
+                    print(f"Предупреждение: не удалось записать кэш: {exc}")
+            if checkpoint is not None:
+                try:
+                    checkpoint.discard(keys)
+                except OSError as exc:
+                    print(f"Предупреждение: не удалось сохранить контрольную точку: {exc}")
+                    checkpoint.close()
+                    checkpoint = None
+
+        def submit(
+            strategy: Strategy,
+            engine: ProbeEngine,
+            cache_key: str,
+            requested_args: List[str],
+        ) -> None:
+            scheduler.submit(
+                partial(evaluate, strategy, engine),
+                partial(record, strategy, engine, cache_key, requested_args),
+                exclusive=(
+                    scheduler.parallel
+                    and isolate_strategy(
+                        strategy.split_arguments(), instance_source_ports(0)
+                    )
+                    is None
+                ),
+            )
 
-        if max_provider_count >= 0:
-            print("\nЛучшие стратегии (по числу рабочих провайдеров):")
-            for outcome in results:
-                if outcome.provider_count == max_provider_count:
-                    providers_line = ", ".join(outcome.providers)
+        def checkpoint_outcome(cache_key: str, outcome: StrategyOutcome) -> None:
+            nonlocal checkpoint
+            if checkpoint is None:
+                return
+            try:
+                checkpoint.record(cache_key, outcome, sink.probes_size() if sink else 0)
+            except OSError as exc:
+                print(f"Предупреждение: не удалось сохранить контрольную точку: {exc}")
+                checkpoint.close()
+                checkpoint = None
+
+        for (strategy_path, source, curl_extra_args), requested_args in zip(
+            sources, requested_curl_args
+        ):
+            engine_key = tuple(curl_extra_args)
+            engine = engines.get(engine_key)
+            if engine is None:
+                try:
+                    engine = create_probe_engine(
+                        args.engine,
+                        curl_path,
+                        curl_extra_args,
+                        args.workers,
+                        args.adaptive_workers,
+                        args.max_workers,
+                        resolver,
+                        args.early_stop,
+                    )
+                except (ValueError, FileNotFoundError) as exc:
+                    print(exc)
+                    return EXIT_ERROR
+                engines[engine_key] = engine
+            if len(sources) > 1:
+                print(f"\nФайл стратегий: {strategy_path}")
+            print(f"Движок проверок: {engine.name}")
+
+            for strategy in deduplicator.filter(source, scope=" ".join(curl_extra_args)):
+                strategy = Strategy(index=index_offset + strategy.index, text=strategy.text)
+                cache_key = result_cache_key(
+                    strategy.text,
+                    requested_args,
+                    settings.passes,
+                    settings.timeout_sec,
+                    settings.threshold_bytes,
+                    settings.adaptive_passes,
+                    catalogue,
+                    screen,
+                    settings.screen_min_score,
+                    engine.name,
+                )
+                if cache_key in completed_keys:
+                    continue
+                cached = cache.lookup(cache_key, strategy) if cache else None
+                if cached is not None:
+                    print("\n----------------------------------------")
                     print(
-                        f"* {outcome.strategy.text} - {outcome.provider_count} провайдеров "
-                        f"({providers_line}) -> {outcome.summary}"
+                        f"Стратегия {strategy.index}/{total_strategies}: {strategy.text}"
                     )
-
-        if results:
-            print("\nРейтинг стратегий по рабочим провайдерам (от худших к лучшим):")
-            sorted_results = sorted(
-                results,
-                key=lambda item: (item.provider_count, item.successes),
+                    print(
+                        f"Результат из кэша: {cached.successes}/{total_checks} "
+                        f"({cached.summary}), провайдеры: ({', '.join(cached.providers)})"
+                    )
+                    results.append(cached)
+                    checkpoint_outcome(cache_key, cached)
+                    leader_score = max(leader_score, cached.score)
+                    continue
+
+                submit(strategy, engine, cache_key, requested_args)
+            index_offset += len(source)
+        scheduler.drain()
+        while retest_queue:
+            print(f"\nПерепроверка стратегий после перерыва в работе сети: {len(retest_queue)}")
+            queued, retest_queue[:] = retest_queue[:], []
+            for item in sorted(queued, key=lambda item: item[0].index):
+                submit(*item)
+            scheduler.drain()
+        if checkpoint is not None:
+            checkpoint.remove()
+            checkpoint = None
+
+        for engine in engines.values():
+            print(f"\nПараллельность проверок ({engine.name}): {engine.concurrency.describe()}")
+        if deduplicator.duplicates:
+            print(f"\nПропущено дубликатов стратегий: {deduplicator.duplicates}")
+        if screen is not None:
+            rejected = sum(outcome.screened_out for outcome in results)
+            print(
+                f"\nНе прошли отбор: {rejected} из {len(results)}, полностью "
+                f"проверено: {len(results) - rejected}"
             )
-            for outcome in sorted_results:
-                providers_line = ", ".join(outcome.providers)
-                print(
-                    f"* {outcome.strategy.text} - {outcome.provider_count} провайдеров "
-                    f"({providers_line})"
-                )
+        if cache is not None and cache.hits:
+            print(f"\nСтратегий взято из кэша: {cache.hits}")
+        if resolver is not None:
+            print(
+                f"\nЗапросов DNS: {resolver.lookups}, "
+                f"повторных после ошибок соединения: {resolver.refreshes}"
+            )
+        if monitor is not None and monitor.outages:
+            print(
+                f"\nПерерывов в работе сети: {len(monitor.outages)}, потеряно "
+                f"{monitor.lost_sec:.0f} с, перепроверено стратегий: {len(retests)}"
+            )
+
+        summarise_results(results)
+        if sink is not None:
+            try:
+                sink.write_summary(results, total_checks)
+                print(f"\nСводка по стратегиям: {sink.summary_path}")
+            except OSError as exc:
+                print(f"Предупреждение: не удалось записать сводку: {exc}")
+
+        print_report(results, args.top)
 
         print("\nГотово.")
-        return 0
+        if max_provider_count(results) >= args.min_providers:
+            return EXIT_SUCCESS
+        print(
+            "Не найдено стратегий хотя бы с "
+            f"{args.min_providers} рабочими провайдерами."
+        )
+        return EXIT_NO_WORKING_STRATEGY
+    except KeyboardInterrupt:
+        print("\nПрервано пользователем.")
+        if checkpoint is not None and checkpoint.state.get("completed"):
+            print("Прогресс сохранён, для продолжения запустите проверку с --resume.")
+        return EXIT_INTERRUPTED
     finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if scheduler is not None:
+            scheduler.close()
+            if scheduler.instances > 1:
+                terminate_winws(None, winws_path)
+        for engine in engines.values():
+            engine.close()
+        if sink is not None:
+            sink.close()
+        if cache is not None:
+            try:
+                cache.close()
+            except OSError as exc:
+                print(f"Предупреждение: не удалось сжать кэш: {exc}")
         print(f"\nЛог сохранён: {log_path}")
         restore_logging()
 
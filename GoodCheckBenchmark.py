@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Benchmarks for the hot paths of GoodCheck with recorded baselines.
+
+Every benchmark reports a duration in seconds (lower is better):
+
+* ``load_strategies_<n>``: loading and enumerating a synthetic strategy file
+  with ``n`` lines;
+* ``parse_curl_output``: parsing one ``--write-out`` line of curl;
+* ``run_test_suite_<engine>``: one full ``TEST_CASES`` suite against the
+  local server of :mod:`GoodCheckSimulator`;
+* ``summarise_results_<n>``, ``rank_results_<n>`` and ``best_results_<n>``:
+  the final report for ``n`` finished strategies.
+
+The measured values are compared with ``BenchmarkBaseline.json`` next to the
+script and the run fails when a metric is slower than its baseline by more
+than the threshold.  ``--update`` records the current values instead.
+Baselines are machine specific; record them on the machine that runs the
+comparison.  To tolerate a busy machine every run also times a fixed
+calibration workload and the metrics are scaled by its ratio to the
+calibration stored with the baseline.
+
+    python GoodCheckBenchmark.py
+    python GoodCheckBenchmark.py --update
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import GoodCheck
+import GoodCheckSimulator
+
+# ---------------------------------------------------------------------------
+# Benchmark defaults
+# ---------------------------------------------------------------------------
+
+BASELINE_FILE = "BenchmarkBaseline.json"
+# A metric fails when it is slower than the baseline by more than this share.
+REGRESSION_THRESHOLD = 0.25
+LOAD_SIZES: Tuple[int, ...] = (1000, 10000, 100000)
+REPORT_SIZES: Tuple[int, ...] = (1000, 10000)
+REPEATS = 5
+SUITE_REPEATS = 10
+PARSE_CALLS = 20000
+
+CURL_SAMPLE_OUTPUT = (
+    "HTTP_CODE=206;SIZE=65536;IP=104.16.123.96;T_DNS=0.004211;T_CONNECT=0.021337;"
+    "T_TLS=0.058112;T_TTFB=0.101563;T_TOTAL=0.231947;ERR="
+)
+
+
+def measure(func: Callable[[], object], repeats: int = REPEATS, number: int = 1) -> float:
+    """Return the best time of ``repeats`` runs of ``number`` calls, per call."""
+
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def calibrate() -> float:
+    """Time a fixed pure Python workload used to normalise the metrics."""
+
+    def workload() -> None:
+        items = [f"--dpi-desync-ttl={number % 97}" for number in range(20000)]
+        items.sort()
+        " ".join(items).split()
+
+    return measure(workload, repeats=REPEATS * 2)
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+def write_strategy_file(path: Path, lines: int) -> None:
+    """Write a strategy file in the format of the bundled lists."""
+
+    rng = random.Random(lines)
+    modes = ("fake", "split2", "fake,split2", "fake,multidisorder", "syndata")
+    foolings = ("md5sig", "badseq", "badsum", "datanoack")
+    with path.open("w", encoding="utf-8") as handle:
+        handle.write("_strategyExtraKeys#--wf-l3=ipv4\n")
+        for number in range(lines):
+            handle.write(
+                f"--dpi-desync={rng.choice(modes)} --dpi-desync-ttl={number % 12 + 1} "
+                f"--dpi-desync-fooling={rng.choice(foolings)} "
+                f"--dpi-desync-repeats={number // 12 + 1} "
+                f"--dpi-desync-fake-tls=fakes\\tls_clienthello_{number % 7}.bin\n"
+            )
+
+
+def bench_load_strategies(work_dir: Path) -> Dict[str, float]:
+    metrics: Dict[str, float] = {}
+    for size in LOAD_SIZES:
+        path = work_dir / f"strategies-{size}.txt"
+        write_strategy_file(path, size)
+
+        def load() -> None:
+            source, _ = GoodCheck.load_strategies(path)
+            for _ in source:
+                pass
+
+        metrics[f"load_strategies_{size}"] = measure(load, repeats=1 if size > 10000 else REPEATS)
+    return metrics
+
+
+def bench_parse_curl_output() -> Dict[str, float]:
+    return {
+        "parse_curl_output": measure(
+            lambda: GoodCheck.parse_curl_output(0, CURL_SAMPLE_OUTPUT, ""),
+            number=PARSE_CALLS,
+        )
+    }
+
+
+def bench_run_test_suite(work_dir: Path, engines: Sequence[str]) -> Dict[str, float]:
+    """Time one suite per engine against the simulator with nothing blocked."""
+
+    state_dir = work_dir / "state"
+    state_dir.mkdir()
+    (state_dir / "exclusive.json").write_text(
+        json.dumps({"strategy": "", "source_ports": None}), encoding="utf-8"
+    )
+    cert_path, key_path = GoodCheckSimulator.create_certificate(work_dir)
+    server = GoodCheckSimulator.SimulatorServer(
+        cert_path, key_path, GoodCheckSimulator.StrategyRegistry(state_dir), ok_rate=1.0
+    )
+    threading.Thread(target=server.serve_forever, name="simulator", daemon=True).start()
+    saved = GoodCheck.TEST_CASES
+    GoodCheck.TEST_CASES = server.test_cases()
+    metrics: Dict[str, float] = {}
+    try:
+        for name in engines:
+            curl_path = shutil.which("curl")
+            if name.startswith("curl") and curl_path is None:
+                print(f"curl не найден, замер движка {name} пропущен.")
+                continue
+            engine = GoodCheck.create_probe_engine(
+                name, Path(curl_path) if curl_path else None, ["-k"], GoodCheck.PROBE_WORKERS
+            )
+            try:
+                with open(os.devnull, "w", encoding="utf-8") as devnull:
+                    with contextlib.redirect_stdout(devnull):
+                        suite = lambda: GoodCheck.run_test_suite(engine, timeout_sec=5)
+                        result = suite()
+                        if result.ok != sum(item[3] for item in GoodCheck.TEST_CASES):
+                            raise RuntimeError(f"Проверки движка {name} не прошли: {result.summary}")
+                        metrics[f"run_test_suite_{name}"] = measure(suite, number=SUITE_REPEATS)
+            finally:
+                engine.close()
+    finally:
+        GoodCheck.TEST_CASES = saved
+        server.shutdown()
+        server.server_close()
+    return metrics
+
+
+def synthetic_outcomes(count: int) -> List[GoodCheck.StrategyOutcome]:
+    rng = random.Random(count)
+    providers = sorted({provider for _, provider, _, _ in GoodCheck.TEST_CASES})
+    total_checks = sum(max(item[3], 1) for item in GoodCheck.TEST_CASES)
+    outcomes = []
+    for index in range(1, count + 1):
+        working = tuple(sorted(rng.sample(providers, rng.randint(0, len(providers)))))
+        successes = rng.randint(len(working), total_checks) if working else 0
+        outcomes.append(
+            GoodCheck.StrategyOutcome(
+                successes=successes,
+                strategy=GoodCheck.Strategy(index, f"--dpi-desync=fake --dpi-desync-ttl={index}"),
+                summary=f"OK:{successes}, Warn:0, Detected:{total_checks - successes}, Fail:0",
+                providers=working,
+                tls_times=tuple(rng.uniform(0.02, 0.3) for _ in range(total_checks)),
+                total_times=tuple(rng.uniform(0.05, 1.5) for _ in range(total_checks)),
+            )
+        )
+    return outcomes
+
+
+def bench_report() -> Dict[str, float]:
+    metrics: Dict[str, float] = {}
+    for size in REPORT_SIZES:
+        outcomes = synthetic_outcomes(size)
+        with open(os.devnull, "w", encoding="utf-8") as devnull:
+            metrics[f"summarise_results_{size}"] = measure(
+                lambda: GoodCheck.summarise_results(outcomes, devnull)
+            )
+        metrics[f"rank_results_{size}"] = measure(lambda: GoodCheck.rank_results(outcomes))
+        metrics[f"best_results_{size}"] = measure(lambda: GoodCheck.best_results(outcomes))
+    return metrics
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+
+def compare(
+    metrics: Dict[str, float],
+    baseline: Dict[str, float],
+    threshold: float,
+    scale: float = 1.0,
+) -> List[str]:
+    """Print every metric next to its baseline and return the regressions.
+
+    ``scale`` converts the current values to the speed of the machine at
+    the time the baseline was recorded.
+    """
+
+    regressions = []
+    for name, value in metrics.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:32} {value * 1000:12.4f} мс  (нет базового значения)")
+            continue
+        change = value * scale / reference - 1.0 if reference > 0 else 0.0
+        marker = ""
+        if change > threshold:
+            marker = "  РЕГРЕССИЯ"
+            regressions.append(name)
+        print(
+            f"{name:32} {value * 1000:12.4f} мс  "
+            f"(база {reference * 1000:.4f} мс, {change:+.1%}){marker}"
+        )
+    return regressions
+
+
+def parse_arguments(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Замеры производительности GoodCheck.")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=Path(__file__).resolve().parent / BASELINE_FILE,
+        help=f"файл базовых значений (по умолчанию {BASELINE_FILE})",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help=f"допустимое замедление, доля (по умолчанию {REGRESSION_THRESHOLD})",
+    )
+    parser.add_argument("--update", action="store_true", help="записать текущие значения как базовые")
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=("asyncio", "curl", "curl-batch"),
+        default=["asyncio", "curl", "curl-batch"],
+        help="движки для замера run_test_suite",
+    )
+    parser.add_argument("--skip-network", action="store_true", help="не запускать замеры с сервером")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_arguments(argv)
+    metrics: Dict[str, float] = {}
+    calibration = calibrate()
+    with tempfile.TemporaryDirectory(prefix="goodcheck-bench-") as temp:
+        work_dir = Path(temp)
+        metrics.update(bench_load_strategies(work_dir))
+        metrics.update(bench_parse_curl_output())
+        if not args.skip_network:
+            metrics.update(bench_run_test_suite(work_dir, args.engines))
+        metrics.update(bench_report())
+    calibration = min(calibration, calibrate())
+
+    if args.update:
+        record = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "recorded": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "calibration": round(calibration, 9),
+            "metrics": {name: round(value, 9) for name, value in metrics.items()},
+        }
+        args.baseline.write_text(json.dumps(record, indent=2) + "\n", encoding="utf-8")
+        compare(metrics, {}, args.threshold)
+        print(f"\nБазовые значения записаны: {args.baseline}")
+        return GoodCheck.EXIT_SUCCESS
+
+    baseline: Dict[str, float] = {}
+    scale = 1.0
+    if args.baseline.exists():
+        record = json.loads(args.baseline.read_text(encoding="utf-8"))
+        baseline = record["metrics"]
+        if record.get("calibration"):
+            scale = record["calibration"] / calibration
+            print(f"Поправка на скорость машины: x{scale:.3f}")
+    else:
+        print(f"Файл базовых значений не найден: {args.baseline}")
+    regressions = compare(metrics, baseline, args.threshold, scale)
+    if regressions:
+        print(f"\nЗамедление больше {args.threshold:.0%}: {', '.join(regressions)}")
+        return GoodCheck.EXIT_ERROR
+    return GoodCheck.EXIT_SUCCESS
+
+
+if __name__ == "__main__":  # pragma: no cover - script entry point
+    sys.exit(main())
@@ -0,0 +1,756 @@
+#!/usr/bin/env python3
+"""Distributed GoodCheck sweep: one coordinator and several worker machines.
+
+The coordinator expands the strategy files exactly like GoodCheck.py does and
+hands the strategies out in shards over HTTP.  Every worker runs winws and
+the HTTP checks on its own machine and posts each finished strategy back;
+the coordinator merges the outcomes into the usual report.
+
+    python GoodCheckDistributed.py coordinator -s strategies.txt --passes 3 --listen 0.0.0.0:8765
+    python GoodCheckDistributed.py worker http://192.168.1.10:8765 --winws winws.exe
+
+The protocol is plain JSON over HTTP:
+
+* ``GET /job`` returns the sweep settings and the list of HTTP checks, so
+  every worker runs the same checks as the coordinator;
+* ``POST /lease`` with ``{"worker": name, "capacity": n}`` returns a shard of
+  strategies, ``{"wait": seconds}`` while the remaining strategies are leased
+  to other workers, or ``{"done": true}`` once the sweep is finished;
+* ``POST /result`` with ``{"worker": name, "id": n, "outcome": {...}}``
+  reports one strategy (``outcome`` is ``null`` when winws failed);
+* ``POST /release`` with ``{"worker": name}`` returns the unfinished shard of
+  a worker that is shutting down.
+
+A lease expires after ``--lease-timeout`` seconds; its strategies go to the
+next worker that asks, and a late duplicate result is ignored.  Several
+workers may run on one machine when their ``--first-slot`` values keep the
+local port ranges apart (see ``GoodCheck.instance_source_ports``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import GoodCheck
+from GoodCheck import Strategy, StrategyOutcome
+
+# ---------------------------------------------------------------------------
+# Distributed sweep defaults
+# ---------------------------------------------------------------------------
+
+DISTRIBUTED_LISTEN = "127.0.0.1:8765"
+# Strategies handed to a worker per lease; a worker with more winws
+# instances gets one strategy per instance instead.
+DISTRIBUTED_SHARD_SIZE = 4
+# A shard that is not reported within this time is handed to another worker.
+DISTRIBUTED_LEASE_TIMEOUT_SEC = 900.0
+# Pause of an idle worker before it asks again and between retries.
+DISTRIBUTED_POLL_SEC = 1.0
+DISTRIBUTED_RETRIES = 10
+DISTRIBUTED_HTTP_TIMEOUT_SEC = 30.0
+# Time the finished coordinator keeps answering so that idle workers learn
+# that the sweep is over.
+DISTRIBUTED_GRACE_SEC = 5.0
+
+
+# ---------------------------------------------------------------------------
+# Coordinator
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class ShardTask:
+    """One strategy of the distributed sweep."""
+
+    task_id: int
+    strategy: Strategy
+    curl_args: List[str]
+
+    def to_json(self) -> dict:
+        return {
+            "id": self.task_id,
+            "index": self.strategy.index,
+            "strategy": self.strategy.text,
+            "curl_args": self.curl_args,
+        }
+
+
+def build_tasks(strategy_paths: Sequence[Path]) -> Tuple[List[ShardTask], int]:
+    """Expand and deduplicate the strategy files like :func:`GoodCheck.main`.
+
+    Returns the tasks and the total number of strategies, which numbers the
+    strategies in the output.
+    """
+
+    tasks: List[ShardTask] = []
+    deduplicator = GoodCheck.StrategyDeduplicator()
+    index_offset = 0
+    for path in strategy_paths:
+        source, curl_extra_args = GoodCheck.load_strategies(path)
+        for strategy in deduplicator.filter(source, scope=" ".join(curl_extra_args)):
+            tasks.append(
+                ShardTask(
+                    task_id=len(tasks),
+                    strategy=Strategy(index_offset + strategy.index, strategy.text),
+                    curl_args=list(curl_extra_args),
+                )
+            )
+        index_offset += len(source)
+    if deduplicator.duplicates:
+        print(f"Пропущено дубликатов стратегий: {deduplicator.duplicates}")
+    return tasks, index_offset
+
+
+class ShardQueue:
+    """Strategies of a distributed sweep, their leases and outcomes.
+
+    Every method is called from the HTTP handler threads and holds the lock
+    for its whole duration.
+    """
+
+    def __init__(
+        self,
+        job: dict,
+        tasks: Sequence[ShardTask],
+        shard_size: int = DISTRIBUTED_SHARD_SIZE,
+        lease_timeout_sec: float = DISTRIBUTED_LEASE_TIMEOUT_SEC,
+    ):
+        self.job = job
+        self.tasks = {task.task_id: task for task in tasks}
+        self.shard_size = shard_size
+        self.lease_timeout_sec = lease_timeout_sec
+        self.leader = -1
+        self.finished = threading.Event()
+        self._pending = [task.task_id for task in tasks]
+        self._pending.reverse()
+        self._leases: Dict[int, Tuple[str, float]] = {}
+        self._outcomes: Dict[int, StrategyOutcome | None] = {}
+        self._workers: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        if not tasks:
+            self.finished.set()
+
+    def lease(self, worker: str, capacity: int) -> dict:
+        with self._lock:
+            self._register(worker)
+            self._expire()
+            if self.finished.is_set():
+                self._workers[worker] = True
+                return {"done": True}
+            if not self._pending:
+                return {"wait": DISTRIBUTED_POLL_SEC, "leader": self.leader}
+            deadline = time.monotonic() + self.lease_timeout_sec
+            shard = []
+            for _ in range(min(max(self.shard_size, capacity), len(self._pending))):
+                task_id = self._pending.pop()
+                self._leases[task_id] = (worker, deadline)
+                shard.append(self.tasks[task_id].to_json())
+            return {"tasks": shard, "leader": self.leader}
+
+    def complete(self, worker: str, task_id: int, record: dict | None) -> dict:
+        with self._lock:
+            self._register(worker)
+            task = self.tasks[task_id]
+            if task_id in self._outcomes:
+                return {"leader": self.leader, "duplicate": True}
+            outcome = None
+            if record is not None:
+                outcome = GoodCheck.outcome_from_record(record, task.strategy)
+            self._outcomes[task_id] = outcome
+            self._leases.pop(task_id, None)
+            if task_id in self._pending:
+                self._pending.remove(task_id)
+            if outcome is None:
+                result_text = "winws не запустился"
+            else:
+                self.leader = max(self.leader, outcome.score)
+                result_text = (
+                    f"{outcome.successes} ({outcome.summary}), "
+                    f"провайдеры: ({', '.join(outcome.providers)})"
+                )
+            print(
+                f"[{len(self._outcomes)}/{len(self.tasks)}] Стратегия "
+                f"{task.strategy.index} ({worker}): {result_text}"
+            )
+            if len(self._outcomes) == len(self.tasks):
+                self.finished.set()
+            return {"leader": self.leader}
+
+    def release(self, worker: str) -> dict:
+        """Return the unfinished strategies of ``worker`` to the queue."""
+
+        with self._lock:
+            returned = [
+                task_id for task_id, (owner, _) in self._leases.items() if owner == worker
+            ]
+            for task_id in returned:
+                del self._leases[task_id]
+                self._pending.append(task_id)
+            self._workers[worker] = True
+            if returned:
+                print(f"Исполнитель {worker} вернул стратегий: {len(returned)}")
+            return {"released": len(returned)}
+
+    def _register(self, worker: str) -> None:
+        if worker not in self._workers:
+            self._workers[worker] = False
+            print(f"Подключился исполнитель: {worker}")
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        expired = [
+            task_id for task_id, (_, deadline) in self._leases.items() if deadline < now
+        ]
+        for task_id in expired:
+            worker, _ = self._leases.pop(task_id)
+            print(
+                f"Исполнитель {worker} не прислал результат стратегии "
+                f"{self.tasks[task_id].strategy.index}, она будет выдана повторно."
+            )
+            self._pending.append(task_id)
+
+    def workers_notified(self) -> bool:
+        """Whether every known worker has been told that the sweep is over."""
+
+        with self._lock:
+            return all(self._workers.values())
+
+    def results(self) -> List[StrategyOutcome]:
+        """Outcomes received so far, in strategy order."""
+
+        with self._lock:
+            return [
+                outcome
+                for _, outcome in sorted(self._outcomes.items())
+                if outcome is not None
+            ]
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    server: "CoordinatorServer"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.path == "/job":
+            self._reply(200, self.server.queue.job)
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        queue = self.server.queue
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            worker = str(body["worker"])
+            if self.path == "/lease":
+                reply = queue.lease(worker, int(body.get("capacity", 1)))
+            elif self.path == "/result":
+                reply = queue.complete(worker, int(body["id"]), body.get("outcome"))
+            elif self.path == "/release":
+                reply = queue.release(worker)
+            else:
+                self._reply(404, {"error": "not found"})
+                return
+        except (KeyError, TypeError, ValueError) as exc:
+            self._reply(400, {"error": f"bad request: {exc}"})
+            return
+        self._reply(200, reply)
+
+    def _reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CoordinatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], queue: ShardQueue):
+        super().__init__(address, CoordinatorHandler)
+        self.queue = queue
+
+
+def parse_listen(value: str) -> Tuple[str, int]:
+    """argparse type for ``host:port``."""
+
+    host, _, port = value.rpartition(":")
+    try:
+        return host or "0.0.0.0", int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается адрес:порт: {value}") from None
+
+
+def coordinator_command(args: argparse.Namespace, root: Path) -> int:
+    output_dir = (args.output_dir or root).resolve()
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        log_path, restore_logging = GoodCheck.setup_file_logging(output_dir)
+    except OSError as exc:  # pragma: no cover - log path error is rare
+        print(f"Не удалось создать лог-файл: {exc}")
+        return GoodCheck.EXIT_ERROR
+
+    server: CoordinatorServer | None = None
+    try:
+        print("==============================")
+        print("GoodCheck Python - координатор")
+        print("==============================")
+        print(f"Лог-файл: {log_path.name}")
+
+        for path in args.strategies:
+            if not path.exists():
+                print(f"Файл или каталог не найден: {path}")
+                return GoodCheck.EXIT_ERROR
+        try:
+            tasks, total_strategies = build_tasks(args.strategies)
+        except Exception as exc:  # pragma: no cover - interactive error path
+            print(f"Ошибка при чтении стратегий: {exc}")
+            return GoodCheck.EXIT_ERROR
+
+        try:
+            catalogue, screen = GoodCheck.catalogues_from_arguments(args)
+        except ValueError as exc:
+            print(exc)
+            return GoodCheck.EXIT_ERROR
+        total_checks = catalogue.total_checks
+        job = {
+            "total_strategies": total_strategies,
+            "passes": args.passes,
+            "timeout_sec": max(1, (args.timeout_ms + 999) // 1000),
+            "threshold_bytes": args.threshold_bytes,
+            "prune": args.prune,
+            "adaptive_passes": args.adaptive_passes,
+            "catalogue": catalogue.record(),
+            "screen": screen.record() if screen is not None else None,
+            "screen_min_score": args.screen_min_providers,
+            "network_test_url": GoodCheck.NETWORK_TEST_URL,
+            "network_curl_args": tasks[0].curl_args if tasks else [],
+        }
+        queue = ShardQueue(job, tasks, args.shard_size, args.lease_timeout)
+        try:
+            server = CoordinatorServer(args.listen, queue)
+        except OSError as exc:
+            print(f"Не удалось открыть {args.listen[0]}:{args.listen[1]}: {exc}")
+            return GoodCheck.EXIT_ERROR
+        threading.Thread(
+            target=server.serve_forever, name="GoodCheckCoordinator", daemon=True
+        ).start()
+
+        host, port = server.server_address[:2]
+        print(f"Стратегий к проверке: {len(tasks)} (всего {total_strategies})")
+        print(f"Будет выполнено {total_checks} HTTP-проверок на каждый прогон.")
+        print(f"Координатор слушает http://{host}:{port}, ожидание исполнителей...")
+
+        started = time.monotonic()
+        while not queue.finished.wait(1.0):
+            pass
+        print(f"\nВсе стратегии проверены за {time.monotonic() - started:.1f} с.")
+        deadline = time.monotonic() + DISTRIBUTED_GRACE_SEC
+        while not queue.workers_notified() and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        results = queue.results()
+        GoodCheck.summarise_results(results)
+        summary_path = args.summary_out or output_dir / (
+            f"Summary-{log_path.stem.partition('-')[2]}.jsonl"
+        )
+        try:
+            GoodCheck.write_summary_file(summary_path, results, total_checks)
+            print(f"\nСводка по стратегиям: {summary_path}")
+        except OSError as exc:
+            print(f"Предупреждение: не удалось записать сводку: {exc}")
+        GoodCheck.print_report(results, args.top)
+
+        print("\nГотово.")
+        if GoodCheck.max_provider_count(results) >= args.min_providers:
+            return GoodCheck.EXIT_SUCCESS
+        print(
+            "Не найдено стратегий хотя бы с "
+            f"{args.min_providers} рабочими провайдерами."
+        )
+        return GoodCheck.EXIT_NO_WORKING_STRATEGY
+    except KeyboardInterrupt:
+        print("\nПрервано пользователем.")
+        return GoodCheck.EXIT_INTERRUPTED
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        print(f"\nЛог сохранён: {log_path}")
+        restore_logging()
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+
+class CoordinatorClient:
+    """JSON client of the coordinator that retries while it is unreachable."""
+
+    def __init__(self, url: str, worker: str, retries: int = DISTRIBUTED_RETRIES):
+        self.url = url.rstrip("/")
+        self.worker = worker
+        self.retries = retries
+        # Test boxes talk to the coordinator directly, never through a proxy.
+        self._opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+    def request(self, path: str, payload: dict | None = None) -> dict:
+        data = None
+        if payload is not None:
+            data = json.dumps({"worker": self.worker, **payload}).encode("utf-8")
+        request = urllib.request.Request(
+            self.url + path, data=data, headers={"Content-Type": "application/json"}
+        )
+        error: Exception | None = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(DISTRIBUTED_POLL_SEC)
+            try:
+                with self._opener.open(request, timeout=DISTRIBUTED_HTTP_TIMEOUT_SEC) as response:
+                    return json.loads(response.read().decode("utf-8"))
+            except urllib.error.HTTPError as exc:
+                raise ConnectionError(f"Координатор отклонил запрос {path}: {exc.code}") from exc
+            except OSError as exc:
+                error = exc
+        raise ConnectionError(f"Координатор {self.url} недоступен: {error}")
+
+
+def worker_command(args: argparse.Namespace, root: Path) -> int:
+    output_dir = (args.output_dir or root).resolve()
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        log_path, restore_logging = GoodCheck.setup_file_logging(output_dir)
+    except OSError as exc:  # pragma: no cover - log path error is rare
+        print(f"Не удалось создать лог-файл: {exc}")
+        return GoodCheck.EXIT_ERROR
+
+    client = CoordinatorClient(args.coordinator, args.name)
+    engines: Dict[Tuple[str, ...], GoodCheck.ProbeEngine] = {}
+    sink: GoodCheck.StructuredResultSink | None = None
+    scheduler: GoodCheck.StrategyScheduler | None = None
+    leased = False
+    try:
+        print("==============================")
+        print(f"GoodCheck Python - исполнитель {args.name}")
+        print("==============================")
+        print(f"Лог-файл: {log_path.name}")
+
+        if not args.winws.exists():
+            print(f"Файл или каталог не найден: {args.winws}")
+            return GoodCheck.EXIT_ERROR
+        job = client.request("/job")
+        # The coordinator defines the checks, so the outcomes of all workers
+        # are comparable.
+        catalogue = GoodCheck.TestCatalogue.from_record(job["catalogue"])
+        screen = None
+        if job["screen"] is not None:
+            screen = GoodCheck.TestCatalogue.from_record(job["screen"])
+        settings = GoodCheck.SweepSettings(
+            winws_path=args.winws,
+            passes=job["passes"],
+            timeout_sec=job["timeout_sec"],
+            threshold_bytes=job["threshold_bytes"],
+            prune=job["prune"],
+            ready_timeout_sec=args.ready_timeout,
+            adaptive_passes=job["adaptive_passes"],
+            catalogue=catalogue,
+            screen=screen,
+            screen_min_score=job["screen_min_score"],
+        )
+        total_checks = catalogue.total_checks
+        total_strategies = job["total_strategies"]
+        print(f"Координатор: {client.url}")
+        print(f"Будет выполнено {total_checks} HTTP-проверок на каждый прогон.")
+
+        ipset_paths = (
+            args.ipset
+            if args.ipset is not None
+            else [root / name for name in GoodCheck.IPSET_FILES if (root / name).exists()]
+        )
+        if ipset_paths:
+            try:
+                settings.ipset_index = GoodCheck.IpsetIndex(GoodCheck.load_ipset(ipset_paths))
+            except OSError as exc:
+                print(f"Предупреждение: не удалось прочитать ipset: {exc}")
+
+        curl_path: Path | None = args.curl
+        if curl_path is None:
+            try:
+                curl_path = GoodCheck.find_curl_executable(root)
+            except FileNotFoundError as exc:
+                if args.engine.startswith("curl"):
+                    print(exc)
+                    return GoodCheck.EXIT_ERROR
+                print(f"{exc} Сетевой тест пропущен.")
+        network_args = list(job["network_curl_args"])
+        insecure = False
+        network_ok = False
+        if curl_path is not None:
+            network_ok = GoodCheck.check_network(
+                curl_path, network_args, job["network_test_url"]
+            )
+            insecure = "--insecure" in network_args and "--insecure" not in job["network_curl_args"]
+        # The same health checks as a local sweep: strategies that ran during
+        # an outage of this machine are re-tested before they are reported.
+        monitor: GoodCheck.NetworkMonitor | None = None
+        if network_ok and args.health_interval > 0:
+            monitor = GoodCheck.NetworkMonitor(args.health_interval, job["network_test_url"])
+        # Every worker resolves the hosts itself: the addresses depend on
+        # the network of the machine.
+        resolver: GoodCheck.HostResolver | None = None
+        if args.dns_ttl > 0:
+            resolver = GoodCheck.HostResolver(args.dns_ttl)
+            unresolved = resolver.prefetch(
+                catalogue.urls()
+                + (screen.urls() if screen is not None else [])
+                + [job["network_test_url"]],
+                GoodCheck.curl_address_family(job["network_curl_args"]),
+            )
+            if unresolved:
+                print(f"Предупреждение: не удалось определить адреса: {', '.join(unresolved)}")
+
+        run_stamp = log_path.stem.partition("-")[2]
+        probes_path = args.probes_out or output_dir / f"Probes-{run_stamp}.jsonl"
+        try:
+            sink = GoodCheck.StructuredResultSink(
+                probes_path, output_dir / f"Summary-{run_stamp}.jsonl"
+            )
+            print(f"Результаты проверок: {sink.probes_path}")
+        except OSError as exc:
+            print(f"Предупреждение: структурированный вывод недоступен: {exc}")
+
+        leader = -1
+        scheduler = GoodCheck.StrategyScheduler(args.instances, args.first_slot)
+        started_at: Dict[int, float] = {}
+        retests: Dict[int, int] = {}
+        retest_queue: List[Tuple[int, Strategy, GoodCheck.ProbeEngine]] = []
+
+        def evaluate(
+            strategy: Strategy,
+            engine: GoodCheck.ProbeEngine,
+            source_ports: Tuple[int, int] | None,
+        ) -> StrategyOutcome | None:
+            started_at[strategy.index] = time.monotonic()
+            print("\n----------------------------------------")
+            print(f"Стратегия {strategy.index}/{total_strategies}: {strategy.text}")
+            return GoodCheck.evaluate_strategy(
+                settings, strategy, engine, total_checks, leader, sink, source_ports
+            )
+
+        def report(
+            task_id: int,
+            strategy: Strategy,
+            engine: GoodCheck.ProbeEngine,
+            outcome: StrategyOutcome | None,
+        ) -> None:
+            nonlocal leader
+            if outcome is not None and monitor is not None:
+                finished = time.monotonic()
+                if monitor.due(outcome):
+                    monitor.check(engine)
+                if (
+                    monitor.affected(started_at[strategy.index], finished)
+                    and retests.get(strategy.index, 0) < GoodCheck.HEALTH_MAX_RETESTS
+                ):
+                    retests[strategy.index] = retests.get(strategy.index, 0) + 1
+                    retest_queue.append((task_id, strategy, engine))
+                    return
+            record = None
+            if outcome is not None:
+                record = {"pruned": outcome.pruned, **GoodCheck.outcome_record(outcome)}
+                leader = max(leader, outcome.score)
+            reply = client.request("/result", {"id": task_id, "outcome": record})
+            leader = max(leader, reply.get("leader", -1))
+
+        def submit(task_id: int, strategy: Strategy, engine: GoodCheck.ProbeEngine) -> None:
+            scheduler.submit(
+                partial(evaluate, strategy, engine),
+                partial(report, task_id, strategy, engine),
+                exclusive=(
+                    scheduler.parallel
+                    and GoodCheck.isolate_strategy(
+                        strategy.split_arguments(),
+                        GoodCheck.instance_source_ports(args.first_slot or 0),
+                    )
+                    is None
+                ),
+            )
+
+        while True:
+            reply = client.request("/lease", {"capacity": args.instances})
+            if reply.get("done"):
+                break
+            leader = max(leader, reply.get("leader", -1))
+            shard = reply.get("tasks") or []
+            if not shard:
+                time.sleep(reply.get("wait", DISTRIBUTED_POLL_SEC))
+                continue
+            leased = True
+            for task in shard:
+                curl_extra_args = list(task["curl_args"])
+                if insecure and "--insecure" not in curl_extra_args:
+                    curl_extra_args.append("--insecure")
+                engine_key = tuple(curl_extra_args)
+                engine = engines.get(engine_key)
+                if engine is None:
+                    try:
+                        engine = GoodCheck.create_probe_engine(
+                            args.engine,
+                            curl_path,
+                            curl_extra_args,
+                            args.workers,
+                            args.adaptive_workers,
+                            args.max_workers,
+                            resolver,
+                            args.early_stop,
+                        )
+                    except (ValueError, FileNotFoundError) as exc:
+                        print(exc)
+                        return GoodCheck.EXIT_ERROR
+                    engines[engine_key] = engine
+                submit(int(task["id"]), Strategy(int(task["index"]), str(task["strategy"])), engine)
+            scheduler.drain()
+            while retest_queue:
+                print(f"\nПерепроверка стратегий после перерыва в работе сети: {len(retest_queue)}")
+                queued, retest_queue[:] = retest_queue[:], []
+                for item in queued:
+                    submit(*item)
+                scheduler.drain()
+            leased = False
+
+        print("\nКоординатор сообщил о завершении проверки.")
+        if monitor is not None and monitor.outages:
+            print(
+                f"\nПерерывов в работе сети: {len(monitor.outages)}, потеряно "
+                f"{monitor.lost_sec:.0f} с, перепроверено стратегий: {len(retests)}"
+            )
+        print("\nГотово.")
+        return GoodCheck.EXIT_SUCCESS
+    except ConnectionError as exc:
+        print(exc)
+        return GoodCheck.EXIT_ERROR
+    except KeyboardInterrupt:
+        print("\nПрервано пользователем.")
+        if leased:
+            try:
+                client.retries = 0
+                client.request("/release", {})
+            except ConnectionError:
+                pass
+        return GoodCheck.EXIT_INTERRUPTED
+    finally:
+        if scheduler is not None:
+            scheduler.close()
+            # Workers sharing the machine keep their own winws instances.
+            if scheduler.instances > 1 and args.first_slot is None:
+                GoodCheck.terminate_winws(None, args.winws)
+        for engine in engines.values():
+            engine.close()
+        if sink is not None:
+            sink.close()
+        print(f"\nЛог сохранён: {log_path}")
+        restore_logging()
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+
+def parse_arguments(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Распределённая проверка стратегий zapret на нескольких машинах.",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    coordinator = commands.add_parser(
+        "coordinator",
+        help="раздать стратегии исполнителям и собрать общий рейтинг",
+    )
+    coordinator.add_argument(
+        "-s",
+        "--strategies",
+        type=Path,
+        nargs="+",
+        metavar="FILE",
+        required=True,
+        help="один или несколько файлов стратегий",
+    )
+    coordinator.add_argument(
+        "-p",
+        "--passes",
+        type=int,
+        choices=range(1, 10),
+        metavar="1-9",
+        default=1,
+        help="количество прогонов на стратегию (с --adaptive-passes - максимум)",
+    )
+    GoodCheck.add_sweep_arguments(coordinator)
+    coordinator.add_argument(
+        "--listen",
+        type=parse_listen,
+        default=parse_listen(DISTRIBUTED_LISTEN),
+        help=f"адрес:порт координатора (по умолчанию {DISTRIBUTED_LISTEN}; "
+        "для других машин укажите 0.0.0.0:порт)",
+    )
+    coordinator.add_argument(
+        "--shard-size",
+        type=GoodCheck.positive_int,
+        default=DISTRIBUTED_SHARD_SIZE,
+        help=f"стратегий за одну выдачу (по умолчанию {DISTRIBUTED_SHARD_SIZE})",
+    )
+    coordinator.add_argument(
+        "--lease-timeout",
+        type=float,
+        default=DISTRIBUTED_LEASE_TIMEOUT_SEC,
+        help="через сколько секунд без результата выдать стратегии повторно",
+    )
+    coordinator.add_argument("--output-dir", type=Path, help="каталог для лога и сводки")
+    coordinator.add_argument("--summary-out", type=Path, help="файл сводки по стратегиям (.jsonl/.csv)")
+
+    worker = commands.add_parser("worker", help="проверять стратегии, выданные координатором")
+    worker.add_argument("coordinator", help="адрес координатора, например http://host:8765")
+    worker.add_argument("--winws", type=Path, required=True, help="путь до winws.exe")
+    worker.add_argument(
+        "--first-slot",
+        type=int,
+        help="проверять стратегии изолированно с этого блока локальных портов "
+        "(для нескольких исполнителей на одной машине)",
+    )
+    GoodCheck.add_probe_arguments(worker)
+    worker.add_argument(
+        "--name",
+        default=f"{socket.gethostname()}-{os.getpid()}",
+        help="имя исполнителя в выводе координатора",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_arguments(argv)
+    root = Path(__file__).resolve().parent
+    if args.command == "coordinator":
+        return coordinator_command(args, root)
+    return worker_command(args, root)
+
+
+if __name__ == "__main__":  # pragma: no cover - script entry point
+    sys.exit(main())
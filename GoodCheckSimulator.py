@@ -0,0 +1,627 @@
+#!/usr/bin/env python3
+"""Local DPI simulator for exercising GoodCheck without a network.
+
+The simulator replaces everything GoodCheck normally talks to:
+
+* a local HTTPS server stands in for every ``TEST_CASES`` endpoint and for
+  ``NETWORK_TEST_URL``;
+* a fake winws decides per strategy which providers are "blocked".  A
+  blocked provider either stalls after a few bytes, so the check times out
+  (``DETECTED``), or answers with a body below ``OK_THRESHOLD_BYTES``
+  (``WARN``);
+* the benchmark runner generates a strategy file, runs a full sweep through
+  :func:`GoodCheck.main` and reports the throughput in strategies per minute.
+  With ``--distributed N`` the sweep runs through the coordinator of
+  :mod:`GoodCheckDistributed` and ``N`` local worker processes instead.
+
+Verdicts are derived from a hash of the strategy text and the provider name,
+so every run is reproducible and the runner can verify the provider list of
+every strategy it gets back.  Only Python, ``curl`` and ``openssl`` (for the
+self-signed certificate) are required, so the harness runs on Linux.
+
+    python GoodCheckSimulator.py --strategies 100 --instances 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import signal
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import GoodCheck
+import GoodCheckDistributed
+
+# ---------------------------------------------------------------------------
+# Simulator defaults
+# ---------------------------------------------------------------------------
+
+# Share of (strategy, provider) pairs that pass the simulated DPI.  The rest
+# is split evenly between stalled and truncated responses.
+SIM_OK_RATE = 0.5
+# Share of pairs that are flaky: each of their requests passes with
+# SIM_FLAKY_PASS_RATE, the other ones stall.  Flaky providers are left out
+# of the verification.
+SIM_FLAKY_RATE = 0.0
+SIM_FLAKY_PASS_RATE = 0.5
+SIM_STRATEGIES = 60
+SIM_TIMEOUT_MS = 1000
+# Delay between the start of the fake winws and its readiness line.
+SIM_STARTUP_DELAY_SEC = 0.2
+# Size of a full response body and of the data sent before a stall or in a
+# truncated answer.
+SIM_BODY_BYTES = GoodCheck.OK_THRESHOLD_BYTES * 2
+SIM_PARTIAL_BYTES = 1024
+SIM_STALL_SEC = 30.0
+
+VERDICT_OK = "ok"
+VERDICT_STALL = "stall"
+VERDICT_TRUNCATE = "truncate"
+VERDICT_FLAKY = "flaky"
+
+_SOURCE_PORTS_RE = re.compile(r"tcp\.SrcPort >= (\d+) and tcp\.SrcPort <= (\d+)")
+
+
+# ---------------------------------------------------------------------------
+# Simulated DPI policy
+# ---------------------------------------------------------------------------
+
+
+def canonical_arguments(arguments: Sequence[str]) -> str:
+    """Return the strategy text without the WinDivert filter keys.
+
+    The filter keys differ between serial and parallel runs of the same
+    strategy (see :func:`GoodCheck.isolate_strategy`), the verdicts must not.
+    """
+
+    return " ".join(
+        argument
+        for argument in arguments
+        if not argument.lower().startswith(("--wf-tcp", "--wf-udp", "--wf-l3", "--wf-raw"))
+    )
+
+
+def provider_verdict(
+    strategy_text: str, provider: str, ok_rate: float, flaky_rate: float = 0.0
+) -> str:
+    """Decide deterministically how the DPI treats ``provider``."""
+
+    digest = hashlib.blake2b(
+        f"{strategy_text}\0{provider}".encode("utf-8"), digest_size=8
+    ).digest()
+    value = int.from_bytes(digest, "big") / 2**64
+    if value < ok_rate:
+        return VERDICT_OK
+    if value < ok_rate + flaky_rate:
+        return VERDICT_FLAKY
+    if value < ok_rate + flaky_rate + (1.0 - ok_rate - flaky_rate) / 2:
+        return VERDICT_STALL
+    return VERDICT_TRUNCATE
+
+
+def expected_providers(
+    strategy_text: str, ok_rate: float, flaky_rate: float = 0.0
+) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Providers GoodCheck should report as working, and the flaky ones."""
+
+    canonical = canonical_arguments(GoodCheck.split_arguments(strategy_text))
+    providers = dict.fromkeys(provider for _, provider, _, _ in GoodCheck.TEST_CASES)
+    verdicts = {
+        provider: provider_verdict(canonical, provider, ok_rate, flaky_rate)
+        for provider in providers
+    }
+    return (
+        tuple(sorted(name for name, verdict in verdicts.items() if verdict == VERDICT_OK)),
+        tuple(sorted(name for name, verdict in verdicts.items() if verdict == VERDICT_FLAKY)),
+    )
+
+
+@dataclass
+class ActiveStrategy:
+    """A running fake winws as seen by the server."""
+
+    text: str
+    source_ports: Tuple[int, int] | None
+
+
+class StrategyRegistry:
+    """Read the strategies announced by fake winws processes.
+
+    Every fake winws writes a small JSON file into the state directory and
+    removes it on exit.  A connection is matched to the instance whose local
+    port range contains the client port, otherwise to the exclusive instance.
+    """
+
+    def __init__(self, state_dir: Path):
+        self.state_dir = state_dir
+
+    def lookup(self, client_port: int) -> ActiveStrategy | None:
+        exclusive: ActiveStrategy | None = None
+        for path in self.state_dir.glob("*.json"):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            ports = data.get("source_ports")
+            active = ActiveStrategy(data["strategy"], tuple(ports) if ports else None)
+            if active.source_ports is None:
+                exclusive = active
+            elif active.source_ports[0] <= client_port <= active.source_ports[1]:
+                return active
+        return exclusive
+
+
+# ---------------------------------------------------------------------------
+# HTTPS server
+# ---------------------------------------------------------------------------
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    """Serve ``/<provider>/<test id>`` according to the active strategy."""
+
+    protocol_version = "HTTP/1.1"
+    server: "SimulatorServer"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        path = self.path.split("?", 1)[0].strip("/")
+        if path == "network":
+            self._send_body(200, b"ok")
+            return
+        provider = path.split("/", 1)[0]
+        if provider not in self.server.providers:
+            self._send_body(404, b"unknown provider")
+            return
+
+        active = self.server.registry.lookup(self.client_address[1])
+        if active is None:
+            # No winws is running: the DPI blocks every provider.
+            verdict = VERDICT_STALL
+        else:
+            verdict = provider_verdict(
+                active.text, provider, self.server.ok_rate, self.server.flaky_rate
+            )
+            if verdict == VERDICT_FLAKY:
+                flaky_ok = random.random() < SIM_FLAKY_PASS_RATE
+                verdict = VERDICT_OK if flaky_ok else VERDICT_STALL
+
+        if verdict == VERDICT_TRUNCATE:
+            self._send_body(200, b"x" * SIM_PARTIAL_BYTES)
+        elif verdict == VERDICT_STALL:
+            self._stall()
+        else:
+            self._send_full()
+
+    def _send_body(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_full(self) -> None:
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match is None:
+            self._send_body(200, b"x" * SIM_BODY_BYTES)
+            return
+        first = int(match.group(1))
+        last = min(int(match.group(2) or SIM_BODY_BYTES - 1), SIM_BODY_BYTES - 1)
+        body = b"x" * max(0, last - first + 1)
+        self.send_response(206)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Range", f"bytes {first}-{last}/{SIM_BODY_BYTES}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stall(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(SIM_BODY_BYTES))
+        self.end_headers()
+        self.wfile.write(b"x" * SIM_PARTIAL_BYTES)
+        self.wfile.flush()
+        self.server.stopped.wait(SIM_STALL_SEC)
+        self.close_connection = True
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """Threaded HTTPS server with a TLS handshake per handler thread."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        cert_path: Path,
+        key_path: Path,
+        registry: StrategyRegistry,
+        ok_rate: float,
+        flaky_rate: float = 0.0,
+    ):
+        super().__init__(("127.0.0.1", 0), SimulatorHandler)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(str(cert_path), str(key_path))
+        # The handshake runs lazily in the handler thread instead of blocking
+        # the accept loop.
+        self.socket = context.wrap_socket(
+            self.socket, server_side=True, do_handshake_on_connect=False
+        )
+        self.registry = registry
+        self.ok_rate = ok_rate
+        self.flaky_rate = flaky_rate
+        self.providers = {provider for _, provider, _, _ in GoodCheck.TEST_CASES}
+        self.stopped = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f"https://127.0.0.1:{self.server_address[1]}"
+
+    def test_cases(self) -> Tuple[Tuple[str, str, str, int], ...]:
+        """``TEST_CASES`` with every URL pointing at this server."""
+
+        return tuple(
+            (test_id, provider, f"{self.base_url}/{provider}/{test_id}", times)
+            for test_id, provider, _, times in GoodCheck.TEST_CASES
+        )
+
+    def shutdown(self) -> None:
+        self.stopped.set()
+        super().shutdown()
+
+
+def create_certificate(target_dir: Path) -> Tuple[Path, Path]:
+    """Generate a throw-away self-signed certificate with ``openssl``."""
+
+    openssl = shutil.which("openssl")
+    if openssl is None:
+        raise FileNotFoundError("openssl не найден, укажите --cert и --key.")
+    cert_path = target_dir / "cert.pem"
+    key_path = target_dir / "key.pem"
+    subprocess.run(
+        [
+            openssl, "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", str(key_path), "-out", str(cert_path),
+            "-days", "1", "-subj", "/CN=localhost",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+    return cert_path, key_path
+
+
+# ---------------------------------------------------------------------------
+# Fake winws
+# ---------------------------------------------------------------------------
+
+
+def fake_winws(state_dir: Path, startup_delay: float, arguments: List[str]) -> int:
+    """Announce the strategy to the server until the process is terminated."""
+
+    source_ports = None
+    for argument in arguments:
+        if argument.lower().startswith("--wf-raw="):
+            match = _SOURCE_PORTS_RE.search(argument)
+            if match:
+                source_ports = [int(match.group(1)), int(match.group(2))]
+
+    name = f"{source_ports[0]}.json" if source_ports else "exclusive.json"
+    state_path = state_dir / name
+    temp_path = state_dir / f".{os.getpid()}.tmp"
+    temp_path.write_text(
+        json.dumps(
+            {"strategy": canonical_arguments(arguments), "source_ports": source_ports}
+        ),
+        encoding="utf-8",
+    )
+
+    def stop(signum: int, frame: object) -> None:
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    print("github version simulator", flush=True)
+    time.sleep(startup_delay)
+    os.replace(temp_path, state_path)
+    try:
+        print(f"windivert initialized. {GoodCheck.WINWS_READY_MARKER}.", flush=True)
+        while True:
+            time.sleep(3600)
+    finally:
+        with contextlib.suppress(OSError):
+            state_path.unlink()
+
+
+def write_launcher(target_dir: Path, state_dir: Path, startup_delay: float) -> Path:
+    """Create an executable that GoodCheck can start in place of winws.exe."""
+
+    launcher = target_dir / "winws"
+    launcher.write_text(
+        "#!/bin/sh\n"
+        f'exec "{sys.executable}" "{Path(__file__).resolve()}" fake-winws '
+        f'--state-dir "{state_dir}" --startup-delay {startup_delay} -- "$@"\n',
+        encoding="utf-8",
+    )
+    launcher.chmod(0o755)
+    return launcher
+
+
+# ---------------------------------------------------------------------------
+# Benchmark runner
+# ---------------------------------------------------------------------------
+
+
+def write_strategies(path: Path, count: int) -> None:
+    lines = ["_strategyCurlExtraKeys#-k"]
+    lines.extend(
+        f"--wf-tcp=80,443 --dpi-desync=fake --dpi-desync-repeats={number}"
+        for number in range(1, count + 1)
+    )
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def verify_summary(
+    summary_path: Path, ok_rate: float, flaky_rate: float = 0.0
+) -> Tuple[int, List[str]]:
+    """Compare GoodCheck's provider lists with the simulated policy."""
+
+    checked = 0
+    mismatches: List[str] = []
+    with summary_path.open(encoding="utf-8") as handle:
+        for line in handle:
+            record = json.loads(line)
+            checked += 1
+            if record["pruned"]:
+                continue
+            expected, flaky = expected_providers(record["strategy"], ok_rate, flaky_rate)
+            reported = tuple(name for name in record["providers"] if name not in flaky)
+            if reported != expected:
+                mismatches.append(
+                    f"{record['strategy']}: {list(reported)} != {list(expected)}"
+                )
+    return checked, mismatches
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, object]:
+    """Run one sweep against the simulator and return its metrics."""
+
+    curl_path = args.curl or shutil.which("curl")
+    if curl_path is None:
+        raise FileNotFoundError("curl не найден, укажите --curl.")
+
+    with tempfile.TemporaryDirectory(prefix="goodcheck-sim-") as temp:
+        work_dir = Path(temp)
+        state_dir = work_dir / "state"
+        output_dir = work_dir / "output"
+        state_dir.mkdir()
+        if args.cert and args.key:
+            cert_path, key_path = args.cert, args.key
+        else:
+            cert_path, key_path = create_certificate(work_dir)
+        strategies_path = work_dir / "strategies.txt"
+        write_strategies(strategies_path, args.strategies)
+        launcher = write_launcher(work_dir, state_dir, args.startup_delay)
+
+        server = SimulatorServer(
+            cert_path, key_path, StrategyRegistry(state_dir), args.ok_rate, args.flaky_rate
+        )
+        threading.Thread(target=server.serve_forever, name="simulator", daemon=True).start()
+        saved = GoodCheck.TEST_CASES, GoodCheck.NETWORK_TEST_URL
+        GoodCheck.TEST_CASES = server.test_cases()
+        GoodCheck.NETWORK_TEST_URL = f"{server.base_url}/network"
+        sweep_args = [
+            "--passes", str(args.passes),
+            "--timeout-ms", str(args.timeout_ms),
+            "--threshold-bytes", str(args.threshold_bytes),
+            "--summary-out", str(output_dir / "summary.jsonl"),
+        ]
+        if args.prune:
+            sweep_args.append("--prune")
+        if args.adaptive_passes:
+            sweep_args.append("--adaptive-passes")
+        if args.screen:
+            sweep_args.append("--screen")
+        probe_args = [
+            "--winws", str(launcher),
+            "--curl", str(curl_path),
+            "--engine", args.engine,
+            "--workers", str(args.workers),
+            "--instances", str(args.instances),
+            "--ipset",
+        ]
+        try:
+            output = sys.stdout if args.verbose else open(os.devnull, "w", encoding="utf-8")
+            started = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(output):
+                    if args.distributed:
+                        exit_code = run_distributed(
+                            args, strategies_path, output_dir, sweep_args, probe_args
+                        )
+                    else:
+                        exit_code = GoodCheck.main(
+                            [
+                                "--batch",
+                                "--strategies", str(strategies_path),
+                                "--output-dir", str(output_dir),
+                                "--cache-file", str(output_dir / "cache.jsonl"),
+                                "--probes-out", str(output_dir / "probes.jsonl"),
+                                *sweep_args,
+                                *probe_args,
+                            ]
+                        )
+            finally:
+                elapsed = time.perf_counter() - started
+                if output is not sys.stdout:
+                    output.close()
+            checked, mismatches = verify_summary(
+                output_dir / "summary.jsonl", args.ok_rate, args.flaky_rate
+            )
+            probes = 0
+            for probes_path in output_dir.glob("probes*.jsonl"):
+                with probes_path.open(encoding="utf-8") as handle:
+                    probes += sum(1 for _ in handle)
+        finally:
+            GoodCheck.TEST_CASES, GoodCheck.NETWORK_TEST_URL = saved
+            server.shutdown()
+            server.server_close()
+
+    return {
+        "strategies": checked,
+        "elapsed_sec": round(elapsed, 3),
+        "strategies_per_minute": round(checked * 60 / elapsed, 2) if elapsed else 0.0,
+        "probes": probes,
+        "instances": args.instances,
+        "distributed": args.distributed,
+        "engine": args.engine,
+        "workers": args.workers,
+        "timeout_ms": args.timeout_ms,
+        "goodcheck_exit_code": exit_code,
+        "mismatches": mismatches,
+    }
+
+
+def run_distributed(
+    args: argparse.Namespace,
+    strategies_path: Path,
+    output_dir: Path,
+    sweep_args: List[str],
+    probe_args: List[str],
+) -> int:
+    """Run the sweep through a coordinator and ``args.distributed`` workers.
+
+    The coordinator runs in this process, so it hands the simulator's
+    ``TEST_CASES`` to the workers.  Every worker gets its own block of
+    instance slots, so their fake winws instances do not overlap.
+    """
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    script = Path(GoodCheckDistributed.__file__).resolve()
+    workers = []
+    try:
+        for number in range(args.distributed):
+            workers.append(
+                subprocess.Popen(
+                    [
+                        sys.executable, str(script), "worker", f"http://127.0.0.1:{port}",
+                        *probe_args,
+                        "--first-slot", str(number * args.instances),
+                        "--name", f"worker-{number + 1}",
+                        "--output-dir", str(output_dir / f"worker-{number + 1}"),
+                        "--probes-out", str(output_dir / f"probes-{number + 1}.jsonl"),
+                    ],
+                    stdout=None if args.verbose else subprocess.DEVNULL,
+                    stderr=subprocess.STDOUT,
+                )
+            )
+        exit_code = GoodCheckDistributed.main(
+            [
+                "coordinator",
+                "--strategies", str(strategies_path),
+                "--listen", f"127.0.0.1:{port}",
+                "--output-dir", str(output_dir),
+                *sweep_args,
+            ]
+        )
+        for worker in workers:
+            worker.wait(timeout=GoodCheckDistributed.DISTRIBUTED_GRACE_SEC * 2)
+        return exit_code
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+                worker.wait()
+
+
+def parse_arguments(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Локальный симулятор DPI для проверки и замеров GoodCheck.",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    fake = commands.add_parser("fake-winws", help="поддельный winws (запускается GoodCheck)")
+    fake.add_argument("--state-dir", type=Path, required=True)
+    fake.add_argument("--startup-delay", type=float, default=SIM_STARTUP_DELAY_SEC)
+    fake.add_argument("arguments", nargs=argparse.REMAINDER)
+
+    parser.add_argument("--strategies", type=GoodCheck.positive_int, default=SIM_STRATEGIES,
+                        help=f"число строк в файле стратегий (по умолчанию {SIM_STRATEGIES})")
+    parser.add_argument("--ok-rate", type=float, default=SIM_OK_RATE,
+                        help=f"доля непрерываемых пар стратегия/провайдер (по умолчанию {SIM_OK_RATE})")
+    parser.add_argument("--flaky-rate", type=float, default=SIM_FLAKY_RATE,
+                        help=f"доля нестабильных пар стратегия/провайдер (по умолчанию {SIM_FLAKY_RATE})")
+    parser.add_argument("--instances", type=GoodCheck.positive_int, default=1)
+    parser.add_argument("--distributed", type=GoodCheck.positive_int,
+                        help="проверить через координатор и N локальных исполнителей")
+    parser.add_argument("--engine", choices=GoodCheck.PROBE_ENGINES, default=GoodCheck.PROBE_ENGINE)
+    parser.add_argument("--workers", type=GoodCheck.positive_int, default=GoodCheck.PROBE_WORKERS)
+    parser.add_argument("--passes", type=GoodCheck.positive_int, default=1)
+    parser.add_argument("--timeout-ms", type=GoodCheck.positive_int, default=SIM_TIMEOUT_MS)
+    parser.add_argument("--threshold-bytes", type=GoodCheck.positive_int,
+                        default=GoodCheck.OK_THRESHOLD_BYTES,
+                        help=f"порог успешной проверки, не больше {SIM_BODY_BYTES} байт")
+    parser.add_argument("--startup-delay", type=float, default=SIM_STARTUP_DELAY_SEC,
+                        help="задержка готовности поддельного winws, с")
+    parser.add_argument("--prune", action="store_true")
+    parser.add_argument("--adaptive-passes", action="store_true")
+    parser.add_argument("--screen", action="store_true")
+    parser.add_argument("--curl", type=Path)
+    parser.add_argument("--cert", type=Path)
+    parser.add_argument("--key", type=Path)
+    parser.add_argument("--json", type=Path, help="записать метрики в JSON-файл")
+    parser.add_argument("--verbose", action="store_true", help="показать вывод GoodCheck")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_arguments(argv)
+    if args.command == "fake-winws":
+        arguments = [item for item in args.arguments if item != "--"]
+        return fake_winws(args.state_dir, args.startup_delay, arguments)
+
+    try:
+        metrics = run_benchmark(args)
+    except (FileNotFoundError, subprocess.CalledProcessError) as exc:
+        print(exc)
+        return GoodCheck.EXIT_ERROR
+
+    print(
+        f"Стратегий: {metrics['strategies']}, время: {metrics['elapsed_sec']} с, "
+        f"скорость: {metrics['strategies_per_minute']} стратегий/мин, "
+        f"проверок: {metrics['probes']} "
+        f"(instances={args.instances}, distributed={args.distributed}, "
+        f"engine={args.engine}, workers={args.workers})"
+    )
+    if args.json is not None:
+        args.json.write_text(json.dumps(metrics, ensure_ascii=False, indent=2), encoding="utf-8")
+    mismatches = metrics["mismatches"]
+    if mismatches:
+        print(f"Расхождения с моделью DPI: {len(mismatches)}")
+        for line in mismatches[:10]:
+            print(f"* {line}")
+        return GoodCheck.EXIT_ERROR
+    return GoodCheck.EXIT_SUCCESS
+
+
+if __name__ == "__main__":  # pragma: no cover - script entry point
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""Shared fixtures; makes the GoodCheck scripts next to this directory importable."""
+
+import json
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope="session")
+def simulator(tmp_path_factory):
+    """GoodCheckSimulator HTTPS server that lets every check through."""
+
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl is not installed")
+    import GoodCheckSimulator
+
+    work_dir = tmp_path_factory.mktemp("simulator")
+    state_dir = work_dir / "state"
+    state_dir.mkdir()
+    (state_dir / "exclusive.json").write_text(
+        json.dumps({"strategy": "", "source_ports": None}), encoding="utf-8"
+    )
+    cert_path, key_path = GoodCheckSimulator.create_certificate(work_dir)
+    server = GoodCheckSimulator.SimulatorServer(
+        cert_path, key_path, GoodCheckSimulator.StrategyRegistry(state_dir), ok_rate=1.0
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
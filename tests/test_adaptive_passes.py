@@ -0,0 +1,81 @@
+"""Adaptive passes: stopping once the Wilson interval settles the verdict."""
+
+from pathlib import Path
+
+import pytest
+
+import GoodCheck
+
+CATALOGUE = GoodCheck.TestCatalogue.from_test_cases(
+    [("A-01", "A", "https://a.example/", 1), ("B-01", "B", "https://b.example/", 1)], 5
+)
+
+
+def suite(*providers):
+    return GoodCheck.SuiteResult(len(providers), "", tuple(providers))
+
+
+def tally(*passes):
+    result = GoodCheck.PassTally(CATALOGUE)
+    for providers in passes:
+        result.add(suite(*providers))
+    return result
+
+
+def test_wilson_interval():
+    assert GoodCheck.wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = GoodCheck.wilson_interval(3, 3)
+    assert GoodCheck.ADAPTIVE_DECISION_RATE < low < high == 1.0
+    low, high = GoodCheck.wilson_interval(0, 3)
+    assert low == 0.0 and high < GoodCheck.ADAPTIVE_DECISION_RATE
+    # Two passes are not enough to settle even a unanimous provider.
+    assert GoodCheck.wilson_interval(2, 2)[0] < GoodCheck.ADAPTIVE_DECISION_RATE
+    low, high = GoodCheck.wilson_interval(50, 100)
+    assert low < 0.5 < high and high - low < 0.2
+
+
+def test_unanimous_passes_stop_once_settled():
+    assert tally(["A"], ["A"]).stop_reason() is None
+    settled = tally(["A"], ["A"], ["A"])
+    assert settled.stop_reason() == "результат по всем провайдерам устойчив"
+    assert settled.providers() == ("A",)
+
+
+def test_leader_stops_only_a_strategy_that_cannot_catch_up():
+    # A failed every pass, B is undecided: at most one provider is reachable.
+    undecided = tally(["B"], [], [])
+    assert undecided.stop_reason() is None
+    assert undecided.stop_reason(leader_score=1) is None
+    assert "не может догнать лидера" in undecided.stop_reason(leader_score=2)
+
+
+@pytest.fixture
+def fake_winws(monkeypatch):
+    monkeypatch.setattr(GoodCheck, "start_winws", lambda *args: None)
+    monkeypatch.setattr(GoodCheck, "wait_winws_ready", lambda *args: True)
+    monkeypatch.setattr(GoodCheck, "terminate_winws", lambda *args: None)
+
+
+@pytest.mark.parametrize("prune, passes_run", [(False, 5), (True, 3)])
+def test_leader_is_ignored_without_pruning(fake_winws, monkeypatch, prune, passes_run):
+    passes = iter([suite("B"), suite(), suite(), suite("B"), suite()])
+    calls = []
+
+    def run_test_suite(**kwargs):
+        calls.append(kwargs["prune_below"])
+        return next(passes)
+
+    monkeypatch.setattr(GoodCheck, "run_test_suite", run_test_suite)
+    settings = GoodCheck.SweepSettings(
+        winws_path=Path("winws.exe"),
+        passes=5,
+        timeout_sec=5,
+        prune=prune,
+        adaptive_passes=True,
+        catalogue=CATALOGUE,
+    )
+    strategy = GoodCheck.Strategy(1, "--dpi-desync=fake")
+    outcome = GoodCheck.evaluate_strategy(settings, strategy, None, 2, leader_score=2)
+    assert len(calls) == passes_run
+    assert set(calls) == {2 if prune else -1}
+    assert outcome.providers == ()
@@ -0,0 +1,53 @@
+"""Command line options shared by GoodCheck and GoodCheckDistributed."""
+
+import GoodCheck
+import GoodCheckDistributed
+
+PROBE_OPTIONS = [
+    "--engine", "curl-batch", "--workers", "4", "--adaptive-workers", "--max-workers", "16",
+    "--full-transfer", "--curl", "curl.exe", "--ipset", "--instances", "2",
+    "--health-interval", "30", "--dns-ttl", "0", "--ready-timeout", "1.5",
+    "--output-dir", "out", "--probes-out", "probes.csv",
+]
+PROBE_DESTS = [
+    "engine", "workers", "adaptive_workers", "max_workers", "early_stop", "curl", "ipset",
+    "instances", "health_interval", "dns_ttl", "ready_timeout", "output_dir", "probes_out",
+]
+SWEEP_OPTIONS = [
+    "--adaptive-passes", "--timeout-ms", "3000", "--threshold-bytes", "1024", "--tests", "t.toml",
+    "--screen", "--screen-tests", "s.json", "--screen-timeout-ms", "500",
+    "--screen-min-providers", "2", "--prune", "--min-providers", "3", "--top", "5",
+]
+SWEEP_DESTS = [
+    "adaptive_passes", "timeout_ms", "threshold_bytes", "tests", "screen", "screen_tests",
+    "screen_timeout_ms", "screen_min_providers", "prune", "min_providers", "top",
+]
+
+
+def values(args, dests):
+    return {dest: getattr(args, dest) for dest in dests}
+
+
+def test_worker_accepts_the_probe_options_of_goodcheck():
+    local = GoodCheck.parse_arguments(PROBE_OPTIONS)
+    worker = GoodCheckDistributed.parse_arguments(
+        ["worker", "http://host:8765", "--winws", "winws.exe", *PROBE_OPTIONS]
+    )
+    assert values(worker, PROBE_DESTS) == values(local, PROBE_DESTS)
+    assert worker.early_stop is False and worker.ipset == []
+
+
+def test_probe_defaults_match():
+    local = GoodCheck.parse_arguments([])
+    worker = GoodCheckDistributed.parse_arguments(["worker", "http://host", "--winws", "w"])
+    assert values(worker, PROBE_DESTS) == values(local, PROBE_DESTS)
+
+
+def test_coordinator_accepts_the_sweep_options_of_goodcheck():
+    local = GoodCheck.parse_arguments(SWEEP_OPTIONS)
+    coordinator = GoodCheckDistributed.parse_arguments(
+        ["coordinator", "--strategies", "s.txt", *SWEEP_OPTIONS]
+    )
+    assert values(coordinator, SWEEP_DESTS) == values(local, SWEEP_DESTS)
+    defaults = GoodCheckDistributed.parse_arguments(["coordinator", "--strategies", "s.txt"])
+    assert values(defaults, SWEEP_DESTS) == values(GoodCheck.parse_arguments([]), SWEEP_DESTS)
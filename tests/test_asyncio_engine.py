@@ -0,0 +1,105 @@
+"""AsyncioEngine behaviour around cancelled and failed TLS handshakes."""
+
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import GoodCheck
+
+BODY = b"x" * GoodCheck.OK_THRESHOLD_BYTES
+
+
+class BodyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(206)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BodyServer(ThreadingHTTPServer):
+    request_queue_size = 64
+
+
+class SilentTlsServer:
+    """Accept connections and never answer, optionally resetting them."""
+
+    def __init__(self, reset=False):
+        self.reset = reset
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.held = []
+        self.running = True
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while self.running:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            if self.reset:
+                conn.recv(1)
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                conn.close()
+            else:
+                self.held.append(conn)
+
+    def close(self):
+        self.running = False
+        self.listener.close()
+        for conn in self.held:
+            conn.close()
+
+
+@pytest.fixture
+def http_url():
+    server = BodyServer(("127.0.0.1", 0), BodyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def engine():
+    engine = GoodCheck.AsyncioEngine(
+        GoodCheck.AsyncProbeOptions(resolve={}, insecure=True),
+        GoodCheck.ConcurrencyController(64),
+    )
+    yield engine
+    engine.close()
+
+
+def test_cancelled_handshakes_leave_later_probes_working(engine, http_url):
+    silent = SilentTlsServer()
+    try:
+        for _ in range(5):
+            pending = [
+                engine.submit(f"https://127.0.0.1:{silent.port}/", 30) for _ in range(16)
+            ]
+            time.sleep(0.2)
+            for future in pending:
+                future.cancel()
+            results = [engine.submit(http_url, 5) for _ in range(16)]
+            for future in results:
+                assert future.result(timeout=10).status == "OK"
+    finally:
+        silent.close()
+
+
+def test_reset_during_handshake_is_a_result(engine):
+    server = SilentTlsServer(reset=True)
+    try:
+        result = engine.submit(f"https://127.0.0.1:{server.port}/", 5).result(timeout=10)
+    finally:
+        server.close()
+    assert result.exit_code == 35
+    assert result.status != "OK"
@@ -0,0 +1,131 @@
+"""Loading and validating test catalogues."""
+
+import json
+
+import pytest
+
+import GoodCheck
+
+TOML_CATALOGUE = """
+timeout_ms = 3000
+threshold_bytes = 32768
+
+[weights]
+Cloudflare = 2
+Google = 0.5
+
+[[tests]]
+id = "CF-01"
+provider = "Cloudflare"
+url = "https://cloudflare.example/file"
+times = 2
+
+[[tests]]
+id = "GG-01"
+provider = "Google"
+url = "https://google.example/file"
+timeout_ms = 1500
+threshold_bytes = 1024
+
+[[tests]]
+id = "GG-02"
+provider = "Google"
+url = "http://google.example/other"
+enabled = false
+"""
+
+JSON_CATALOGUE = {
+    "timeout_ms": 3000,
+    "threshold_bytes": 32768,
+    "weights": {"Cloudflare": 2, "Google": 0.5},
+    "tests": [
+        {"id": "CF-01", "provider": "Cloudflare", "url": "https://cloudflare.example/file", "times": 2},
+        {
+            "id": "GG-01",
+            "provider": "Google",
+            "url": "https://google.example/file",
+            "timeout_ms": 1500,
+            "threshold_bytes": 1024,
+        },
+        {"id": "GG-02", "provider": "Google", "url": "http://google.example/other", "enabled": False},
+    ],
+}
+
+
+def valid_catalogue():
+    return json.loads(json.dumps(JSON_CATALOGUE))
+
+
+def test_toml_and_json_compile_to_the_same_catalogue(tmp_path):
+    toml_path = tmp_path / "tests.toml"
+    toml_path.write_text(TOML_CATALOGUE, encoding="utf-8")
+    json_path = tmp_path / "tests.json"
+    json_path.write_text(json.dumps(JSON_CATALOGUE), encoding="utf-8")
+
+    from_toml = GoodCheck.load_test_catalogue(toml_path, 5)
+    from_json = GoodCheck.load_test_catalogue(json_path, 5)
+    assert from_toml.record() == from_json.record()
+    assert from_toml.checks == from_json.checks
+
+
+def test_defaults_overrides_and_weights():
+    catalogue = GoodCheck.compile_test_catalogue(valid_catalogue(), timeout_sec=5)
+    assert [test.test_id for test in catalogue.tests] == ["CF-01", "GG-01"]
+    cloudflare, google = catalogue.tests
+    assert (cloudflare.times, cloudflare.timeout_sec, cloudflare.threshold_bytes) == (2, 3, 32768)
+    assert (google.times, google.timeout_sec, google.threshold_bytes) == (1, 2, 1024)
+    assert catalogue.total_checks == 3
+    assert catalogue.score(["Cloudflare", "Google"]) == 2.5
+    assert GoodCheck.TestCatalogue.from_record(catalogue.record()).record() == catalogue.record()
+
+
+def test_sweep_limits_fill_missing_defaults():
+    data = valid_catalogue()
+    del data["timeout_ms"], data["threshold_bytes"]
+    catalogue = GoodCheck.compile_test_catalogue(data, timeout_sec=7, threshold_bytes=100)
+    assert (catalogue.tests[0].timeout_sec, catalogue.tests[0].threshold_bytes) == (7, 100)
+
+
+def broken(change):
+    data = valid_catalogue()
+    change(data)
+    return data
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        ([], "таблицей/объектом"),
+        (broken(lambda d: d.update(retries=3)), "неизвестные ключи каталога: retries"),
+        (broken(lambda d: d["tests"][0].update(weight=2)), "тест #1: неизвестные ключи weight"),
+        (broken(lambda d: d["tests"][0].pop("url")), "тест #1: не задано поле url"),
+        (broken(lambda d: d["tests"][1].update(provider=" ")), "тест #2: не задано поле provider"),
+        (broken(lambda d: d["tests"][1].update(id="CF-01")), "тест CF-01: идентификатор повторяется"),
+        (broken(lambda d: d["tests"][0].update(url="ftp://example/file")), r"ожидается http\(s\) URL"),
+        (broken(lambda d: d["tests"][0].update(enabled="no")), "enabled должно быть true или false"),
+        (broken(lambda d: d["tests"][0].update(times=0)), "тест CF-01: times должно быть"),
+        (broken(lambda d: d["tests"][0].update(timeout_ms=1.5)), "тест CF-01: timeout_ms должно быть"),
+        (broken(lambda d: d["tests"][0].update(threshold_bytes=True)), "threshold_bytes должно быть"),
+        (broken(lambda d: d.update(timeout_ms=-1)), "каталог: timeout_ms должно быть"),
+        (broken(lambda d: d.update(weights=[1, 2])), "weights: ожидается таблица"),
+        (broken(lambda d: d["weights"].update(Google=-1)), "weights: вес Google"),
+        (broken(lambda d: d["weights"].update(Google="high")), "weights: вес Google"),
+        (broken(lambda d: d.pop("tests")), "tests: ожидается список"),
+        (broken(lambda d: d["tests"].__setitem__(0, "CF-01")), "тест #1: ожидается таблица"),
+        (broken(lambda d: d.update(tests=[d["tests"][2]])), "нет включённых тестов"),
+    ],
+)
+def test_malformed_catalogue_is_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        GoodCheck.compile_test_catalogue(data, timeout_sec=5)
+
+
+@pytest.mark.parametrize(
+    "name, text",
+    [("tests.json", '{"tests": ['), ("tests.toml", "[[tests]\nid = 1")],
+)
+def test_unparsable_file_is_a_value_error(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ValueError):
+        GoodCheck.load_test_catalogue(path, 5)
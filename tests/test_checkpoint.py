@@ -0,0 +1,103 @@
+"""Checkpointing and resuming a sweep."""
+
+from pathlib import Path
+
+import GoodCheck
+
+
+def outcome(index, providers=("Cloudflare",), pruned=False):
+    return GoodCheck.StrategyOutcome(
+        successes=len(providers) * 2,
+        strategy=GoodCheck.Strategy(index, f"--dpi-desync=fake --dpi-desync-ttl={index}"),
+        summary=f"OK:{len(providers) * 2}, Warn:0, Detected:1, Fail:0",
+        providers=tuple(providers),
+        pruned=pruned,
+        tls_times=(0.05, 0.125),
+        total_times=(0.25, 0.5),
+    )
+
+
+def settings(**overrides):
+    return GoodCheck.SweepSettings(winws_path=Path("winws.exe"), passes=1, timeout_sec=5, **overrides)
+
+
+def test_outcomes_round_trip(tmp_path):
+    outcomes = [outcome(1), outcome(2, ("Cloudflare", "Google"), pruned=True), outcome(3, ())]
+    checkpoint = GoodCheck.SweepCheckpoint(tmp_path / "Checkpoint.json", "sweep")
+    checkpoint.start(None, None)
+    for number, item in enumerate(outcomes):
+        checkpoint.record(f"key{number}", item, probes_size=number * 10)
+    checkpoint.close()
+
+    reopened = GoodCheck.SweepCheckpoint(tmp_path / "Checkpoint.json", "sweep")
+    assert reopened.load()
+    assert reopened.state["completed"] == 3
+    assert reopened.state["probes_size"] == 20
+    assert reopened.restore() == [(f"key{n}", item) for n, item in enumerate(outcomes)]
+
+
+def test_other_sweep_is_not_loaded(tmp_path):
+    checkpoint = GoodCheck.SweepCheckpoint(tmp_path / "Checkpoint.json", "sweep")
+    checkpoint.start(None, None)
+    checkpoint.record("key", outcome(1), 0)
+    checkpoint.close()
+    assert not GoodCheck.SweepCheckpoint(tmp_path / "Checkpoint.json", "other").load()
+
+
+def test_resume_after_interrupted_sweep(tmp_path):
+    path = tmp_path / "Checkpoint.json"
+    checkpoint = GoodCheck.SweepCheckpoint(path, "sweep")
+    checkpoint.start(None, None)
+    for index in (1, 2):
+        checkpoint.record(f"key{index}", outcome(index), 0)
+    # Interrupted after the log line of the third strategy was written but
+    # before the state was saved, in the middle of the fourth line.
+    checkpoint._handle.write('{"key": "key3", "index": 3}\n{"key": "ke')
+    checkpoint._handle.flush()
+    checkpoint.close()
+
+    resumed = GoodCheck.SweepCheckpoint(path, "sweep")
+    assert resumed.load()
+    assert [key for key, _ in resumed.restore()] == ["key1", "key2"]
+    resumed.start(None, None)
+    resumed.record("key3", outcome(3), 0)
+    resumed.close()
+
+    final = GoodCheck.SweepCheckpoint(path, "sweep")
+    assert final.load()
+    assert final.restore() == [(f"key{index}", outcome(index)) for index in (1, 2, 3)]
+    assert len(path.with_name(path.name + "l").read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_discarded_strategies_run_again_on_resume(tmp_path):
+    path = tmp_path / "Checkpoint.json"
+    checkpoint = GoodCheck.SweepCheckpoint(path, "sweep")
+    checkpoint.start(None, None)
+    for index in (1, 2, 3):
+        checkpoint.record(f"key{index}", outcome(index), 0)
+    checkpoint.discard(["key2", "key3"])
+    checkpoint.record("key3", outcome(3, ("Google",)), 0)
+    checkpoint.close()
+
+    resumed = GoodCheck.SweepCheckpoint(path, "sweep")
+    assert resumed.load()
+    assert resumed.restore() == [("key1", outcome(1)), ("key3", outcome(3, ("Google",)))]
+
+
+def test_remove_deletes_both_files(tmp_path):
+    checkpoint = GoodCheck.SweepCheckpoint(tmp_path / "Checkpoint.json", "sweep")
+    checkpoint.start(None, None)
+    checkpoint.record("key", outcome(1), 0)
+    checkpoint.remove()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_fingerprint_follows_the_sweep_settings(tmp_path):
+    strategies = tmp_path / "strategies.txt"
+    strategies.write_text("--dpi-desync=fake\n", encoding="utf-8")
+    base = GoodCheck.sweep_fingerprint([strategies], [[]], settings())
+    assert base == GoodCheck.sweep_fingerprint([strategies], [[]], settings())
+    assert base != GoodCheck.sweep_fingerprint([strategies], [["--insecure"]], settings())
+    assert base != GoodCheck.sweep_fingerprint([strategies], [[]], settings(prune=True))
+    strategies.write_text("--dpi-desync=split2\n", encoding="utf-8")
+    assert base != GoodCheck.sweep_fingerprint([strategies], [[]], settings())
@@ -0,0 +1,34 @@
+"""Unattended command line runs against the local DPI simulator."""
+
+import os
+import shutil
+
+import pytest
+
+import GoodCheck
+import GoodCheckSimulator
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("curl") is None or shutil.which("openssl") is None or os.name == "nt",
+    reason="the simulator needs curl, openssl and a POSIX fake winws",
+)
+
+
+def sweep(*options):
+    args = GoodCheckSimulator.parse_arguments(
+        ["--strategies", "2", "--startup-delay", "0.05", *options]
+    )
+    return GoodCheckSimulator.run_benchmark(args)
+
+
+@pytest.mark.parametrize("engine", ["asyncio", "curl"])
+def test_threshold_above_the_default_range(engine):
+    metrics = sweep("--engine", engine, "--ok-rate", "1", "--threshold-bytes", "100000")
+    assert metrics["mismatches"] == []
+    assert metrics["goodcheck_exit_code"] == GoodCheck.EXIT_SUCCESS
+
+
+def test_unreachable_threshold_exits_without_working_strategy():
+    threshold = GoodCheckSimulator.SIM_BODY_BYTES + 1
+    metrics = sweep("--ok-rate", "1", "--threshold-bytes", str(threshold))
+    assert metrics["goodcheck_exit_code"] == GoodCheck.EXIT_NO_WORKING_STRATEGY
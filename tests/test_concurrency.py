@@ -0,0 +1,152 @@
+"""Adaptive probe concurrency and batching of checks by their limits."""
+
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import GoodCheck
+
+
+def result(status="OK", connect=0.01, total=0.1):
+    return GoodCheck.CurlResult(
+        status, status, 0, "", "", "", GoodCheck.ProbeTimings(0.0, connect, 0.02, 0.05, total)
+    )
+
+
+def feed(controller, **kwargs):
+    """Complete one window of ``controller.limit`` identical checks."""
+
+    for _ in range(controller.limit):
+        controller.observe(result(**kwargs))
+
+
+def test_fixed_limit_never_changes():
+    controller = GoodCheck.ConcurrencyController(4)
+    for _ in range(3):
+        feed(controller, status="DETECTED", connect=1.0)
+    assert controller.limit == controller.maximum == 4
+    assert controller.describe() == "4 (фиксированно)"
+
+
+def test_additive_increase_up_to_the_maximum():
+    controller = GoodCheck.ConcurrencyController(2, adaptive=True, maximum=5)
+    limits = []
+    for _ in range(5):
+        feed(controller)
+        limits.append(controller.limit)
+    assert limits == [3, 4, 5, 5, 5]
+    assert (controller.lowest, controller.highest) == (2, 5)
+
+
+def test_increase_that_does_not_pay_off_is_undone():
+    controller = GoodCheck.ConcurrencyController(4, adaptive=True, maximum=16)
+    feed(controller, total=0.4)
+    assert controller.limit == 5
+    # Checks now take proportionally longer: throughput did not improve.
+    feed(controller, total=0.5)
+    assert controller.limit == 4
+
+
+def test_timeout_burst_halves_the_limit():
+    controller = GoodCheck.ConcurrencyController(8, adaptive=True, maximum=16)
+    feed(controller)
+    assert controller.limit == 9
+    feed(controller, status="DETECTED")
+    assert controller.limit == 4
+    assert controller.lowest == 4
+
+
+def test_inflated_connect_times_halve_the_limit():
+    controller = GoodCheck.ConcurrencyController(6, adaptive=True, maximum=16)
+    feed(controller, connect=0.01)
+    feed(controller, connect=0.2)
+    assert controller.limit == 3
+
+
+def test_limit_never_drops_below_one():
+    controller = GoodCheck.ConcurrencyController(1, adaptive=True, maximum=4)
+    feed(controller)
+    assert controller.limit == 2
+    feed(controller, status="DETECTED")
+    feed(controller, status="DETECTED", connect=1.0)
+    assert controller.limit == 1
+    assert "мин 1" in controller.describe()
+
+
+def test_engine_keeps_at_most_limit_checks_in_flight(monkeypatch):
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def run_curl(*args):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+        return result(status="DETECTED", connect=0.5)
+
+    monkeypatch.setattr(GoodCheck, "run_curl", run_curl)
+    controller = GoodCheck.ConcurrencyController(4, adaptive=True, maximum=16)
+    engine = GoodCheck.CurlEngine(Path("curl"), [], controller)
+    try:
+        futures = [engine.submit(f"https://a/{number}", 5) for number in range(24)]
+        assert all(future.result().status == "DETECTED" for future in futures)
+    finally:
+        engine.close()
+    # The executor has room for 16 checks; the gate holds them to the limit.
+    assert 2 <= state["peak"] <= controller.highest < 16
+
+
+class BatchEngine:
+    """Records the batches and answers each URL with its own limits."""
+
+    def __init__(self):
+        self.batches = []
+
+    def submit_batch(self, urls, timeout_sec, threshold_bytes, source_ports=None):
+        self.batches.append((timeout_sec, threshold_bytes, [urlsplit(url).path for url in urls]))
+        futures = []
+        for url in urls:
+            future = Future()
+            text = f"{urlsplit(url).path}:{timeout_sec}:{threshold_bytes}"
+            future.set_result(GoodCheck.CurlResult("OK", "OK", threshold_bytes, "206", text, ""))
+            futures.append(future)
+        return futures
+
+
+def test_batches_are_grouped_by_timeout_and_threshold():
+    catalogue = GoodCheck.TestCatalogue(
+        [
+            GoodCheck.TestCase("A-01", "A", "https://a/1", 2, 5, 1000),
+            GoodCheck.TestCase("B-01", "B", "https://b/1", 1, 3, 1000),
+            GoodCheck.TestCase("A-02", "A", "https://a/2", 1, 5, 1000),
+            GoodCheck.TestCase("C-01", "C", "https://c/1", 1, 5, 2000),
+        ]
+    )
+    engine = BatchEngine()
+    seen = {}
+    suite = GoodCheck.run_test_suite(
+        engine,
+        5,
+        on_result=lambda test_id, provider, attempt, item: seen.update(
+            {(test_id, attempt): item.remote_ip}
+        ),
+        catalogue=catalogue,
+    )
+    assert sorted(engine.batches) == [
+        (3, 1000, ["/1"]),
+        (5, 1000, ["/1", "/1", "/2"]),
+        (5, 2000, ["/1"]),
+    ]
+    # Every result is matched back to the check it was submitted for.
+    assert seen == {
+        ("A-01", 1): "/1:5:1000",
+        ("A-01", 2): "/1:5:1000",
+        ("B-01", 1): "/1:3:1000",
+        ("A-02", 1): "/2:5:1000",
+        ("C-01", 1): "/1:5:2000",
+    }
+    assert suite.ok == 5
@@ -0,0 +1,55 @@
+"""Connection settings shared by the curl based engines."""
+
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+import GoodCheck
+
+CURL = shutil.which("curl")
+pytestmark = pytest.mark.skipif(CURL is None, reason="curl is not installed")
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.request_version, self.headers.get("Connection")))
+        body = b"x" * GoodCheck.OK_THRESHOLD_BYTES
+        self.send_response(206)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    RecordingHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("early_stop", [False, True])
+def test_run_curl_uses_a_fresh_http11_connection(url, early_stop):
+    result = GoodCheck.run_curl(Path(CURL), [], url, 5, early_stop=early_stop)
+    assert result.status == "OK"
+    assert RecordingHandler.requests == [("HTTP/1.1", "close")]
+
+
+def test_batch_engine_uses_the_same_connection_settings(url):
+    engine = GoodCheck.CurlBatchEngine(Path(CURL), [])
+    try:
+        futures = engine.submit_batch([url, url], 5)
+        assert [future.result(timeout=10).status for future in futures] == ["OK", "OK"]
+    finally:
+        engine.close()
+    assert RecordingHandler.requests == [("HTTP/1.1", "close")] * 2
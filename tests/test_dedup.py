@@ -0,0 +1,63 @@
+"""Order-insensitive deduplication of strategies."""
+
+import GoodCheck
+
+canonical = GoodCheck.canonical_strategy_text
+
+
+def test_reordered_keys_inside_a_profile_collapse():
+    assert canonical("--dpi-desync=fake --dpi-desync-ttl=3 --wf-tcp=443") == canonical(
+        "--wf-tcp=443 --dpi-desync-ttl=3 --dpi-desync=fake"
+    )
+    assert canonical(
+        "--filter-tcp=80 --dpi-desync=split2 --new --filter-tcp=443 --dpi-desync=fake --dpi-desync-ttl=4"
+    ) == canonical(
+        "--dpi-desync=split2 --filter-tcp=80 --new --dpi-desync-ttl=4 --dpi-desync=fake --filter-tcp=443"
+    )
+
+
+def test_values_given_as_separate_tokens_stay_with_their_key():
+    assert canonical("--dpi-desync fake --dpi-desync-ttl 3") == canonical(
+        "--dpi-desync-ttl 3 --dpi-desync fake"
+    )
+    assert canonical("--dpi-desync fake --dpi-desync-ttl 3") != canonical(
+        "--dpi-desync 3 --dpi-desync-ttl fake"
+    )
+
+
+def test_reordering_across_profiles_does_not_collapse():
+    assert canonical(
+        "--filter-tcp=80 --dpi-desync=split2 --new --filter-tcp=443 --dpi-desync=fake"
+    ) != canonical(
+        "--filter-tcp=443 --dpi-desync=fake --new --filter-tcp=80 --dpi-desync=split2"
+    )
+    assert canonical("--dpi-desync=fake --new --dpi-desync-ttl=3") != canonical(
+        "--dpi-desync=fake --dpi-desync-ttl=3 --new"
+    )
+
+
+def test_repeated_keys_keep_their_order():
+    first = "--dpi-desync-ttl=3 --dpi-desync=fake --dpi-desync-ttl=5"
+    assert canonical(first) == "--dpi-desync=fake --dpi-desync-ttl=3 --dpi-desync-ttl=5"
+    assert canonical(first) != canonical("--dpi-desync-ttl=5 --dpi-desync=fake --dpi-desync-ttl=3")
+
+
+def test_deduplicator_passes_first_occurrence_through():
+    strategies = [
+        GoodCheck.Strategy(1, "--dpi-desync=fake --dpi-desync-ttl=3"),
+        GoodCheck.Strategy(2, "--dpi-desync-ttl=3  --dpi-desync=fake"),
+        GoodCheck.Strategy(3, "--dpi-desync=fake --dpi-desync-ttl=4"),
+        GoodCheck.Strategy(4, "--dpi-desync=fake --new --dpi-desync-ttl=3"),
+    ]
+    deduplicator = GoodCheck.StrategyDeduplicator()
+    assert list(deduplicator.filter(strategies)) == [strategies[0], strategies[2], strategies[3]]
+    assert deduplicator.duplicates == 1
+
+
+def test_deduplicator_scopes_are_independent():
+    strategy = GoodCheck.Strategy(1, "--dpi-desync=fake")
+    deduplicator = GoodCheck.StrategyDeduplicator()
+    assert list(deduplicator.filter([strategy], scope="--ipv4")) == [strategy]
+    assert list(deduplicator.filter([strategy], scope="--ipv6")) == [strategy]
+    assert list(deduplicator.filter([strategy], scope="--ipv4")) == []
+    assert deduplicator.duplicates == 1
@@ -0,0 +1,146 @@
+"""Shard leases of the coordinator and its HTTP protocol."""
+
+import os
+import shutil
+import threading
+
+import pytest
+
+import GoodCheck
+import GoodCheckDistributed
+import GoodCheckSimulator
+
+
+def tasks(count):
+    return [
+        GoodCheckDistributed.ShardTask(
+            number, GoodCheck.Strategy(number + 1, f"--dpi-desync-ttl={number + 1}"), []
+        )
+        for number in range(count)
+    ]
+
+
+def record(providers=("Cloudflare",)):
+    outcome = GoodCheck.StrategyOutcome(
+        successes=len(providers),
+        strategy=GoodCheck.Strategy(0, ""),
+        summary="",
+        providers=tuple(providers),
+    )
+    return {"pruned": False, **GoodCheck.outcome_record(outcome)}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(GoodCheckDistributed.time, "monotonic", fake)
+    return fake
+
+
+def leased_ids(reply):
+    return [task["id"] for task in reply["tasks"]]
+
+
+def test_shards_follow_size_and_capacity(clock):
+    queue = GoodCheckDistributed.ShardQueue({}, tasks(7), shard_size=2)
+    assert leased_ids(queue.lease("a", 1)) == [0, 1]
+    # A worker with more instances gets one strategy per instance.
+    assert leased_ids(queue.lease("b", 3)) == [2, 3, 4]
+    assert leased_ids(queue.lease("a", 1)) == [5, 6]
+    assert queue.lease("c", 1) == {"wait": GoodCheckDistributed.DISTRIBUTED_POLL_SEC, "leader": -1}
+
+
+def test_results_finish_the_sweep(clock):
+    queue = GoodCheckDistributed.ShardQueue({}, tasks(2), shard_size=2)
+    queue.lease("a", 1)
+    assert queue.complete("a", 1, record(("Cloudflare", "Google"))) == {"leader": 2.0}
+    assert not queue.finished.is_set()
+    assert queue.complete("a", 0, None) == {"leader": 2.0}
+    assert queue.finished.is_set()
+    assert queue.lease("a", 1) == {"done": True}
+    assert [outcome.strategy.index for outcome in queue.results()] == [2]
+    assert queue.workers_notified()
+
+
+def test_expired_lease_is_handed_out_again(clock):
+    queue = GoodCheckDistributed.ShardQueue({}, tasks(2), shard_size=2, lease_timeout_sec=60)
+    assert leased_ids(queue.lease("slow", 1)) == [0, 1]
+    clock.now += 30
+    assert "wait" in queue.lease("fast", 1)
+    clock.now += 31
+    assert sorted(leased_ids(queue.lease("fast", 1))) == [0, 1]
+    assert queue.complete("fast", 0, record()) == {"leader": 1.0}
+    # The late result of the first worker is ignored.
+    assert queue.complete("slow", 0, record(("A", "B", "C"))) == {
+        "leader": 1.0,
+        "duplicate": True,
+    }
+    # A late first result still counts and is not reported twice.
+    assert queue.complete("slow", 1, record()) == {"leader": 1.0}
+    assert queue.finished.is_set()
+    assert len(queue.results()) == 2
+
+
+def test_released_shard_goes_to_the_next_worker(clock):
+    queue = GoodCheckDistributed.ShardQueue({}, tasks(3), shard_size=3)
+    queue.lease("leaving", 1)
+    queue.complete("leaving", 0, record())
+    assert queue.release("leaving") == {"released": 2}
+    assert sorted(leased_ids(queue.lease("other", 1))) == [1, 2]
+    assert queue.release("other") == {"released": 2}
+
+
+@pytest.fixture
+def coordinator():
+    queue = GoodCheckDistributed.ShardQueue({"passes": 1}, tasks(2), shard_size=1)
+    server = GoodCheckDistributed.CoordinatorServer(("127.0.0.1", 0), queue)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_protocol_round_trip(coordinator):
+    client = GoodCheckDistributed.CoordinatorClient(coordinator, "worker-1", retries=0)
+    assert client.request("/job") == {"passes": 1}
+    leased = client.request("/lease", {"capacity": 1})
+    assert leased["tasks"] == [
+        {"id": 0, "index": 1, "strategy": "--dpi-desync-ttl=1", "curl_args": []}
+    ]
+    assert client.request("/release", {}) == {"released": 1}
+    for task_id in (0, 1):
+        client.request("/lease", {"capacity": 1})
+        assert client.request("/result", {"id": task_id, "outcome": record()}) == {"leader": 1.0}
+    assert client.request("/lease", {"capacity": 1}) == {"done": True}
+
+
+def test_protocol_rejects_bad_requests(coordinator):
+    client = GoodCheckDistributed.CoordinatorClient(coordinator, "worker-1", retries=0)
+    with pytest.raises(ConnectionError, match="400"):
+        client.request("/result", {"outcome": None})
+    with pytest.raises(ConnectionError, match="404"):
+        client.request("/unknown", {})
+
+
+@pytest.mark.skipif(
+    shutil.which("curl") is None or shutil.which("openssl") is None or os.name == "nt",
+    reason="the simulator needs curl, openssl and a POSIX fake winws",
+)
+def test_workers_use_the_coordinator_network_target():
+    # The workers run in their own processes: the simulator's network test
+    # URL reaches them only through the job.
+    args = GoodCheckSimulator.parse_arguments(
+        ["--strategies", "2", "--startup-delay", "0.05", "--ok-rate", "1", "--distributed", "2"]
+    )
+    metrics = GoodCheckSimulator.run_benchmark(args)
+    assert metrics["mismatches"] == []
+    assert metrics["strategies"] == 6
+    assert metrics["goodcheck_exit_code"] == GoodCheck.EXIT_SUCCESS
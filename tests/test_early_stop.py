@@ -0,0 +1,72 @@
+"""Early stop of the transfer once the threshold has arrived."""
+
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+import GoodCheck
+
+THRESHOLD = GoodCheck.OK_THRESHOLD_BYTES
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/exact":
+            code, size = 206, THRESHOLD
+        else:
+            code, size = 200, THRESHOLD * 16
+        self.send_response(code)
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        try:
+            self.wfile.write(b"x" * size)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def curl_probe(url):
+    curl_path = shutil.which("curl")
+    if curl_path is None:
+        pytest.skip("curl is not installed")
+    return GoodCheck.run_curl(Path(curl_path), [], url, 5, THRESHOLD, early_stop=True)
+
+
+def asyncio_probe(url):
+    engine = GoodCheck.AsyncioEngine(early_stop=True)
+    try:
+        return engine.submit(url, 5, THRESHOLD).result(timeout=10)
+    finally:
+        engine.close()
+
+
+@pytest.mark.parametrize("probe", [curl_probe, asyncio_probe])
+def test_body_ending_at_threshold_is_not_stopped_early(probe, base_url):
+    result = probe(f"{base_url}/exact")
+    assert result.status == "OK"
+    assert result.range_honoured is True
+    assert not result.stopped_early
+    assert result.bytes_downloaded == THRESHOLD
+
+
+@pytest.mark.parametrize("probe", [curl_probe, asyncio_probe])
+def test_longer_body_is_stopped_early(probe, base_url):
+    result = probe(f"{base_url}/full")
+    assert result.status == "OK"
+    assert result.range_honoured is False
+    assert result.stopped_early
+    assert THRESHOLD <= result.bytes_downloaded < THRESHOLD * 16
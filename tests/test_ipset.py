@@ -0,0 +1,155 @@
+"""IpsetIndex lookups and ipset compaction against a brute-force scan."""
+
+import ipaddress
+import random
+
+import pytest
+
+import GoodCheck
+
+Entry = GoodCheck.IpsetEntry
+
+
+def entry(network, group=""):
+    return Entry(ipaddress.ip_network(network), group)
+
+
+def brute_force(entries, address):
+    """Most specific network containing ``address``; the later one on ties."""
+
+    ip = ipaddress.ip_address(address)
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    best = None
+    for item in entries:
+        if ip.version == item.network.version and ip in item.network:
+            if best is None or item.network.prefixlen >= best.network.prefixlen:
+                best = item
+    return (False, "") if best is None else (True, best.group)
+
+
+def random_entries(rng, base, base_prefix, max_prefix, count):
+    base = ipaddress.ip_network(base)
+    bits = base.max_prefixlen
+    entries = []
+    for _ in range(count):
+        prefix = rng.randint(base_prefix, max_prefix)
+        offset = rng.randrange(2 ** (bits - base_prefix))
+        address = int(base.network_address) + offset
+        network = ipaddress.ip_network((address, prefix), strict=False)
+        entries.append(Entry(network, f"AS{rng.randint(1, 4)}"))
+    return entries
+
+
+def probe_addresses(entries, rng, base, count=300):
+    """Boundaries of every network, their neighbours and random addresses."""
+
+    base = ipaddress.ip_network(base)
+    values = set()
+    for item in entries:
+        low = int(item.network.network_address)
+        high = int(item.network.broadcast_address)
+        values.update((low - 1, low, low + 1, high - 1, high, high + 1))
+    low, high = int(base.network_address), int(base.broadcast_address)
+    values.update(rng.randint(low, high) for _ in range(count))
+    values.update((low, high))
+    limit = 2 ** base.max_prefixlen - 1
+    factory = ipaddress.IPv4Address if base.version == 4 else ipaddress.IPv6Address
+    return [str(factory(value)) for value in sorted(values) if 0 <= value <= limit]
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize(
+    "base, base_prefix, max_prefix",
+    [("10.20.0.0/16", 16, 32), ("0.0.0.0/0", 0, 32), ("2001:db8::/112", 112, 128), ("::/0", 1, 128)],
+)
+def test_lookup_matches_brute_force(seed, base, base_prefix, max_prefix):
+    rng = random.Random(seed)
+    entries = random_entries(rng, base, base_prefix, max_prefix, rng.randint(1, 40))
+    index = GoodCheck.IpsetIndex(entries)
+    assert len(index) == len(entries)
+    for address in probe_addresses(entries, rng, base):
+        assert index.lookup(address) == brute_force(entries, address), address
+
+
+def test_lookup_of_nested_adjacent_and_mixed_families():
+    entries = [
+        entry("10.0.0.0/8", "AS1"),
+        entry("10.1.0.0/16", "AS2"),
+        entry("10.1.2.0/24", "AS3"),
+        entry("10.2.0.0/16", "AS2"),
+        entry("10.3.0.0/16", "AS2"),
+        entry("2001:db8::/32", "AS6"),
+        entry("2001:db8:1::/48", "AS7"),
+    ]
+    index = GoodCheck.IpsetIndex(entries)
+    assert index.lookup("9.255.255.255") == (False, "")
+    assert index.lookup("10.0.0.0") == (True, "AS1")
+    assert index.lookup("10.1.1.255") == (True, "AS2")
+    assert index.lookup("10.1.2.0") == (True, "AS3")
+    assert index.lookup("10.1.2.255") == (True, "AS3")
+    assert index.lookup("10.1.3.0") == (True, "AS2")
+    assert index.lookup("10.3.255.255") == (True, "AS2")
+    assert index.lookup("10.4.0.0") == (True, "AS1")
+    assert index.lookup("10.255.255.255") == (True, "AS1")
+    assert index.lookup("11.0.0.0") == (False, "")
+    assert index.lookup("::ffff:10.1.2.3") == (True, "AS3")
+    assert index.lookup("[2001:db8:1::1]") == (True, "AS7")
+    assert index.lookup("2001:db8:2::") == (True, "AS6")
+    assert index.lookup("2001:db9::") == (False, "")
+    assert index.lookup("unknown") is None
+
+
+def test_lookup_in_empty_index():
+    index = GoodCheck.IpsetIndex([])
+    assert index.lookup("1.2.3.4") == (False, "")
+    assert index.lookup("::1") == (False, "")
+
+
+def covered(entries, address):
+    ip = ipaddress.ip_address(address)
+    return any(ip.version == item.network.version and ip in item.network for item in entries)
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("keep_groups", [True, False])
+def test_compaction_keeps_coverage(seed, keep_groups):
+    rng = random.Random(seed)
+    entries = random_entries(rng, "10.0.0.0/22", 22, 32, rng.randint(1, 60))
+    entries += random_entries(rng, "2001:db8::/118", 118, 128, rng.randint(1, 30))
+    compacted = GoodCheck.compact_ipset(entries, keep_groups=keep_groups)
+
+    assert len(compacted) <= len(entries)
+    for base in ("10.0.0.0/22", "2001:db8::/118"):
+        for ip in ipaddress.ip_network(base):
+            assert covered(compacted, ip) == covered(entries, ip), ip
+    # No network is covered by another one.
+    for item in compacted:
+        assert not any(
+            other is not item
+            and other.network.version == item.network.version
+            and item.network.subnet_of(other.network)
+            for other in compacted
+        )
+    if keep_groups:
+        assert {item.group for item in compacted} <= {item.group for item in entries}
+    else:
+        for version in (4, 6):
+            networks = [item.network for item in compacted if item.network.version == version]
+            assert list(ipaddress.collapse_addresses(networks)) == sorted(networks)
+
+
+def test_compaction_merges_adjacent_networks_of_one_group():
+    entries = [
+        entry("10.0.0.0/25", "AS1"),
+        entry("10.0.0.128/25", "AS1"),
+        entry("10.0.1.0/25", "AS2"),
+        entry("10.0.1.128/25", "AS1"),
+        entry("10.0.1.0/26", "AS1"),
+    ]
+    assert GoodCheck.compact_ipset(entries) == [
+        entry("10.0.0.0/24", "AS1"),
+        entry("10.0.1.128/25", "AS1"),
+        entry("10.0.1.0/25", "AS2"),
+    ]
+    assert GoodCheck.compact_ipset(entries, keep_groups=False) == [entry("10.0.0.0/23")]
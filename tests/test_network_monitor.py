@@ -0,0 +1,126 @@
+"""Health checks of the baseline target during a sweep."""
+
+import shutil
+from concurrent.futures import Future
+
+import pytest
+
+import GoodCheck
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeNetwork:
+    """Probe engine whose checks answer from ``statuses`` in order, then OK."""
+
+    def __init__(self, clock, statuses=()):
+        self.clock = clock
+        self.statuses = list(statuses)
+        self.urls = []
+
+    def submit(self, url, timeout_sec, threshold_bytes):
+        self.urls.append(url)
+        self.clock.now += 0.5
+        future = Future()
+        status = self.statuses.pop(0) if self.statuses else "OK"
+        future.set_result(GoodCheck.CurlResult(status, status, 0, "", "", ""))
+        return future
+
+
+def outcome(index, providers=("Cloudflare",)):
+    return GoodCheck.StrategyOutcome(
+        successes=len(providers),
+        strategy=GoodCheck.Strategy(index, f"--dpi-desync=fake --dpi-desync-ttl={index}"),
+        summary="",
+        providers=tuple(providers),
+    )
+
+
+def test_check_is_due_after_interval_or_failed_strategy():
+    clock = FakeClock()
+    monitor = GoodCheck.NetworkMonitor(60, clock=clock, sleep=clock.sleep)
+    assert not monitor.due(outcome(1))
+    assert monitor.due(outcome(1, ()))
+    clock.now += 60
+    assert monitor.due(outcome(1))
+
+
+def test_reachable_target_is_no_outage():
+    clock = FakeClock()
+    network = FakeNetwork(clock, ["FAIL"])
+    monitor = GoodCheck.NetworkMonitor(60, clock=clock, sleep=clock.sleep)
+    # A single failed probe is retried at once.
+    assert monitor.check(network)
+    assert network.urls == [GoodCheck.NETWORK_TEST_URL] * 2
+    assert monitor.outages == []
+    assert monitor.lost_sec == 0
+
+
+def test_outage_spans_from_last_good_check_to_recovery(capsys):
+    clock = FakeClock()
+    monitor = GoodCheck.NetworkMonitor(60, clock=clock, sleep=clock.sleep)
+    network = FakeNetwork(clock)
+    clock.now = 110.0
+    assert monitor.check(network)
+    network.statuses = ["FAIL"] * 6
+    clock.now = 130.0
+    assert not monitor.check(network)
+    # Two failed probes, two failed retries, then recovery on the next one.
+    assert monitor.outages == [(110.0, clock.now)]
+    assert clock.now == 130.0 + 1.0 + 2 * (GoodCheck.HEALTH_RETRY_SEC + 1.0) + (
+        GoodCheck.HEALTH_RETRY_SEC + 0.5
+    )
+    assert monitor.lost_sec == clock.now - 110.0
+    assert "Сеть недоступна" in capsys.readouterr().out
+    assert monitor.affected(100.0, 111.0)
+    assert not monitor.affected(100.0, 110.0)
+    assert not monitor.affected(clock.now, clock.now + 5)
+
+
+def test_outage_withdraws_remembered_runs_inside_the_window():
+    clock = FakeClock()
+    monitor = GoodCheck.NetworkMonitor(60, clock=clock, sleep=clock.sleep)
+    network = FakeNetwork(clock)
+    clock.now = 110.0
+    assert monitor.check(network)
+    monitor.remember(1, 100.0, 108.0)
+    monitor.remember(2, 108.0, 115.0)
+    monitor.remember(3, 115.0, 125.0)
+    assert monitor.take_affected() == []
+
+    network.statuses = ["FAIL", "FAIL"]
+    clock.now = 130.0
+    assert not monitor.check(network)
+    assert monitor.take_affected() == [2, 3]
+    # Withdrawn runs are forgotten; the run before the window is kept.
+    assert monitor.take_affected() == []
+    monitor.remember(4, clock.now, clock.now + 5)
+    assert monitor.take_affected() == []
+
+
+def test_monitor_probes_the_given_target():
+    clock = FakeClock()
+    network = FakeNetwork(clock)
+    monitor = GoodCheck.NetworkMonitor(60, "https://target.example/", clock=clock)
+    assert monitor.check(network)
+    assert network.urls == ["https://target.example/"]
+
+
+@pytest.mark.skipif(shutil.which("curl") is None, reason="curl is not installed")
+def test_network_check_of_the_given_target(simulator):
+    curl_args = []
+    url = f"{simulator.base_url}/network"
+    # The simulator's certificate is self-signed.
+    assert GoodCheck.check_network(shutil.which("curl"), curl_args, url)
+    assert curl_args == ["--insecure"]
+    assert GoodCheck.NETWORK_TEST_URL != url
+    assert not GoodCheck.check_network(shutil.which("curl"), [], "https://127.0.0.1:1/")
@@ -0,0 +1,55 @@
+"""Checks with a byte threshold beyond the default Range."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+import GoodCheck
+
+
+def test_probe_range_follows_large_thresholds():
+    assert GoodCheck.probe_range(1) == GoodCheck.PROBE_RANGE
+    assert GoodCheck.probe_range(GoodCheck.OK_THRESHOLD_BYTES) == GoodCheck.PROBE_RANGE
+    assert GoodCheck.probe_range(100000) == "0-99999"
+
+
+@pytest.mark.parametrize("early_stop", [True, False])
+@pytest.mark.parametrize("name", ["asyncio", "curl", "curl-batch"])
+def test_large_threshold_passes_and_warns(simulator, name, early_stop):
+    curl_path = shutil.which("curl")
+    if name.startswith("curl") and curl_path is None:
+        pytest.skip("curl is not installed")
+    import GoodCheckSimulator
+
+    body = GoodCheckSimulator.SIM_BODY_BYTES
+    cases = simulator.test_cases()
+    big_id, big, big_url, _ = cases[0]
+    huge_id, huge, huge_url, _ = next(case for case in cases if case[1] != big)
+    catalogue = GoodCheck.TestCatalogue(
+        [
+            # The simulator has enough data for the first test only.
+            GoodCheck.TestCase(big_id, big, big_url, 1, 5, body - 1000),
+            GoodCheck.TestCase(huge_id, huge, huge_url, 1, 5, body + 1),
+        ]
+    )
+    engine = GoodCheck.create_probe_engine(
+        name, Path(curl_path) if curl_path else None, ["-k"], early_stop=early_stop
+    )
+    results = {}
+    try:
+        suite = GoodCheck.run_test_suite(
+            engine,
+            5,
+            on_result=lambda test_id, provider, attempt, result: results.update({test_id: result}),
+            catalogue=catalogue,
+        )
+    finally:
+        engine.close()
+
+    assert suite.providers == (big,)
+    assert results[big_id].status == "OK"
+    assert results[big_id].http_code == "206"
+    assert results[big_id].bytes_downloaded >= body - 1000
+    assert results[huge_id].status == "WARN"
+    assert results[huge_id].bytes_downloaded == body
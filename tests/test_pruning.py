@@ -0,0 +1,122 @@
+"""Pruning: cancelling a strategy that can no longer beat the leader."""
+
+from concurrent.futures import Future
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+
+import GoodCheck
+
+
+class FakeEngine:
+    """Answers checks by host; hosts without a status never finish."""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.futures = {}
+
+    def submit(self, url, timeout_sec, threshold_bytes, source_ports=None):
+        host = urlsplit(url).hostname
+        future = Future()
+        status = self.statuses.get(host)
+        if status is not None:
+            future.set_result(GoodCheck.CurlResult(status, status, 0, "", "", ""))
+        self.futures.setdefault(host, []).append(future)
+        return future
+
+
+def catalogue(weights=None):
+    tests = GoodCheck.TestCatalogue.from_test_cases(
+        [
+            ("A-01", "A", "https://a/", 2),
+            ("B-01", "B", "https://b/", 1),
+            ("C-01", "C", "https://c/", 1),
+        ],
+        5,
+    )
+    return GoodCheck.TestCatalogue(tests.tests, weights)
+
+
+def run(statuses, prune_below, weights=None):
+    engine = FakeEngine(statuses)
+    seen = []
+    suite = GoodCheck.run_test_suite(
+        engine,
+        5,
+        prune_below=prune_below,
+        on_result=lambda test_id, provider, attempt, result: seen.append(provider),
+        catalogue=catalogue(weights),
+    )
+    return suite, engine, seen
+
+
+def test_pass_is_cancelled_once_the_leader_is_out_of_reach():
+    suite, engine, seen = run({"a": "FAIL", "b": "DETECTED"}, prune_below=2)
+    assert suite.aborted
+    assert suite.providers == ()
+    assert sorted(seen) == ["A", "A", "B"]
+    assert suite.summary.endswith("Skipped:1")
+    assert all(future.cancelled() for future in engine.futures["c"])
+
+
+def test_matching_the_leader_is_not_pruned():
+    suite, _, seen = run({"a": "OK", "b": "FAIL", "c": "FAIL"}, prune_below=1)
+    assert not suite.aborted
+    assert len(seen) == 4
+    assert suite.providers == ("A",)
+
+
+def test_weights_count_towards_the_reachable_score():
+    suite, _, _ = run({"a": "OK", "b": "FAIL", "c": "FAIL"}, prune_below=2, weights={"A": 3})
+    assert not suite.aborted
+
+
+def test_without_a_leader_every_check_runs():
+    suite, _, seen = run({"a": "FAIL", "b": "FAIL", "c": "FAIL"}, prune_below=-1)
+    assert not suite.aborted
+    assert len(seen) == 4
+    assert "Skipped" not in suite.summary
+
+
+def test_pruned_strategy_stops_winws_and_skips_the_remaining_passes(monkeypatch):
+    events = []
+    monkeypatch.setattr(GoodCheck, "start_winws", lambda *args: events.append("start"))
+    monkeypatch.setattr(GoodCheck, "wait_winws_ready", lambda *args: True)
+    monkeypatch.setattr(GoodCheck, "terminate_winws", lambda *args: events.append("stop"))
+
+    def run_test_suite(**kwargs):
+        events.append(("pass", kwargs["prune_below"]))
+        return GoodCheck.SuiteResult(1, "OK:1, Warn:0, Detected:0, Fail:1, Skipped:2", ("A",), True)
+
+    monkeypatch.setattr(GoodCheck, "run_test_suite", run_test_suite)
+    settings = GoodCheck.SweepSettings(
+        winws_path=Path("winws.exe"), passes=3, timeout_sec=5, prune=True, catalogue=catalogue()
+    )
+    outcome = GoodCheck.evaluate_strategy(
+        settings, GoodCheck.Strategy(1, "--dpi-desync=fake"), None, 4, leader_score=2
+    )
+    assert events == ["start", ("pass", 2), "stop"]
+    assert outcome.pruned
+    assert outcome.providers == ("A",)
+
+
+@pytest.mark.parametrize("prune, prune_below", [(False, -1), (True, 2)])
+def test_leader_is_passed_on_only_with_prune(monkeypatch, prune, prune_below):
+    seen = []
+    monkeypatch.setattr(GoodCheck, "start_winws", lambda *args: None)
+    monkeypatch.setattr(GoodCheck, "wait_winws_ready", lambda *args: True)
+    monkeypatch.setattr(GoodCheck, "terminate_winws", lambda *args: None)
+    monkeypatch.setattr(
+        GoodCheck,
+        "run_test_suite",
+        lambda **kwargs: seen.append(kwargs["prune_below"]) or GoodCheck.SuiteResult(0, "", ()),
+    )
+    settings = GoodCheck.SweepSettings(
+        winws_path=Path("winws.exe"), passes=2, timeout_sec=5, prune=prune, catalogue=catalogue()
+    )
+    outcome = GoodCheck.evaluate_strategy(
+        settings, GoodCheck.Strategy(1, "--dpi-desync=fake"), None, 4, leader_score=2
+    )
+    assert seen == [prune_below, prune_below]
+    assert not outcome.pruned
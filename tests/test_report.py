@@ -0,0 +1,26 @@
+"""Final report and exit status of a sweep."""
+
+import GoodCheck
+
+
+def outcome(index, providers, screened_out=False):
+    return GoodCheck.StrategyOutcome(
+        successes=len(providers),
+        strategy=GoodCheck.Strategy(index, f"--dpi-desync-ttl={index}"),
+        summary="",
+        providers=tuple(providers),
+        screened_out=screened_out,
+    )
+
+
+def test_max_provider_count_ignores_screening_outcomes():
+    results = [
+        outcome(1, ("Cloudflare",)),
+        outcome(2, ("Cloudflare", "Google", "Amazon"), screened_out=True),
+    ]
+    assert GoodCheck.max_provider_count(results) == 1
+
+
+def test_max_provider_count_without_completed_suites():
+    assert GoodCheck.max_provider_count([]) == -1
+    assert GoodCheck.max_provider_count([outcome(1, ("Google",), screened_out=True)]) == -1
@@ -0,0 +1,171 @@
+"""Shared DNS cache and the addresses pinned for every check."""
+
+import shutil
+import socket
+from pathlib import Path
+
+import pytest
+
+import GoodCheck
+
+
+class FakeDns:
+    """``getaddrinfo`` that knows a few hosts and counts its calls."""
+
+    def __init__(self, hosts, real=socket.getaddrinfo):
+        self.hosts = hosts
+        self.real = real
+        self.calls = []
+
+    def __call__(self, host, port, family=0, type=0, *args, **kwargs):
+        if host not in self.hosts:
+            if host.endswith(".test"):
+                raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+            return self.real(host, port, family, type, *args, **kwargs)
+        self.calls.append(host)
+        return [
+            (
+                socket.AF_INET6 if ":" in address else socket.AF_INET,
+                socket.SOCK_STREAM,
+                6,
+                "",
+                (address, port),
+            )
+            for address in self.hosts[host]
+        ]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def dns(monkeypatch):
+    fake = FakeDns({"a.test": ["192.0.2.1", "2001:db8::1"], "b.test": ["192.0.2.2"]})
+    monkeypatch.setattr(GoodCheck.socket, "getaddrinfo", fake)
+    return fake
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(GoodCheck.time, "monotonic", fake)
+    return fake
+
+
+def test_hosts_are_resolved_once_per_ttl(dns, clock):
+    resolver = GoodCheck.HostResolver(ttl_sec=60)
+    first = resolver.lookup("a.test", 443)
+    assert resolver.lookup("A.TEST", 443) == first
+    clock.now += 59
+    resolver.lookup("a.test", 443)
+    assert dns.calls == ["a.test"]
+    clock.now += 2
+    resolver.lookup("a.test", 443)
+    assert dns.calls == ["a.test", "a.test"]
+    assert resolver.lookups == 2
+
+
+def test_unresolvable_host_is_not_cached(dns, clock):
+    resolver = GoodCheck.HostResolver()
+    assert resolver.lookup("missing.test", 443) == ()
+    assert resolver.cached("missing.test", 443) is None
+    assert resolver.curl_arguments("https://missing.test/") == []
+    assert resolver.lookups == 0
+
+
+def test_resolve_keys_pin_every_address(dns, clock):
+    resolver = GoodCheck.HostResolver()
+    assert resolver.curl_arguments("https://a.test/file?x=1") == [
+        "--resolve",
+        "a.test:443:192.0.2.1,[2001:db8::1]",
+    ]
+    assert resolver.curl_arguments("http://b.test:8080/") == [
+        "--resolve",
+        "b.test:8080:192.0.2.2",
+    ]
+    assert resolver.curl_arguments("https://192.0.2.9/") == []
+    assert resolver.curl_arguments("ftp://a.test/") == []
+
+
+def test_prefetch_reports_failed_hosts_once(dns, clock):
+    resolver = GoodCheck.HostResolver()
+    failed = resolver.prefetch(
+        ["https://a.test/1", "https://a.test/2", "https://missing.test/", "https://192.0.2.9/"]
+    )
+    assert failed == ["missing.test"]
+    assert dns.calls == ["a.test"]
+
+
+def test_connection_failures_refresh_the_host(dns, clock):
+    resolver = GoodCheck.HostResolver()
+    resolver.lookup("a.test", 443)
+    resolver.lookup("a.test", 443, socket.AF_INET)
+
+    def check(exit_code):
+        result = GoodCheck.CurlResult("DETECTED", "", 0, "000", "", "")
+        result.exit_code = exit_code
+        resolver.observe("https://a.test/file", result)
+
+    check(28)
+    assert resolver.cached("a.test", 443) is not None
+    check(7)
+    assert resolver.cached("a.test", 443) is None
+    assert resolver.cached("a.test", 443, socket.AF_INET) is None
+    assert resolver.refreshes == 1
+    resolver.lookup("a.test", 443)
+    assert dns.calls == ["a.test", "a.test", "a.test"]
+
+
+def test_user_pins_and_address_family_come_from_curl_keys():
+    args = ["-4", "--resolve", "a.test:443:192.0.2.7", "--resolve=+B.test:80:192.0.2.8"]
+    assert GoodCheck.curl_resolved_endpoints(args) == {("a.test", 443), ("b.test", 80)}
+    assert GoodCheck.curl_address_family(args) == socket.AF_INET
+    assert GoodCheck.curl_address_family(["-6"]) == socket.AF_INET6
+
+
+def test_user_pinned_host_bypasses_the_resolver(dns, clock):
+    engine = GoodCheck.CurlEngine(
+        Path("curl"), ["--resolve", "a.test:443:192.0.2.7"], resolver=GoodCheck.HostResolver()
+    )
+    try:
+        assert engine._pin_arguments("https://a.test/") == []
+        assert engine._pin_arguments("https://b.test/") == ["--resolve", "b.test:443:192.0.2.2"]
+    finally:
+        engine.close()
+    assert dns.calls == ["b.test"]
+
+
+@pytest.mark.parametrize("name", ["asyncio", "curl", "curl-batch"])
+def test_checks_go_to_the_pinned_address(simulator, monkeypatch, name):
+    curl_path = shutil.which("curl")
+    if name.startswith("curl") and curl_path is None:
+        pytest.skip("curl is not installed")
+    test_id, provider, url, _ = simulator.test_cases()[0]
+    port = simulator.server_address[1]
+    url = url.replace("127.0.0.1", "goodcheck.test")
+    resolver = GoodCheck.HostResolver()
+    fake = FakeDns({"goodcheck.test": ["127.0.0.1"]})
+    monkeypatch.setattr(GoodCheck.socket, "getaddrinfo", fake)
+    assert resolver.prefetch([url]) == []
+    # From here on the name only resolves through the cache.
+    fake.hosts = {}
+
+    engine = GoodCheck.create_probe_engine(
+        name, Path(curl_path) if curl_path else None, ["-k"], resolver=resolver
+    )
+    try:
+        suite = GoodCheck.run_test_suite(
+            engine,
+            5,
+            catalogue=GoodCheck.TestCatalogue([GoodCheck.TestCase(test_id, provider, url, 2, 5)]),
+        )
+    finally:
+        engine.close()
+    assert suite.ok == 2
+    assert resolver.cached("goodcheck.test", port) is not None
+    assert fake.calls == ["goodcheck.test"]
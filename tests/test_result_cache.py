@@ -0,0 +1,146 @@
+"""The result cache of finished strategies."""
+
+import json
+import os
+import shutil
+
+import pytest
+
+import GoodCheck
+import GoodCheckSimulator
+
+
+def outcome(index, providers=("Cloudflare",)):
+    return GoodCheck.StrategyOutcome(
+        successes=len(providers) * 2,
+        strategy=GoodCheck.Strategy(index, f"--dpi-desync=fake --dpi-desync-ttl={index}"),
+        summary=f"OK:{len(providers) * 2}, Warn:0, Detected:0, Fail:0",
+        providers=tuple(providers),
+    )
+
+
+def key(strategy_text="--dpi-desync=fake", curl_args=(), engine="curl", **overrides):
+    options = {"passes": 1, "timeout_sec": 5, **overrides}
+    return GoodCheck.result_cache_key(
+        strategy_text,
+        list(curl_args),
+        options.pop("passes"),
+        options.pop("timeout_sec"),
+        engine_name=engine,
+        **options,
+    )
+
+
+def test_key_follows_everything_that_changes_the_outcome():
+    base = key()
+    assert base == key("  --dpi-desync=fake  ")
+    assert base != key("--dpi-desync=split2")
+    assert base != key(curl_args=["--ipv4"])
+    assert base != key(engine="asyncio")
+    assert base != key(passes=2)
+    assert base != key(threshold_bytes=GoodCheck.OK_THRESHOLD_BYTES + 1)
+    catalogue = GoodCheck.TestCatalogue.from_test_cases(GoodCheck.TEST_CASES[:1], 5)
+    assert base != key(catalogue=catalogue)
+    assert base != key(screen=catalogue)
+
+
+def test_hit_within_ttl_and_miss_on_another_key(tmp_path):
+    cache = GoodCheck.ResultCache(tmp_path / "Cache.jsonl", ttl_sec=3600)
+    cache.store(key(), [], outcome(1))
+    assert cache.lookup(key(), outcome(1).strategy) == outcome(1)
+    assert cache.lookup(key(engine="asyncio"), outcome(1).strategy) is None
+    assert cache.hits == 1
+    cache.close()
+
+
+def test_expired_entries_and_disabled_ttl_miss(tmp_path, monkeypatch):
+    path = tmp_path / "Cache.jsonl"
+    cache = GoodCheck.ResultCache(path, ttl_sec=60)
+    cache.store("key", [], outcome(1))
+    now = GoodCheck.time.time()
+    monkeypatch.setattr(GoodCheck.time, "time", lambda: now + 61)
+    assert cache.lookup("key", outcome(1).strategy) is None
+    cache.close()
+    monkeypatch.undo()
+    disabled = GoodCheck.ResultCache(path, ttl_sec=0)
+    assert disabled.lookup("key", outcome(1).strategy) is None
+    disabled.close()
+
+
+def test_compaction_drops_superseded_old_and_surplus_entries(tmp_path, monkeypatch):
+    path = tmp_path / "Cache.jsonl"
+    cache = GoodCheck.ResultCache(path, ttl_sec=3600, max_age_sec=100, max_entries=2)
+    now = 1000.0
+    monkeypatch.setattr(GoodCheck.time, "time", lambda: now)
+    cache.store("old", [], outcome(1))
+    for index in (2, 3, 4):
+        now = 1200.0 + index
+        cache.store(f"key{index}", [], outcome(index))
+    cache.store("key4", [], outcome(4, ("Google",)))
+    # "old" has expired and key2 is beyond max_entries.
+    assert cache.compact() == 2
+    assert cache.compact() == 0
+    cache.close()
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [record["key"] for record in records] == ["key3", "key4"]
+    assert records[1]["providers"] == ["Google"]
+
+
+def test_discarded_entries_are_gone_after_reopening(tmp_path):
+    path = tmp_path / "Cache.jsonl"
+    cache = GoodCheck.ResultCache(path, ttl_sec=3600)
+    for index in (1, 2):
+        cache.store(f"key{index}", [], outcome(index))
+    cache.discard(["key1", "unknown"])
+    assert cache.lookup("key1", outcome(1).strategy) is None
+    cache.close()
+
+    reopened = GoodCheck.ResultCache(path, ttl_sec=3600)
+    assert reopened.lookup("key1", outcome(1).strategy) is None
+    assert reopened.lookup("key2", outcome(2).strategy) == outcome(2)
+    reopened.close()
+
+
+@pytest.mark.skipif(
+    shutil.which("curl") is None or os.name == "nt",
+    reason="the sweep needs curl and a POSIX fake winws",
+)
+def test_insecure_from_the_network_check_keeps_the_cache_key(
+    simulator, tmp_path, monkeypatch, capsys
+):
+    strategies = tmp_path / "strategies.txt"
+    strategies.write_text(
+        "--wf-tcp=443 --dpi-desync=fake\n--wf-tcp=443 --dpi-desync=split2\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "state").mkdir()
+    launcher = GoodCheckSimulator.write_launcher(tmp_path, tmp_path / "state", 0.05)
+    monkeypatch.setattr(GoodCheck, "TEST_CASES", simulator.test_cases()[:2])
+
+    def sweep(network_test_url):
+        monkeypatch.setattr(GoodCheck, "NETWORK_TEST_URL", network_test_url)
+        return GoodCheck.main(
+            [
+                "--batch",
+                "--strategies", str(strategies),
+                "--output-dir", str(tmp_path / "output"),
+                "--cache-file", str(tmp_path / "cache.jsonl"),
+                "--cache-ttl", "3600",
+                "--passes", "1",
+                "--winws", str(launcher),
+                "--curl", shutil.which("curl"),
+                "--engine", "curl",
+                "--health-interval", "0",
+            ]
+        )
+
+    # The self-signed simulator makes the network check add --insecure.
+    assert sweep(f"{simulator.base_url}/network") == GoodCheck.EXIT_SUCCESS
+    capsys.readouterr()
+    # Without it the strategies would fail, so they must come from the cache.
+    assert sweep("https://127.0.0.1:1/") == GoodCheck.EXIT_SUCCESS
+    out = capsys.readouterr().out
+    # The two lines expand to six strategy variants.
+    assert out.count("Результат из кэша") == 6
+    assert "Стратегий взято из кэша: 6" in out
@@ -0,0 +1,94 @@
+"""Parallel strategy instances and their local port ranges."""
+
+import threading
+import time
+
+import GoodCheck
+
+
+class Recorder:
+    """Tasks that note which instances run at the same time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}
+        self.overlaps = []
+        self.exclusive_saw = []
+        self.done = []
+
+    def task(self, name, source_ports):
+        with self.lock:
+            self.overlaps.extend((source_ports, other) for other in self.running.values())
+            self.running[name] = source_ports
+        time.sleep(0.05)
+        with self.lock:
+            del self.running[name]
+        return name
+
+    def exclusive(self, name, source_ports):
+        with self.lock:
+            self.exclusive_saw.append((source_ports, dict(self.running)))
+        return name
+
+
+def test_instance_port_ranges_do_not_overlap():
+    ranges = [GoodCheck.instance_source_ports(slot) for slot in range(16)]
+    for (low, high), (next_low, _) in zip(ranges, ranges[1:]):
+        assert low <= high < next_low
+    assert ranges[0][0] == GoodCheck.PARALLEL_PORT_BASE
+    assert ranges[-1][1] <= 65535
+
+
+def test_running_instances_use_disjoint_port_ranges():
+    recorder = Recorder()
+    scheduler = GoodCheck.StrategyScheduler(3)
+    try:
+        for number in range(9):
+            scheduler.submit(
+                lambda ports, number=number: recorder.task(number, ports),
+                recorder.done.append,
+            )
+        scheduler.drain()
+    finally:
+        scheduler.close()
+    assert sorted(recorder.done) == list(range(9))
+    assert recorder.overlaps
+    for (low, high), (other_low, other_high) in recorder.overlaps:
+        assert high < other_low or other_high < low
+
+
+def test_exclusive_strategy_drains_the_pool():
+    recorder = Recorder()
+    scheduler = GoodCheck.StrategyScheduler(3)
+    try:
+        for number in range(3):
+            scheduler.submit(
+                lambda ports, number=number: recorder.task(number, ports),
+                recorder.done.append,
+            )
+        scheduler.submit(
+            lambda ports: recorder.exclusive("exclusive", ports),
+            recorder.done.append,
+            exclusive=True,
+        )
+        scheduler.submit(lambda ports: recorder.task(3, ports), recorder.done.append)
+        scheduler.drain()
+    finally:
+        scheduler.close()
+    # Nothing else ran next to it and every earlier strategy was reported first.
+    assert recorder.exclusive_saw == [(None, {})]
+    assert recorder.done.index("exclusive") == 3
+    assert sorted(recorder.done[:3]) == [0, 1, 2]
+    assert recorder.done[-1] == 3
+
+
+def test_first_slot_isolates_a_single_instance():
+    seen = []
+    scheduler = GoodCheck.StrategyScheduler(1, first_slot=2)
+    try:
+        assert scheduler.parallel
+        scheduler.submit(lambda ports: ports, seen.append)
+        scheduler.drain()
+    finally:
+        scheduler.close()
+    assert seen == [GoodCheck.instance_source_ports(2)]
@@ -0,0 +1,145 @@
+"""Two-stage sweeps: a quick screening stage before the full passes."""
+
+import os
+import shutil
+from concurrent.futures import Future
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+
+import GoodCheck
+import GoodCheckSimulator
+
+
+def catalogue():
+    return GoodCheck.TestCatalogue.from_test_cases(
+        [
+            ("A-01", "A", "https://a/1", 3),
+            ("A-02", "A", "https://a/2", 1),
+            ("B-01", "B", "https://b/1", 2),
+            ("C-01", "C", "https://c/1", 1),
+        ],
+        5,
+    )
+
+
+class FakeEngine:
+    """Answers checks by host; hosts without a status never finish."""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.urls = []
+        self.futures = []
+
+    def submit(self, url, timeout_sec, threshold_bytes, source_ports=None):
+        self.urls.append(urlsplit(url).hostname)
+        future = Future()
+        status = self.statuses.get(urlsplit(url).hostname)
+        if status is not None:
+            future.set_result(GoodCheck.CurlResult(status, status, 0, "", "", ""))
+        self.futures.append(future)
+        return future
+
+
+@pytest.fixture
+def winws(monkeypatch):
+    events = []
+    monkeypatch.setattr(GoodCheck, "start_winws", lambda *args: events.append("start"))
+    monkeypatch.setattr(GoodCheck, "wait_winws_ready", lambda *args: True)
+    monkeypatch.setattr(GoodCheck, "terminate_winws", lambda *args: events.append("stop"))
+    return events
+
+
+def settings(min_score=1, passes=2):
+    tests = catalogue()
+    return GoodCheck.SweepSettings(
+        winws_path=Path("winws.exe"),
+        passes=passes,
+        timeout_sec=5,
+        catalogue=tests,
+        screen=tests.screening(2),
+        screen_min_score=min_score,
+    )
+
+
+def test_screening_runs_the_first_test_of_every_provider_once():
+    screen = GoodCheck.TestCatalogue(catalogue().tests, {"B": 2}).screening(2)
+    assert [test.test_id for test in screen.tests] == ["A-01", "B-01", "C-01"]
+    assert {test.times for test in screen.tests} == {1}
+    assert {test.timeout_sec for test in screen.tests} == {2}
+    assert screen.weights == {"B": 2}
+    # A test that is already quicker keeps its own timeout.
+    quick = GoodCheck.TestCatalogue([GoodCheck.TestCase("A-01", "A", "https://a/", 2, 1)])
+    assert quick.screening(3).tests[0].timeout_sec == 1
+
+
+def test_screen_option_derives_the_stage_from_the_suite():
+    args = GoodCheck.parse_arguments(["--screen", "--screen-timeout-ms", "1500"])
+    suite, screen = GoodCheck.catalogues_from_arguments(args)
+    assert len(screen.tests) == len(dict.fromkeys(test.provider for test in suite.tests))
+    assert {test.timeout_sec for test in screen.tests} == {2}
+    assert GoodCheck.catalogues_from_arguments(GoodCheck.parse_arguments([]))[1] is None
+
+
+def test_rejected_strategy_skips_the_full_passes(winws):
+    engine = FakeEngine({"a": "FAIL", "b": "FAIL", "c": "FAIL"})
+    outcome = GoodCheck.evaluate_strategy(
+        settings(), GoodCheck.Strategy(1, "--dpi-desync=fake"), engine, 7
+    )
+    assert winws == ["start", "stop"]
+    assert sorted(engine.urls) == ["a", "b", "c"]
+    assert outcome.screened_out
+    assert outcome.summary.startswith("отбор: ")
+    assert (outcome.providers, outcome.score) == ((), 0.0)
+
+
+def test_cleared_strategy_runs_every_pass_in_the_same_session(winws):
+    engine = FakeEngine({"a": "OK", "b": "FAIL", "c": "FAIL"})
+    outcome = GoodCheck.evaluate_strategy(
+        settings(), GoodCheck.Strategy(1, "--dpi-desync=fake"), engine, 7
+    )
+    assert winws == ["start", "stop"]
+    # Three screening checks, then two passes of the seven full checks.
+    assert len(engine.urls) == 3 + 2 * 7
+    assert not outcome.screened_out
+    assert outcome.providers == ("A",)
+
+
+def test_screening_stops_once_the_bar_is_out_of_reach(winws):
+    # With every provider required a single failure settles it;
+    # the checks still in flight are cancelled instead of awaited.
+    engine = FakeEngine({"a": "FAIL", "b": "OK"})
+    outcome = GoodCheck.evaluate_strategy(
+        settings(min_score=3), GoodCheck.Strategy(1, "--dpi-desync=fake"), engine, 7
+    )
+    assert outcome.screened_out
+    assert len(engine.urls) == 3
+    assert engine.futures[2].cancelled()
+
+
+def test_screening_only_results_rank_below_full_suite_ties():
+    def outcome(index, screened_out):
+        return GoodCheck.StrategyOutcome(
+            successes=1,
+            strategy=GoodCheck.Strategy(index, f"--dpi-desync-ttl={index}"),
+            summary="",
+            providers=("A",),
+            screened_out=screened_out,
+            score=1.0,
+        )
+
+    screened, full = outcome(1, True), outcome(2, False)
+    assert GoodCheck.rank_results([full, screened]) == [screened, full]
+
+
+@pytest.mark.skipif(
+    shutil.which("curl") is None or shutil.which("openssl") is None or os.name == "nt",
+    reason="the simulator needs curl, openssl and a POSIX fake winws",
+)
+def test_screened_sweep_matches_the_dpi_model():
+    args = GoodCheckSimulator.parse_arguments(
+        ["--strategies", "2", "--startup-delay", "0.05", "--ok-rate", "0.5", "--screen"]
+    )
+    metrics = GoodCheckSimulator.run_benchmark(args)
+    assert metrics["mismatches"] == []
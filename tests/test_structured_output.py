@@ -0,0 +1,118 @@
+"""Machine-readable probe and summary records."""
+
+import csv
+import json
+import threading
+
+import pytest
+
+import GoodCheck
+
+
+def probe_result(status="OK"):
+    return GoodCheck.CurlResult(status, status, 65536, "206", "127.0.0.1", "")
+
+
+def outcome(index, providers):
+    return GoodCheck.StrategyOutcome(
+        successes=len(providers),
+        strategy=GoodCheck.Strategy(index, f"--dpi-desync=fake --dpi-desync-ttl={index}"),
+        summary=f"OK:{len(providers)}, Warn:0, Detected:0, Fail:0",
+        providers=tuple(providers),
+        tls_times=(0.1, 0.3),
+        total_times=(0.2, 0.4),
+    )
+
+
+def read(path):
+    with path.open(encoding="utf-8", newline="") as handle:
+        if path.suffix == ".csv":
+            return list(csv.DictReader(handle))
+        return [json.loads(line) for line in handle]
+
+
+def test_probe_record_fields(tmp_path):
+    sink = GoodCheck.StructuredResultSink(tmp_path / "Probes.jsonl", tmp_path / "Summary.jsonl")
+    result = probe_result()
+    result.timings = GoodCheck.ProbeTimings(0.001, 0.002, 0.01, 0.02, 0.025)
+    strategy = GoodCheck.Strategy(3, "--dpi-desync=fake")
+    sink.record_probe(strategy, 2, "CF-01", "Cloudflare", 1, result)
+    sink.close()
+    [record] = read(sink.probes_path)
+    assert tuple(record) == GoodCheck.PROBE_RECORD_FIELDS
+    assert record["strategy_index"] == 3
+    assert record["pass"] == 2
+    assert (record["status"], record["bytes"], record["http_code"]) == ("OK", 65536, "206")
+    assert record["time_appconnect"] == 0.01
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".csv"])
+def test_summary_has_one_record_per_strategy(tmp_path, suffix):
+    path = tmp_path / f"Summary{suffix}"
+    GoodCheck.write_summary_file(path, [outcome(1, ("Cloudflare", "Google")), outcome(2, ())], 4)
+    records = read(path)
+    assert [tuple(record) for record in records] == [GoodCheck.SUMMARY_RECORD_FIELDS] * 2
+    first = records[0]
+    if suffix == ".csv":
+        assert first["providers"] == "Cloudflare;Google"
+        assert first["tls_p90"] == "0.3"
+    else:
+        assert first["providers"] == ["Cloudflare", "Google"]
+        assert first["tls_p90"] == 0.3
+    assert records[1]["providers"] in ("", [])
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".csv"])
+def test_resumed_probe_log_drops_records_after_the_checkpoint(tmp_path, suffix):
+    probes = tmp_path / f"Probes{suffix}"
+    strategy = GoodCheck.Strategy(1, "--dpi-desync=fake")
+    sink = GoodCheck.StructuredResultSink(probes, tmp_path / f"Summary{suffix}")
+    sink.record_probe(strategy, 1, "CF-01", "Cloudflare", 1, probe_result())
+    checkpoint_size = sink.probes_size()
+    sink.record_probe(strategy, 1, "CF-01", "Cloudflare", 2, probe_result("FAIL"))
+    sink.close()
+
+    resumed = GoodCheck.StructuredResultSink(
+        probes, tmp_path / f"Summary{suffix}", resume_size=checkpoint_size
+    )
+    resumed.record_probe(strategy, 1, "CF-01", "Cloudflare", 2, probe_result())
+    resumed.close()
+    records = read(probes)
+    assert [(int(r["attempt"]), r["status"]) for r in records] == [(1, "OK"), (2, "OK")]
+
+
+def test_unwritable_output_raises_oserror(tmp_path):
+    # The sweep reports this and continues without structured output.
+    with pytest.raises(OSError):
+        GoodCheck.StructuredResultSink(
+            tmp_path / "missing" / "Probes.jsonl", tmp_path / "Summary.jsonl"
+        )
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".csv"])
+def test_probes_from_parallel_instances_stay_whole(tmp_path, suffix):
+    sink = GoodCheck.StructuredResultSink(
+        tmp_path / f"Probes{suffix}", tmp_path / f"Summary{suffix}"
+    )
+
+    def instance(index):
+        strategy = GoodCheck.Strategy(index, f"--dpi-desync=fake --dpi-desync-ttl={index}")
+        for attempt in range(200):
+            sink.record_probe(strategy, 1, "CF-01", "Cloudflare", attempt, probe_result())
+
+    threads = [threading.Thread(target=instance, args=(index,)) for index in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.close()
+
+    with sink.probes_path.open(encoding="utf-8", newline="") as handle:
+        if suffix == ".csv":
+            records = list(csv.DictReader(handle))
+        else:
+            records = [json.loads(line) for line in handle]
+    assert len(records) == 800
+    for index in range(1, 5):
+        attempts = [int(r["attempt"]) for r in records if int(r["strategy_index"]) == index]
+        assert attempts == list(range(200))
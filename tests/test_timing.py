@@ -0,0 +1,109 @@
+"""Per-probe timing breakdown and the latency percentiles of strategies."""
+
+import shutil
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+
+import GoodCheck
+
+WRITE_OUT = (
+    "HTTP_CODE=206;SIZE=65536;IP=127.0.0.1;T_DNS=0.001;T_CONNECT=0.002;"
+    "T_TLS=0.010;T_TTFB=0.020;T_TOTAL=0.025;ERR="
+)
+
+
+def outcome(index, total_times, successes=2):
+    return GoodCheck.StrategyOutcome(
+        successes=successes,
+        strategy=GoodCheck.Strategy(index, f"--dpi-desync-ttl={index}"),
+        summary="",
+        providers=("Cloudflare",),
+        tls_times=tuple(value / 2 for value in total_times),
+        total_times=tuple(total_times),
+    )
+
+
+def test_write_out_timings_are_parsed():
+    result = GoodCheck.parse_curl_output(0, "", WRITE_OUT)
+    assert result.status == "OK"
+    assert result.timings == GoodCheck.ProbeTimings(0.001, 0.002, 0.010, 0.020, 0.025)
+
+
+def test_malformed_timing_is_left_at_zero():
+    result = GoodCheck.parse_curl_output(0, "", WRITE_OUT.replace("T_TLS=0.010", "T_TLS=n/a"))
+    assert result.status == "OK"
+    assert result.timings.appconnect == 0.0
+    assert result.timings.total == 0.025
+
+
+def test_nearest_rank_percentiles():
+    values = [0.5, 0.1, 0.4, 0.2, 0.3]
+    assert GoodCheck.percentiles(values, (50, 90, 100)) == (0.3, 0.5, 0.5)
+    assert GoodCheck.percentile([0.7], 10) == 0.7
+    assert GoodCheck.percentiles([], (50, 90)) == (0.0, 0.0)
+
+
+def test_latency_text_without_ok_checks():
+    assert outcome(1, ()).latency_text() == "задержки: нет данных"
+    text = outcome(2, (0.2, 0.4)).latency_text()
+    assert text == "TLS p50 0.100 с / p90 0.200 с, всего p50 0.200 с / p90 0.400 с"
+
+
+def test_faster_strategy_ranks_higher_among_equals():
+    slow, fast, unknown = outcome(1, (0.9, 1.0)), outcome(2, (0.1, 0.2)), outcome(3, ())
+    assert GoodCheck.rank_results([fast, unknown, slow]) == [unknown, slow, fast]
+    # More successes still outweigh latency.
+    steady = outcome(4, (2.0,), successes=3)
+    assert GoodCheck.rank_results([steady, fast])[-1] is steady
+
+
+class TimedEngine:
+    """Answers ``/ok`` URLs with OK and every other one with a slow failure."""
+
+    def submit(self, url, timeout_sec, threshold_bytes, source_ports=None):
+        status = "OK" if "/ok" in url else "FAIL"
+        timings = GoodCheck.ProbeTimings(0.0, 0.1, 0.2, 0.3, 0.4 if status == "OK" else 5.0)
+        future = Future()
+        future.set_result(GoodCheck.CurlResult(status, status, 0, "", "", "", timings))
+        return future
+
+
+def test_only_successful_checks_feed_the_percentiles():
+    catalogue = GoodCheck.TestCatalogue.from_test_cases(
+        [("OK-01", "A", "https://a/ok", 1), ("TO-01", "B", "https://b/timeout", 1)], 5
+    )
+    suite = GoodCheck.run_test_suite(TimedEngine(), 5, catalogue=catalogue)
+    assert suite.tls_times == (0.2,)
+    assert suite.total_times == (0.4,)
+
+
+@pytest.mark.parametrize("name", ["asyncio", "curl", "curl-batch"])
+def test_probe_timings_are_cumulative(simulator, name):
+    curl_path = shutil.which("curl")
+    if name.startswith("curl") and curl_path is None:
+        pytest.skip("curl is not installed")
+    test_id, provider, url, _ = simulator.test_cases()[0]
+    catalogue = GoodCheck.TestCatalogue([GoodCheck.TestCase(test_id, provider, url, 2, 5)])
+    engine = GoodCheck.create_probe_engine(
+        name, Path(curl_path) if curl_path else None, ["-k"]
+    )
+    results = []
+    try:
+        suite = GoodCheck.run_test_suite(
+            engine,
+            5,
+            on_result=lambda test_id, provider, attempt, result: results.append(result),
+            catalogue=catalogue,
+        )
+    finally:
+        engine.close()
+
+    assert [result.status for result in results] == ["OK", "OK"]
+    for result in results:
+        timings = result.timings
+        assert 0 <= timings.namelookup <= timings.connect <= timings.appconnect
+        assert 0 < timings.appconnect <= timings.starttransfer <= timings.total
+    assert sorted(suite.total_times) == sorted(result.timings.total for result in results)
+    assert sorted(suite.tls_times) == sorted(result.timings.appconnect for result in results)
@@ -0,0 +1,132 @@
+"""Readiness handling of winws, checked against a fake winws script."""
+
+import contextlib
+import io
+import os
+import sys
+import textwrap
+import time
+
+import pytest
+
+import GoodCheck
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="the fake winws is a POSIX script")
+
+
+def fake_winws(tmp_path, body):
+    path = tmp_path / "winws"
+    path.write_text(
+        f"#!{sys.executable}\nimport sys, time\n" + textwrap.dedent(body),
+        encoding="utf-8",
+    )
+    path.chmod(0o755)
+    return path
+
+
+def start(tmp_path, body):
+    executable = fake_winws(tmp_path, body)
+    return GoodCheck.start_winws(executable, GoodCheck.Strategy(1, "--dpi-desync=fake"))
+
+
+def stop(process):
+    if process.poll() is None:
+        process.kill()
+    process.wait()
+
+
+def test_ready_marker_ends_the_wait(tmp_path):
+    process = start(
+        tmp_path,
+        f"""
+        print("windivert initialized. {GoodCheck.WINWS_READY_MARKER}", flush=True)
+        time.sleep(30)
+        """,
+    )
+    echo = io.StringIO()
+    try:
+        started = time.monotonic()
+        assert GoodCheck.wait_winws_ready(process, timeout_sec=10, echo=echo)
+        assert time.monotonic() - started < 5
+    finally:
+        stop(process)
+    assert GoodCheck.WINWS_READY_MARKER in echo.getvalue()
+
+
+def test_output_is_echoed(tmp_path):
+    process = start(
+        tmp_path,
+        f"""
+        print("args:", " ".join(sys.argv[1:]), flush=True)
+        print("{GoodCheck.WINWS_READY_MARKER}", flush=True)
+        time.sleep(30)
+        """,
+    )
+    echo = io.StringIO()
+    try:
+        assert GoodCheck.wait_winws_ready(process, timeout_sec=10, echo=echo)
+    finally:
+        stop(process)
+    assert f"[winws {process.pid}] args: --dpi-desync=fake" in echo.getvalue()
+
+
+def test_output_follows_redirected_stdout(tmp_path):
+    process = start(
+        tmp_path,
+        f"""
+        print("{GoodCheck.WINWS_READY_MARKER}", flush=True)
+        time.sleep(30)
+        """,
+    )
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            assert GoodCheck.wait_winws_ready(process, timeout_sec=10)
+    finally:
+        stop(process)
+    assert f"[winws {process.pid}] {GoodCheck.WINWS_READY_MARKER}" in output.getvalue()
+
+
+def test_silent_winws_falls_back_to_fixed_delay(tmp_path):
+    process = start(tmp_path, "time.sleep(30)\n")
+    try:
+        started = time.monotonic()
+        assert GoodCheck.wait_winws_ready(
+            process, timeout_sec=10, silent_delay_sec=0.5, echo=io.StringIO()
+        )
+        assert time.monotonic() - started < 5
+    finally:
+        stop(process)
+
+
+def test_output_without_marker_times_out(tmp_path):
+    process = start(
+        tmp_path,
+        """
+        print("opening windivert", flush=True)
+        time.sleep(30)
+        """,
+    )
+    try:
+        started = time.monotonic()
+        assert not GoodCheck.wait_winws_ready(
+            process, timeout_sec=1, silent_delay_sec=0.2, echo=io.StringIO()
+        )
+        assert time.monotonic() - started >= 1
+    finally:
+        stop(process)
+
+
+def test_exit_before_ready_reports_output(tmp_path):
+    process = start(
+        tmp_path,
+        """
+        print("windivert: error opening filter", flush=True)
+        sys.exit(3)
+        """,
+    )
+    try:
+        with pytest.raises(RuntimeError, match="кодом 3: windivert: error opening filter"):
+            GoodCheck.wait_winws_ready(process, timeout_sec=10, echo=io.StringIO())
+    finally:
+        stop(process)